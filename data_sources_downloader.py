@@ -1,9 +1,8 @@
 import os
 import json
-import requests
 import logging
 import pandas as pd
-from config import FRED_API_KEY
+from fred_client import fred_get
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -13,11 +12,7 @@ def fetch_all_sources():
     Fetch all sources of economic data from the FRED API.
     """
     logging.info("Fetching all sources of economic data from the FRED API")
-    url = f"https://api.stlouisfed.org/fred/sources?api_key={FRED_API_KEY}&file_type=json"
-    logging.info(f"Requesting URL: {url}")
-    response = requests.get(url)
-    logging.info(f"Received response with status code: {response.status_code}")
-    data = response.json()
+    data = fred_get('sources')
     sources = data['sources']
     
     sources_folder = 'data/sources'
@@ -1,9 +1,7 @@
 import os
-import time
-import requests
 import pandas as pd
 import logging
-from config import FRED_API_KEY
+from fred_client import fred_get
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -17,11 +15,7 @@ def fetch_series_by_source(tag_source_name, limit=50):
     limit (int): The maximum number of series to fetch.
     """
     logging.info(f"Starting to fetch series for source: {tag_source_name}")
-    url = f"https://api.stlouisfed.org/fred/series/search?tag={tag_source_name}&api_key={FRED_API_KEY}&file_type=json&limit={limit}"
-    logging.info(f"Requesting URL: {url}")
-    response = requests.get(url)
-    logging.info(f"Received response with status code: {response.status_code}")
-    data = response.json()
+    data = fred_get('series/search', tag=tag_source_name, limit=limit)
     series_list = data.get('seriess', [])
 
     offset = 0
@@ -38,16 +32,30 @@ def fetch_series_by_source(tag_source_name, limit=50):
         df = pd.DataFrame([series])
         df.to_csv(series_file_path, index=False)
         logging.info(f"Saved series {series_id} to {series_file_path}")
-        time.sleep(0.5)  # Sleep to avoid hitting API rate limits
 
-def main():
+def main(sources=None, limit=50):
+    """
+    Fetch the series of every source tag, or of the given ones only.
+
+    Parameters:
+    sources (list): Source tag names, e.g. ['irs', 'bls']. Defaults to every source tag.
+    limit (int): The maximum number of series to fetch per source.
+    """
     tags_file_path = os.path.join('data', 'source_tags', 'source_tags.csv')
     source_tags_df = pd.read_csv(tags_file_path)
-    source_tags_df = source_tags_df.loc[source_tags_df['name'] == 'irs']
+    if sources:
+        source_tags_df = source_tags_df.loc[source_tags_df['name'].isin(sources)]
     
     for _, row in source_tags_df.iterrows():
         source_name = row['name']
-        fetch_series_by_source(source_name)
+        fetch_series_by_source(source_name, limit)
 
 if __name__ == '__main__':
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fetch the series of FRED source tags.")
+    parser.add_argument("--sources", type=str, nargs='*', help="Only fetch these source tags, e.g. irs bls.")
+    parser.add_argument("--limit", type=int, default=50, help="Maximum number of series per source.")
+    args = parser.parse_args()
+
+    main(args.sources, args.limit)
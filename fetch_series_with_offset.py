@@ -1,54 +1,160 @@
 import os
-import time
-import requests
+import re
+import json
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import logging
-from config import FRED_API_KEY
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from fred_client import fred_get
+
+# Number of pages requested ahead of the page being written
+DEFAULT_MAX_WORKERS = 4
+# Records the next offset to fetch for each source so interrupted fetches can resume
+PROGRESS_FILE_NAME = 'progress.json'
+# Batch CSV files are numbered from 1 by page
+BATCH_FILE_PATTERN = re.compile(r'batch_(\d+)\.csv')
+SOURCE_BASE_FOLDER = os.path.join('data', 'series', 'source')
+COMBINED_CATALOG_FILE_NAME = 'all_sources_combined.parquet'
+# Parsed batches and the manifest of their mtimes live here, next to the source folders
+COMBINE_CACHE_FOLDER_NAME = '.combine_cache'
+# Catalog columns stored as nullable integers; all other columns are strings
+INTEGER_COLUMNS = ('popularity', 'group_popularity')
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def fetch_series_with_offset(tag_source_name, limit=1000):
+def fetch_series_page(tag_source_name, limit, offset):
+    """
+    Fetch one page of series tagged with the given source.
+    """
+    return fred_get('tags/series', tag_names=tag_source_name, limit=limit, offset=offset)
+
+def iter_series_pages(tag_source_name, limit=1000, start_offset=0, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Yield pages of series for a source in offset order.
+
+    The first response's `count` determines the remaining offsets, which are then
+    fetched concurrently. At most `max_workers` pages are requested ahead of the
+    page being consumed, so memory stays bounded while the caller writes pages.
+
+    Parameters:
+    tag_source_name (str): The name of the source.
+    limit (int): The maximum number of series to fetch per API call.
+    start_offset (int): Offset of the first page to fetch.
+    max_workers (int): Maximum number of pages fetched ahead.
+
+    Yields:
+    tuple: (offset, total series count, list of series dicts).
+    """
+    data = fetch_series_page(tag_source_name, limit, start_offset)
+    count = data.get('count', 0)
+    yield start_offset, count, data.get('seriess', [])
+
+    offsets = iter(range(start_offset + limit, count, limit))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque(
+            (offset, executor.submit(fetch_series_page, tag_source_name, limit, offset))
+            for offset in islice(offsets, max_workers)
+        )
+        while in_flight:
+            offset, future = in_flight.popleft()
+            data = future.result()
+            next_offset = next(offsets, None)
+            if next_offset is not None:
+                in_flight.append((next_offset, executor.submit(fetch_series_page, tag_source_name, limit, next_offset)))
+            yield offset, count, data.get('seriess', [])
+
+def load_progress(progress_file, limit):
+    """
+    Return the next offset to fetch recorded in the progress file, or 0 if there is none.
+
+    A fetch that already completed starts over, so rerunning it refreshes the source.
+    """
+    if not os.path.exists(progress_file):
+        return 0
+    with open(progress_file, 'r') as file:
+        progress = json.load(file)
+    if progress.get('limit') != limit:
+        logging.info(f"Ignoring progress file {progress_file} recorded with limit {progress.get('limit')}")
+        return 0
+    if progress['next_offset'] >= progress['count']:
+        return 0
+    return progress['next_offset']
+
+def save_progress(progress_file, limit, count, next_offset):
+    """
+    Atomically record the next offset to fetch.
+    """
+    tmp_path = f"{progress_file}.tmp"
+    with open(tmp_path, 'w') as file:
+        json.dump({'limit': limit, 'count': count, 'next_offset': next_offset}, file)
+    os.replace(tmp_path, progress_file)
+
+def remove_stale_batches(source_folder, last_batch):
+    """
+    Delete the batch CSV files numbered above `last_batch`, left over from a run when the source had more series.
+
+    Returns:
+    int: Number of deleted files.
+    """
+    removed = 0
+    for file_name in os.listdir(source_folder):
+        match = BATCH_FILE_PATTERN.fullmatch(file_name)
+        if match and int(match.group(1)) > last_batch:
+            os.remove(os.path.join(source_folder, file_name))
+            removed += 1
+    return removed
+
+def fetch_series_with_offset(tag_source_name, limit=1000, max_workers=DEFAULT_MAX_WORKERS, resume=True):
     """
     Fetch series for a given source from the FRED API using offset and store them in separate CSV files.
+
+    Each page is written to its own batch CSV as soon as it arrives, and the next
+    offset is recorded in a progress file so an interrupted fetch resumes from the
+    last completed page. Once every page is written, batches beyond the last page
+    (from an earlier run when the source had more series) are deleted.
     
     Parameters:
     tag_source_name (str): The name of the source.
     limit (int): The maximum number of series to fetch per API call.
+    max_workers (int): Maximum number of pages fetched ahead of the one being written.
+    resume (bool): Continue from the offset recorded by a previous run.
+
+    Returns:
+    int: Number of series written in this run.
     """
     logging.info(f"Starting to fetch series for source: {tag_source_name}")
-    offset = 0
-    series_list = []
-    
-    while True:
-        url = f"https://api.stlouisfed.org/fred/tags/series?tag_names={tag_source_name}&api_key={FRED_API_KEY}&file_type=json&limit={limit}&offset={offset}"
-        logging.info(f"Requesting URL: {url}")
-        response = requests.get(url)
-        logging.info(f"Received response with status code: {response.status_code}")
-        data = response.json()
-        new_series = data.get('seriess', [])
-        
-        if not new_series:
-            logging.info("No more series to fetch, exiting loop.")
-            break
-        
-        series_list.extend(new_series)
-        offset += limit
-        # time.sleep(0.1)  # Sleep to avoid hitting API rate limits
-    
     source_folder = os.path.join('data', 'series', 'source', tag_source_name)
-    if not os.path.exists(source_folder):
-        os.makedirs(source_folder)
-    
-    logging.info(f"Total series fetched: {len(series_list)}")
-    for i in range(0, len(series_list), limit):
-        batch = series_list[i:i + limit]
-        logging.info(f"Processing series batch {i//limit + 1}")
-        series_file_path = os.path.join(source_folder, f"batch_{i//limit + 1}.csv")
-        df = pd.DataFrame(batch)
-        df['source_tag'] = tag_source_name
-        df.to_csv(series_file_path, index=False)
-        logging.info(f"Saved series batch {i//limit + 1} to {series_file_path}")
+    os.makedirs(source_folder, exist_ok=True)
+    progress_file = os.path.join(source_folder, PROGRESS_FILE_NAME)
+
+    start_offset = load_progress(progress_file, limit) if resume else 0
+    if start_offset:
+        logging.info(f"Resuming source {tag_source_name} from offset {start_offset}")
+
+    written = 0
+    count = 0
+    for offset, count, series_list in iter_series_pages(tag_source_name, limit, start_offset, max_workers):
+        if series_list:
+            batch_number = offset // limit + 1
+            series_file_path = os.path.join(source_folder, f"batch_{batch_number}.csv")
+            df = pd.DataFrame(series_list)
+            df['source_tag'] = tag_source_name
+            df.to_csv(f"{series_file_path}.tmp", index=False)
+            os.replace(f"{series_file_path}.tmp", series_file_path)
+            written += len(series_list)
+            logging.info(f"Saved series batch {batch_number} ({offset + len(series_list)}/{count}) to {series_file_path}")
+        save_progress(progress_file, limit, count, offset + limit)
+
+    removed = remove_stale_batches(source_folder, -(-count // limit))
+    if removed:
+        logging.info(f"Removed {removed} batch files beyond the {count} series of source {tag_source_name}")
+    logging.info(f"Total series fetched: {written}")
+    return written
 
 def combine_batches_to_dataframe(source_folder):
     """
@@ -68,36 +174,191 @@ def combine_batches_to_dataframe(source_folder):
     print(combined_df.head())
     return combined_df
 
-def combine_all_source_csv():
+def parse_batch_csv(csv_path, cache_path):
+    """
+    Parse one batch CSV with explicit dtypes and write it to a Parquet cache file.
+
+    Parameters:
+    csv_path (str): Path to the batch CSV file.
+    cache_path (str): Path of the Parquet file to write.
+
+    Returns:
+    str: The cache path.
     """
-    Combine all individual CSV files under each source folder into one final CSV file.
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    for column in INTEGER_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('Int64')
+    df.to_parquet(cache_path, index=False)
+    return cache_path
+
+def list_batch_files(source_base_folder):
+    """
+    List the batch CSV files of every source folder, in a stable order.
     """
-    source_base_folder = os.path.join('data', 'series', 'source')
     all_files = []
-    
-    for source_name in os.listdir(source_base_folder):
+    for source_name in sorted(os.listdir(source_base_folder)):
         source_folder = os.path.join(source_base_folder, source_name)
-        if os.path.isdir(source_folder):
-            all_files.extend([os.path.join(source_folder, f) for f in os.listdir(source_folder) if f.endswith('.csv')])
-    
-    if all_files:
-        df_list = [pd.read_csv(file) for file in all_files]
-        final_combined_df = pd.concat(df_list, ignore_index=True)
-        final_combined_file_path = os.path.join(source_base_folder, "all_sources_combined.csv")
-        final_combined_df.to_csv(final_combined_file_path, index=False)
-        logging.info(f"All sources combined CSV saved to {final_combined_file_path}")
-
-def main():
-    tags_file_path = os.path.join('data', 'source_tags', 'source_tags.csv')
-    source_tags_df = pd.read_csv(tags_file_path)
-    # source_tags_df = source_tags_df.loc[source_tags_df['name'] == 'irs']
-    
-    # for _, row in source_tags_df.iterrows():
-    #     source_name = row['name']
-    #     fetch_series_with_offset(source_name)
+        if source_name.startswith('.') or not os.path.isdir(source_folder):
+            continue
+        all_files.extend(sorted(os.path.join(source_folder, f) for f in os.listdir(source_folder) if f.endswith('.csv')))
+    return all_files
+
+def catalog_schema(cache_paths):
+    """
+    Return one schema covering the columns of every cached batch, in order of first appearance.
+
+    Integer columns are nullable int64 and all other columns strings, whatever a
+    single batch (e.g. an empty one) was inferred as.
+    """
+    names = {}
+    for cache_path in cache_paths:
+        for name in pq.read_schema(cache_path).names:
+            names.setdefault(name, pa.int64() if name in INTEGER_COLUMNS else pa.string())
+    # pandas metadata, so pd.read_parquet restores the nullable integer columns as Int64
+    empty = pd.DataFrame({name: pd.Series(dtype='Int64' if name in INTEGER_COLUMNS else object) for name in names})
+    metadata = pa.Schema.from_pandas(empty, preserve_index=False).metadata
+    return pa.schema(list(names.items()), metadata=metadata)
+
+def write_combined_catalog(cache_paths, combined_path, combined_csv_path=None):
+    """
+    Stream the cached batches into one Parquet catalog, deduplicated by series `id`.
+
+    Batches are read and written one at a time, so memory holds one batch and
+    the set of series IDs seen so far. The first occurrence of an ID wins.
+
+    Parameters:
+    cache_paths (list): Parquet cache files of the batches, in priority order.
+    combined_path (str): Path of the Parquet catalog to write.
+    combined_csv_path (str): Also write the catalog to this CSV file, if given.
+
+    Returns:
+    int: Number of series in the catalog.
+    """
+    schema = catalog_schema(cache_paths)
+    seen = set()
+    series_count = 0
+    csv_started = False
+    tmp_path = f"{combined_path}.tmp"
+    tmp_csv_path = f"{combined_csv_path}.tmp" if combined_csv_path else None
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        for cache_path in cache_paths:
+            table = pq.read_table(cache_path)
+            table = pa.table([table[field.name].cast(field.type) if field.name in table.column_names
+                              else pa.nulls(table.num_rows, field.type) for field in schema], schema=schema)
+            keep = np.zeros(table.num_rows, dtype=bool)
+            for position, series_id in enumerate(table['id'].to_pylist()):
+                if series_id not in seen:
+                    seen.add(series_id)
+                    keep[position] = True
+            table = table.filter(pa.array(keep))
+            writer.write_table(table)
+            series_count += table.num_rows
+            if tmp_csv_path:
+                df = table.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+                df.to_csv(tmp_csv_path, mode='a' if csv_started else 'w', header=not csv_started, index=False)
+                csv_started = True
+    os.replace(tmp_path, combined_path)
+    if tmp_csv_path:
+        os.replace(tmp_csv_path, combined_csv_path)
+    return series_count
+
+def combine_all_source_csv(source_base_folder=SOURCE_BASE_FOLDER, max_workers=None, write_csv=False):
+    """
+    Combine all individual CSV files under each source folder into one deduplicated catalog.
+
+    Each batch CSV is parsed once into a typed Parquet cache file. A manifest of
+    batch mtimes and sizes is kept, so later runs only re-parse batches that
+    changed, using a process pool. The cached batches are then streamed one at a
+    time into a single Parquet catalog, deduplicated by series `id` (the first
+    occurrence wins), see write_combined_catalog. Nothing is rebuilt when no
+    batch changed.
+
+    Parameters:
+    source_base_folder (str): Folder containing one subfolder of batch CSVs per source.
+    max_workers (int): Number of processes used to parse changed batches. Defaults to the CPU count.
+    write_csv (bool): Also write the catalog as all_sources_combined.csv.
+
+    Returns:
+    str: Path of the combined Parquet catalog, or None if there are no batch files.
+    """
+    cache_folder = os.path.join(source_base_folder, COMBINE_CACHE_FOLDER_NAME)
+    manifest_path = os.path.join(cache_folder, 'manifest.json')
+    combined_path = os.path.join(source_base_folder, COMBINED_CATALOG_FILE_NAME)
+    combined_csv_path = os.path.join(source_base_folder, "all_sources_combined.csv")
+    os.makedirs(cache_folder, exist_ok=True)
+
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as file:
+            manifest = json.load(file)
+
+    all_files = list_batch_files(source_base_folder)
+    if not all_files:
+        return None
+
+    new_manifest = {}
+    changed = []
+    for csv_path in all_files:
+        stat = os.stat(csv_path)
+        cache_name = os.path.relpath(csv_path, source_base_folder).replace(os.sep, '__')
+        entry = {'mtime': stat.st_mtime, 'size': stat.st_size,
+                 'cache': os.path.join(cache_folder, f"{cache_name}.parquet")}
+        previous = manifest.get(csv_path)
+        if previous != entry or not os.path.exists(entry['cache']):
+            changed.append((csv_path, entry['cache']))
+        new_manifest[csv_path] = entry
+
+    removed = [entry['cache'] for path, entry in manifest.items() if path not in new_manifest]
+    for cache_path in removed:
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+
+    if not changed and not removed and os.path.exists(combined_path) \
+            and (not write_csv or os.path.exists(combined_csv_path)):
+        logging.info(f"No batch files changed, {combined_path} is up to date")
+        return combined_path
+
+    logging.info(f"Parsing {len(changed)} of {len(all_files)} batch files")
+    if changed:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(parse_batch_csv, *zip(*changed)))
+
+    cache_paths = [new_manifest[csv_path]['cache'] for csv_path in all_files]
+    series_count = write_combined_catalog(cache_paths, combined_path, combined_csv_path if write_csv else None)
+    logging.info(f"All sources combined catalog ({series_count} series) saved to {combined_path}")
+    if write_csv:
+        logging.info(f"All sources combined CSV saved to {combined_csv_path}")
+
+    with open(manifest_path, 'w') as file:
+        json.dump(new_manifest, file)
+    return combined_path
+
+def main(sources=None):
+    """
+    Page through the series of the given source tags, then combine every cached batch.
+
+    Parameters:
+    sources (list): Source tag names to fetch, e.g. ['irs']. Without any, only the
+    batches already cached are combined.
+    """
+    if sources:
+        tags_file_path = os.path.join('data', 'source_tags', 'source_tags.csv')
+        source_tags_df = pd.read_csv(tags_file_path)
+        source_tags_df = source_tags_df.loc[source_tags_df['name'].isin(sources)]
+
+        for _, row in source_tags_df.iterrows():
+            source_name = row['name']
+            fetch_series_with_offset(source_name)
 
     combine_all_source_csv()
 
    
 if __name__ == '__main__':
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Page through the series of FRED source tags and combine them.")
+    parser.add_argument("--sources", type=str, nargs='*', help="Source tags to fetch first, e.g. irs bls.")
+    args = parser.parse_args()
+
+    main(args.sources)
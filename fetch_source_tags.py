@@ -1,8 +1,7 @@
 import os
-import requests
 import logging
 import pandas as pd
-from config import FRED_API_KEY
+from fred_client import fred_get
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -12,11 +11,7 @@ def fetch_source_tags():
     Fetch all source tags from the FRED API and store them in the data/source_tags folder.
     """
     logging.info("Fetching all source tags from the FRED API")
-    url = f"https://api.stlouisfed.org/fred/tags?api_key={FRED_API_KEY}&file_type=json&tag_group_id=src"
-    logging.info(f"Requesting URL: {url}")
-    response = requests.get(url)
-    logging.info(f"Received response with status code: {response.status_code}")
-    data = response.json()
+    data = fred_get('tags', tag_group_id='src')
     tags = data['tags']
     
     tags_folder = 'data/source_tags'
@@ -1,81 +1,138 @@
-import requests
 import os
+import json
+import time
 import logging
 import pandas as pd
 from datetime import datetime
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from config import FRED_API_KEY
+from fred_client import fred_get
+from utils import build_category_artifact
 import argparse
 
+# Number of category requests in flight at once; throughput is bounded by the client's rate limiter
+DEFAULT_MAX_WORKERS = 8
+CATEGORIES_FOLDER = os.path.join("data", "categories")
+DEFAULT_CHECKPOINT_FILE = os.path.join(CATEGORIES_FOLDER, "categories_checkpoint.json")
+# Number of fetched nodes between checkpoints within a level
+CHECKPOINT_INTERVAL = 50
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def fetch_all_categories(api_key, max_depth=1):
+def save_checkpoint(checkpoint_file, state):
+    """
+    Atomically write the crawl state to the checkpoint file.
+    """
+    os.makedirs(os.path.dirname(checkpoint_file) or '.', exist_ok=True)
+    tmp_path = f"{checkpoint_file}.tmp"
+    with open(tmp_path, 'w') as file:
+        json.dump(state, file)
+    os.replace(tmp_path, checkpoint_file)
+
+def load_checkpoint(checkpoint_file, max_depth):
+    """
+    Load the crawl state from the checkpoint file if it matches the requested depth.
+    """
+    if not checkpoint_file or not os.path.exists(checkpoint_file):
+        return None
+    with open(checkpoint_file, 'r') as file:
+        state = json.load(file)
+    if state.get('max_depth') != max_depth:
+        logging.info(f"Ignoring checkpoint {checkpoint_file} created for max_depth {state.get('max_depth')}")
+        return None
+    logging.info(f"Resuming crawl from {checkpoint_file}: {len(state['categories'])} categories, {len(state['pending'])} pending")
+    return state
+
+def fetch_all_categories(api_key, max_depth=1, max_workers=DEFAULT_MAX_WORKERS, checkpoint_file=DEFAULT_CHECKPOINT_FILE):
     """
     Fetches all categories from the FRED API.
 
+    The tree is crawled breadth-first: the children of every category on a level
+    are requested concurrently (within the shared API rate limit) before moving to
+    the next level. Collected categories and the pending frontier are checkpointed
+    so an interrupted crawl resumes where it stopped.
+
     Parameters:
     api_key (str): Your FRED API key.
+    max_depth (int): The maximum depth to fetch categories.
+    max_workers (int): Maximum number of concurrent requests.
+    checkpoint_file (str): Path of the checkpoint file, or None to disable checkpointing.
 
     Returns:
     list: A list of dictionaries containing category IDs and names.
     """
-    base_url = 'https://api.stlouisfed.org/fred/category/children'
-    params = {
-        'api_key': api_key,
-        'file_type': 'json'
-    }
-    
     def fetch_child_categories(category_id, parent_name, current_depth):
-        params['category_id'] = category_id
-        logging.info(f"Making API request to {base_url} with params: {params}")
-        response = requests.get(base_url, params=params)
-        logging.info(f"Received response with status code: {response.status_code}")
-        response.raise_for_status()
-        
-        data = response.json()
+        data = fred_get('category/children', category_id=category_id, api_key=api_key)
         categories = data['categories']
         for category in categories:
             category['parent_id'] = category_id
             category['parent_name'] = parent_name
             category['level'] = current_depth
         return categories
-    
-    all_categories = []
-    categories_to_fetch = [(0, "Root", 1)]  # Start with the parent category ID 0, name "Root", and level 1
-    
-    while categories_to_fetch:
-        current_category_id, parent_name, current_depth = categories_to_fetch.pop()
-        if current_depth > max_depth:
-            continue
-        child_categories = fetch_child_categories(current_category_id, parent_name, current_depth)
-        all_categories.extend(child_categories)
-        categories_to_fetch.extend([(cat['id'], cat['name'], current_depth + 1) for cat in child_categories])
-        
-        # Rate limiting: sleep for 0.6 seconds to ensure we don't exceed 100 requests per minute
-        time.sleep(0.6)
-    
+
+    state = load_checkpoint(checkpoint_file, max_depth)
+    if state is None:
+        # Start with the parent category ID 0, name "Root", and level 1
+        state = {'max_depth': max_depth, 'categories': [], 'pending': [[0, "Root", 1]]}
+    all_categories = state['categories']
+    # Nodes still to fetch, keyed by category ID so finished ones are dropped in constant time
+    pending = {node[0]: node for node in state['pending']}
+
+    start_time = time.monotonic()
+    fetched_nodes = 0
+    since_checkpoint = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending:
+            current_depth = min(node[2] for node in pending.values())
+            level = [node for node in pending.values() if node[2] == current_depth]
+            futures = {executor.submit(fetch_child_categories, *node): node for node in level}
+            for future in as_completed(futures):
+                node = futures[future]
+                child_categories = future.result()
+                all_categories.extend(child_categories)
+                del pending[node[0]]
+                if current_depth < max_depth:
+                    pending.update((cat['id'], [cat['id'], cat['name'], current_depth + 1]) for cat in child_categories)
+                fetched_nodes += 1
+                since_checkpoint += 1
+                if checkpoint_file and since_checkpoint >= CHECKPOINT_INTERVAL:
+                    save_checkpoint(checkpoint_file, dict(state, pending=list(pending.values())))
+                    since_checkpoint = 0
+
+            elapsed = time.monotonic() - start_time
+            logging.info(f"Finished level {current_depth}: {len(all_categories)} categories, "
+                         f"{fetched_nodes / elapsed:.2f} nodes/s")
+            if checkpoint_file:
+                save_checkpoint(checkpoint_file, dict(state, pending=list(pending.values())))
+                since_checkpoint = 0
+
+    if checkpoint_file and os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+
     logging.info(f"Fetched {len(all_categories)} categories from the API")
     
     return all_categories
 
-if __name__ == "__main__":
-    logging.info("Starting category fetch script")
-    parser = argparse.ArgumentParser(description="Fetch all categories from FRED.")
-    parser.add_argument("--max_depth", type=int, default=1, help="The maximum depth to fetch categories. Default is 1.")
-    args = parser.parse_args()
+def save_categories(categories, categories_folder=CATEGORIES_FOLDER):
+    """
+    Save fetched categories to a timestamped CSV file and build the cleaned artifact used by the app.
 
-    categories = fetch_all_categories(api_key=FRED_API_KEY, max_depth=args.max_depth)
+    Parameters:
+    categories (list): Categories returned by fetch_all_categories.
+    categories_folder (str): Folder to save the CSV file in.
 
+    Returns:
+    str: Path of the saved CSV file.
+    """
     # Create the data/categories folder if it doesn't exist
-    categories_folder = os.path.join("data", "categories")
     logging.info(f"Saving categories to folder: {categories_folder}")
     if not os.path.exists(categories_folder):
         os.makedirs(categories_folder)
 
     # Create a timestamped filename
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    file_path = os.path.join(categories_folder, f"categories_{timestamp}.json")
 
     # Convert the categories to a DataFrame and save it as a CSV file
     df = pd.json_normalize(categories)
@@ -83,3 +140,19 @@ if __name__ == "__main__":
     df.to_csv(csv_file_path, index=False)
 
     logging.info(f"Categories saved to {csv_file_path}")
+
+    # Precompute the cleaned hierarchy used by the app
+    build_category_artifact(csv_file_path)
+    return csv_file_path
+
+if __name__ == "__main__":
+    logging.info("Starting category fetch script")
+    parser = argparse.ArgumentParser(description="Fetch all categories from FRED.")
+    parser.add_argument("--max_depth", type=int, default=1, help="The maximum depth to fetch categories. Default is 1.")
+    parser.add_argument("--max_workers", type=int, default=DEFAULT_MAX_WORKERS, help="Maximum number of concurrent requests.")
+    parser.add_argument("--checkpoint_file", type=str, default=DEFAULT_CHECKPOINT_FILE, help="Checkpoint file used to resume interrupted crawls.")
+    args = parser.parse_args()
+
+    categories = fetch_all_categories(api_key=FRED_API_KEY, max_depth=args.max_depth,
+                                      max_workers=args.max_workers, checkpoint_file=args.checkpoint_file)
+    save_categories(categories)
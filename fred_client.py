@@ -0,0 +1,312 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    # orjson decodes large responses several times faster than the json module
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+from config import FRED_API_KEY
+from instrumentation import metrics, redact, install_log_redaction
+
+FRED_BASE_URL = 'https://api.stlouisfed.org/fred'
+
+# FRED allows 120 requests per minute per API key
+REQUESTS_PER_MINUTE = 120
+# Number of requests that may be sent back to back before the limiter kicks in
+BURST_SIZE = 1
+# Share of the budget background work (e.g. cache prefetching) may use, so interactive requests are not starved
+BACKGROUND_REQUESTS_PER_MINUTE = 30
+# HTTP status codes that are worth retrying
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+MAX_RETRIES = 5
+BACKOFF_FACTOR = 1.0
+MAX_BACKOFF_SECONDS = 60
+# Number of keep-alive connections kept open to the API host
+POOL_SIZE = 16
+REQUEST_TIMEOUT = 30
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+install_log_redaction(secrets=(FRED_API_KEY,))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Parameters:
+    rate (float): Number of tokens added per second.
+    capacity (int): Maximum number of tokens the bucket can hold.
+    """
+
+    def __init__(self, rate, capacity=BURST_SIZE):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def try_acquire(self, amount=1):
+        """
+        Consume `amount` tokens if they are available, without blocking.
+
+        Returns:
+        bool: Whether the tokens were consumed.
+        """
+        with self.lock:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return True
+            return False
+
+    def acquire(self, amount=1):
+        """
+        Block until `amount` tokens are available and consume them.
+
+        Amounts larger than the capacity are capped at the capacity.
+        """
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls: while a call for a key is in flight, other
+    callers with the same key wait for it and share its result or exception.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        Run `function(*args, **kwargs)` unless a call for `key` is already running, then return its result.
+        """
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.calls[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = function(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+
+class FredClient:
+    """
+    Pooled, rate-limited HTTP client for the FRED API.
+
+    A single keep-alive session is shared by every caller, and all requests
+    (including retries) draw from the same token bucket so concurrent threads
+    stay within the API's per-key request budget. Latency, status codes, bytes
+    received and retries are recorded per endpoint in instrumentation.metrics.
+
+    Parameters:
+    api_key (str): FRED API key used when a call does not provide one.
+    requests_per_minute (int): Request budget shared by all callers.
+    max_retries (int): Number of retries on 429/5xx responses and connection errors.
+    pool_size (int): Maximum number of pooled connections.
+    base_url (str): API root, e.g. of a mock server.
+    background_requests_per_minute (int): Part of the budget requests made inside
+    background_requests() may use; they also draw from the shared budget.
+    """
+
+    def __init__(self, api_key=FRED_API_KEY, requests_per_minute=REQUESTS_PER_MINUTE,
+                 max_retries=MAX_RETRIES, pool_size=POOL_SIZE, base_url=FRED_BASE_URL,
+                 background_requests_per_minute=BACKGROUND_REQUESTS_PER_MINUTE):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.limiter = TokenBucket(rate=requests_per_minute / 60)
+        self.background_limiter = TokenBucket(rate=min(background_requests_per_minute, requests_per_minute) / 60)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _backoff(self, attempt, response=None):
+        """
+        Return the number of seconds to wait before the next attempt.
+
+        A `Retry-After` header is honoured, but capped at MAX_BACKOFF_SECONDS like
+        the exponential backoff, so one bad header cannot stall a worker for long.
+        """
+        if response is not None and response.headers.get('Retry-After', '').isdigit():
+            return min(MAX_BACKOFF_SECONDS, int(response.headers['Retry-After']))
+        return min(MAX_BACKOFF_SECONDS, BACKOFF_FACTOR * 2 ** attempt)
+
+    def get(self, endpoint, **params):
+        """
+        Send a GET request to a FRED endpoint and return the decoded JSON.
+
+        Parameters:
+        endpoint (str): Endpoint path relative to the API root, e.g. 'series/observations'.
+        params: Query parameters. `api_key` and `file_type` are filled in if missing.
+
+        Returns:
+        dict: The decoded JSON response.
+        """
+        return json_loads(self.get_raw(endpoint, **params))
+
+    def get_raw(self, endpoint, **params):
+        """
+        Send a GET request to a FRED endpoint and return the undecoded response body.
+
+        Lets callers that only need a few fields of a large response, such as the
+        observations of a long daily series, parse it without building every object.
+
+        Parameters:
+        endpoint (str): Endpoint path relative to the API root.
+        params: Query parameters. `api_key` and `file_type` are filled in if missing.
+
+        Returns:
+        bytes: The response body.
+        """
+        url = f"{self.base_url}/{endpoint}"
+        params.setdefault('api_key', self.api_key)
+        params.setdefault('file_type', 'json')
+        log_params = {key: value for key, value in params.items() if key != 'api_key'}
+
+        for attempt in range(self.max_retries + 1):
+            wait_start = time.perf_counter()
+            if getattr(_background, 'active', False):
+                self.background_limiter.acquire()
+            self.limiter.acquire()
+            metrics.observe('fred_rate_limit_wait_seconds', time.perf_counter() - wait_start)
+            logging.info(f"Requesting {endpoint} with params: {log_params}")
+            request_start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                metrics.increment('fred_requests_total', endpoint=endpoint, status='error')
+                if attempt == self.max_retries:
+                    raise type(e)(redact(str(e), (self.api_key,))) from None
+                metrics.increment('fred_retries_total', endpoint=endpoint, reason='connection')
+                wait = self._backoff(attempt)
+                logging.warning(f"Request to {endpoint} failed ({e}), retrying in {wait}s")
+                time.sleep(wait)
+                continue
+            metrics.observe('fred_request_seconds', time.perf_counter() - request_start, endpoint=endpoint)
+            metrics.increment('fred_requests_total', endpoint=endpoint, status=str(response.status_code))
+            metrics.increment('fred_response_bytes_total', len(response.content), endpoint=endpoint)
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                metrics.increment('fred_retries_total', endpoint=endpoint, reason=str(response.status_code))
+                wait = self._backoff(attempt, response)
+                logging.warning(f"Received status code {response.status_code} from {endpoint}, retrying in {wait}s")
+                time.sleep(wait)
+                continue
+
+            try:
+                response.raise_for_status()
+            except requests.HTTPError as e:
+                # The default message contains the request URL, including the API key
+                raise requests.HTTPError(redact(str(e), (self.api_key,)), response=response) from None
+            return response.content
+
+
+_background = threading.local()
+
+
+@contextmanager
+def background_requests():
+    """
+    Mark the requests made by the calling thread as background work.
+
+    They are limited to the client's background budget on top of the shared one,
+    leaving the rest of the budget to interactive requests.
+    """
+    previous = getattr(_background, 'active', False)
+    _background.active = True
+    try:
+        yield
+    finally:
+        _background.active = previous
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Return the process-wide FredClient, creating it on first use.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = FredClient()
+    return _client
+
+
+def configure_client(**kwargs):
+    """
+    Replace the process-wide FredClient, e.g. to change the shared request budget.
+
+    Parameters:
+    kwargs: Passed on to FredClient.
+    """
+    global _client
+    with _client_lock:
+        _client = FredClient(**kwargs)
+    return _client
+
+
+def fred_get(endpoint, **params):
+    """
+    Send a GET request to a FRED endpoint through the shared client.
+
+    Parameters:
+    endpoint (str): Endpoint path relative to the API root.
+    params: Query parameters for the request.
+
+    Returns:
+    dict: The decoded JSON response.
+    """
+    return get_client().get(endpoint, **params)
+
+
+def fred_get_raw(endpoint, **params):
+    """
+    Send a GET request to a FRED endpoint through the shared client, without decoding the response.
+
+    Parameters:
+    endpoint (str): Endpoint path relative to the API root.
+    params: Query parameters for the request.
+
+    Returns:
+    bytes: The response body.
+    """
+    return get_client().get_raw(endpoint, **params)
@@ -1,84 +1,180 @@
 import pandas as pd
-import requests
 import os
 import json
 import logging
-from config import FRED_API_KEY
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from fred_client import fred_get, fred_get_raw, SingleFlight
+from observation_store import (
+    OBSERVATIONS_FOLDER,
+    observation_path,
+    parse_observations,
+    save_observations,
+    load_observations
+)
+from metadata_store import SERIES_INFO_TABLE, SERIES_TAGS_TABLE, MISSING_SERIES_TABLE, get_record, put_record
+from instrumentation import metrics
 
+# Legacy per-series JSON folders, imported into the metadata store on first access
 SERIES_INFO_FOLDER = 'data/series_info'
+SERIES_TAGS_FOLDER = 'data/series_tags'
+# Observations re-requested before the last cached date to pick up revisions
+DEFAULT_REVISION_WINDOW_DAYS = 90
+# Cached metadata younger than this is trusted without asking the API
+DEFAULT_SERIES_INFO_MAX_AGE = 3600
+# Number of series downloaded concurrently by download_all_data
+DEFAULT_MAX_WORKERS = 8
+# Stored metadata and tags older than this are revalidated against the API
+SERIES_INFO_TTL = 24 * 3600
+SERIES_TAGS_TTL = 7 * 24 * 3600
+# Series the API reported as missing are not requested again for this long
+MISSING_SERIES_TTL = 24 * 3600
+
+# Coalesces concurrent API requests for the same series record
+_series_requests = SingleFlight()
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def fetch_series_info(series_id):
+def _load_stored_record(table, legacy_folder, series_id):
+    """
+    Return the stored (data, fetched_at) of a series, importing a legacy JSON file if present.
+
+    Legacy files never expired, and most are older than the TTL, so stamping them
+    with their modification time would revalidate every one of them against the
+    API on first access. They are stamped with the import time instead and are
+    revalidated once the TTL has passed from then.
+    """
+    record = get_record(table, series_id)
+    if record is None:
+        legacy_path = os.path.join(legacy_folder, f"{series_id}.json")
+        if os.path.exists(legacy_path):
+            with open(legacy_path, 'r') as file:
+                data = json.load(file)
+            fetched_at = time.time()
+            put_record(table, series_id, data, fetched_at=fetched_at)
+            record = (data, fetched_at)
+    return record
+
+class SeriesNotFoundError(LookupError):
+    """
+    Raised when the FRED API reports that a series ID does not exist.
+    """
+
+def _is_missing_series_error(error):
+    """
+    Return True if an HTTP error from the API means the requested series does not exist.
+    """
+    response = error.response
+    if response is None or response.status_code not in (400, 404):
+        return False
+    try:
+        message = response.json().get('error_message', '')
+    except ValueError:
+        return False
+    return 'does not exist' in message
+
+def _request_series_record(table, endpoint, series_id):
+    """
+    Request a series record from the API and store it, remembering series the API reports as missing.
+    """
+    try:
+        data = fred_get(endpoint, series_id=series_id)
+    except requests.HTTPError as e:
+        if not _is_missing_series_error(e):
+            raise
+        message = e.response.json()['error_message']
+        put_record(MISSING_SERIES_TABLE, series_id, message)
+        raise SeriesNotFoundError(f"{series_id}: {message}") from e
+
+    if table == SERIES_INFO_TABLE:
+        if not data.get('seriess'):
+            put_record(MISSING_SERIES_TABLE, series_id, 'No series returned.')
+            raise SeriesNotFoundError(f"{series_id}: No series returned.")
+        data = data['seriess'][0]
+    put_record(table, series_id, data)
+    return data
+
+def _fetch_series_record(table, legacy_folder, endpoint, series_id, ttl, refresh=False):
+    """
+    Return a series record from the metadata store, fetching it from the API when missing or expired.
+
+    Concurrent requests for the same record are coalesced into one API call.
+    Series the API reported as missing are not requested again until the
+    negative cache entry expires. If revalidating an expired record fails, the
+    stale record is returned.
+    """
+    record = None if refresh else _load_stored_record(table, legacy_folder, series_id)
+    if record is not None and time.time() - record[1] < ttl:
+        logging.info(f"Loading {table} for series_id: {series_id} from metadata store")
+        metrics.increment('cache_requests_total', cache=table, result='hit')
+        return record[0]
+
+    missing = get_record(MISSING_SERIES_TABLE, series_id)
+    if missing is not None and time.time() - missing[1] < MISSING_SERIES_TTL:
+        metrics.increment('cache_requests_total', cache=table, result='missing')
+        raise SeriesNotFoundError(f"{series_id}: {missing[0]}")
+
+    metrics.increment('cache_requests_total', cache=table, result='miss' if record is None else 'expired')
+
+    logging.info(f"Fetching {table} for series_id: {series_id} from FRED API")
+    try:
+        return _series_requests.do((table, series_id), _request_series_record, table, endpoint, series_id)
+    except requests.RequestException as e:
+        if record is None:
+            raise
+        logging.warning(f"Revalidating {table} for series_id: {series_id} failed ({e}), using stored copy")
+        metrics.increment('cache_requests_total', cache=table, result='stale')
+        return record[0]
+
+def fetch_series_info(series_id, refresh=False):
     """
     Fetch metadata for a given series ID from the FRED API.
+
+    Parameters:
+    series_id (str): Series ID to look up.
+    refresh (bool): Ignore the local copy and fetch the metadata from the API again.
+
+    Raises:
+    SeriesNotFoundError: If the API reports that the series does not exist.
     """
-    series_info_path = os.path.join(SERIES_INFO_FOLDER, f"{series_id}.json")
-    
-    if os.path.exists(series_info_path):
-        logging.info(f"Loading metadata for series_id: {series_id} from local file: {series_info_path}")
-        with open(series_info_path, 'r') as file:
-            series_info = json.load(file)
-    else:
-        url = f"https://api.stlouisfed.org/fred/series?series_id={series_id}&api_key={FRED_API_KEY}&file_type=json"
-        url = f"https://api.stlouisfed.org/fred/series?series_id={series_id}&api_key={FRED_API_KEY}&file_type=json"
-        logging.info(f"Fetching metadata for series_id: {series_id} from FRED API: {url}")
-        url = f"https://api.stlouisfed.org/fred/series?series_id={series_id}&api_key={FRED_API_KEY}&file_type=json"
-        response = requests.get(url)
-        data = response.json()
-        series_info = data['seriess'][0]
-        
-        if not os.path.exists(SERIES_INFO_FOLDER):
-            os.makedirs(SERIES_INFO_FOLDER)
-        
-        with open(series_info_path, 'w') as file:
-            json.dump(series_info, file)
-    
-    return series_info
+    return _fetch_series_record(SERIES_INFO_TABLE, SERIES_INFO_FOLDER, 'series', series_id,
+                                SERIES_INFO_TTL, refresh=refresh)
 
 def fetch_series_tags(series_id):
     """
     Fetch tags for a given series ID from the FRED API.
+
+    Raises:
+    SeriesNotFoundError: If the API reports that the series does not exist.
     """
-    tags_folder = 'data/series_tags'
-    tags_file_path = os.path.join(tags_folder, f"{series_id}.json")
-    
-    if os.path.exists(tags_file_path):
-        logging.info(f"Loading tags for series_id: {series_id} from local file: {tags_file_path}")
-        with open(tags_file_path, 'r') as file:
-            tags = json.load(file)
-    else:
-        url = f"https://api.stlouisfed.org/fred/series/tags?series_id={series_id}&api_key={FRED_API_KEY}&file_type=json"
-        url = f"https://api.stlouisfed.org/fred/series/tags?series_id={series_id}&api_key={FRED_API_KEY}&file_type=json"
-        logging.info(f"Fetching tags for series_id: {series_id} from FRED API: {url}")
-        url = f"https://api.stlouisfed.org/fred/series/tags?series_id={series_id}&api_key={FRED_API_KEY}&file_type=json"
-        response = requests.get(url)
-        tags = response.json()
-        
-        if not os.path.exists(tags_folder):
-            os.makedirs(tags_folder)
-        
-        with open(tags_file_path, 'w') as file:
-            json.dump(tags, file)
-    
-    return tags
+    return _fetch_series_record(SERIES_TAGS_TABLE, SERIES_TAGS_FOLDER, 'series/tags', series_id, SERIES_TAGS_TTL)
 
 
-def fetch_fred_data(series_id, start_date, end_date, series_info):
+def fetch_fred_data(series_id, start_date, end_date, series_info=None, include_realtime=True):
     """
     Fetch data from the FRED API for a given series ID and date range.
+
+    The response is parsed straight into typed columns, see parse_observations.
+
+    Parameters:
+    series_id (str): FRED series ID.
+    start_date (str): First observation date (YYYY-MM-DD).
+    end_date (str): Last observation date (YYYY-MM-DD), or None for the latest available.
+    series_info (dict): Metadata added to every row as constant columns, if given.
+    include_realtime (bool): Keep the `realtime_start` and `realtime_end` columns.
+
+    Returns:
+    pd.DataFrame: Observations with datetime64 `date` and float64 `value` columns.
     """
-    url = f"https://api.stlouisfed.org/fred/series/observations?series_id={series_id}&api_key={FRED_API_KEY}&file_type=json&observation_start={start_date}&observation_end={end_date}"
-    url = f"https://api.stlouisfed.org/fred/series/observations?series_id={series_id}&api_key={FRED_API_KEY}&file_type=json&observation_start={start_date}&observation_end={end_date}"
-    logging.info(f"Fetching data for series_id: {series_id} from {start_date} to {end_date} using URL: {url}")
-    url = f"https://api.stlouisfed.org/fred/series/observations?series_id={series_id}&api_key={FRED_API_KEY}&file_type=json&observation_start={start_date}&observation_end={end_date}"
-    response = requests.get(url)
-    data = response.json()
-    df = pd.DataFrame(data['observations'])
+    logging.info(f"Fetching data for series_id: {series_id} from {start_date} to {end_date}")
+    content = fred_get_raw('series/observations', series_id=series_id,
+                           observation_start=start_date, observation_end=end_date)
+    df = parse_observations(content, include_realtime)
     
     # Add series info as additional columns
-    for key, value in series_info.items():
+    for key, value in (series_info or {}).items():
         df[key] = value
     
     return df
@@ -94,12 +190,102 @@ def save_data_to_csv(df, series_id, data_folder='data'):
     series_id (str): Series ID for naming the file.
     data_folder (str): Folder to save the CSV file in.
     """
-    if not os.path.exists(data_folder):
-        os.makedirs(data_folder)
+    os.makedirs(data_folder, exist_ok=True)
     file_path = os.path.join(data_folder, f"{series_id}.csv")
     logging.info(f"Saving data to file: {file_path}")
     df.to_csv(file_path, index=False)
 
+def _view(df, start_date, end_date):
+    """
+    Return the observations between start_date and end_date (either may be None).
+    """
+    visible = pd.Series(True, index=df.index)
+    if start_date is not None:
+        visible &= df['date'] >= pd.Timestamp(start_date)
+    if end_date is not None:
+        visible &= df['date'] <= pd.Timestamp(end_date)
+    view = df[visible].reset_index(drop=True)
+    view.attrs = dict(df.attrs)
+    return view
+
+def sync_series_data(series_id, start_date, end_date, data_folder=OBSERVATIONS_FOLDER,
+                     revision_window_days=DEFAULT_REVISION_WINDOW_DAYS,
+                     max_age=DEFAULT_SERIES_INFO_MAX_AGE):
+    """
+    Bring the stored observations of a series up to date, fetching only what changed.
+
+    The store always holds the series from the earliest requested start date up to
+    the latest available observation; `start_date` and `end_date` only select the
+    returned rows. The stored `last_updated` is compared with the API's. If the
+    series changed, only observations from `revision_window_days` before the last
+    stored date onwards are requested and merged into the store, replacing the
+    overlapping (possibly revised) rows. A `start_date` before the stored range is
+    backfilled. Series that are not stored yet are fetched in full from `start_date`.
+
+    When the stored observations were checked against the API less than `max_age`
+    seconds ago, and the metadata store does not know of a newer release, no
+    request is made.
+
+    Parameters:
+    series_id (str): Series ID to sync.
+    start_date (str): First observation date to return.
+    end_date (str): Last observation date to return.
+    data_folder (str): Folder of the observation store.
+    revision_window_days (int): Number of days before the last stored date to re-request.
+    max_age (int): Seconds during which the stored observations are trusted without checking the API.
+
+    Returns:
+    tuple: (pd.DataFrame with the observations in the date range, dict with the current series info).
+    """
+    data_file = observation_path(series_id, data_folder)
+    start = pd.Timestamp(start_date).normalize()
+
+    cached_df, cached_info, sync_state = None, None, {}
+    if os.path.exists(data_file):
+        cached_df, cached_info = load_observations(series_id, data_folder)
+        sync_state = cached_df.attrs.get('sync_state', {})
+    if cached_df is not None and not cached_df.empty:
+        covered_start = min(pd.Timestamp(sync_state.get('start', cached_df['date'].min())), cached_df['date'].min())
+        record = get_record(SERIES_INFO_TABLE, series_id)
+        # Other code paths (catalog prefetch and imports) may already know of a newer release
+        newer_known = record is not None and record[0].get('last_updated') != cached_info.get('last_updated')
+        if time.time() - sync_state.get('checked_at', 0) < max_age and start >= covered_start and not newer_known:
+            logging.info(f"Observations of series_id: {series_id} checked recently, using stored data")
+            metrics.increment('cache_requests_total', cache='observations', result='hit')
+            return _view(cached_df, start_date, end_date), cached_info
+
+    series_info = fetch_series_info(series_id, refresh=True)
+    checked_at = time.time()
+
+    if cached_df is None or cached_df.empty:
+        metrics.increment('cache_requests_total', cache='observations', result='miss')
+        df = fetch_fred_data(series_id, f"{start:%Y-%m-%d}", None, include_realtime=False)
+        covered_start = start
+    else:
+        parts = []
+        if start < covered_start:
+            backfill_end = cached_df['date'].min() - pd.Timedelta(days=1)
+            logging.info(f"Series_id: {series_id} backfilling observations from {start:%Y-%m-%d}")
+            parts.append(fetch_fred_data(series_id, f"{start:%Y-%m-%d}", f"{backfill_end:%Y-%m-%d}",
+                                         include_realtime=False))
+            covered_start = start
+        if cached_info.get('last_updated') == series_info.get('last_updated'):
+            logging.info(f"Series_id: {series_id} unchanged since {series_info.get('last_updated')}, using stored data")
+            metrics.increment('cache_requests_total', cache='observations', result='unchanged')
+            parts.append(cached_df)
+        else:
+            metrics.increment('cache_requests_total', cache='observations', result='incremental')
+            fetch_start = cached_df['date'].max() - pd.Timedelta(days=revision_window_days)
+            logging.info(f"Series_id: {series_id} updated, fetching observations from {fetch_start:%Y-%m-%d}")
+            new_df = fetch_fred_data(series_id, f"{fetch_start:%Y-%m-%d}", None, include_realtime=False)
+            parts += [cached_df[cached_df['date'] < fetch_start], new_df]
+        df = pd.concat(parts, ignore_index=True)
+
+    sync_state = {'checked_at': checked_at, 'start': f"{covered_start:%Y-%m-%d}"}
+    save_observations(df, series_id, series_info, data_folder, sync_state)
+    df.attrs = {'series_info': series_info, 'sync_state': sync_state}
+    return _view(df, start_date, end_date), series_info
+
 def load_config(config_file='./data_config.json'):
     """
     Load the configuration from a JSON file.
@@ -108,25 +294,79 @@ def load_config(config_file='./data_config.json'):
     with open(config_file, 'r') as file:
         return json.load(file)
 
-def download_all_data(config_file='data_config.json'):
+def download_series(series, data_folder=OBSERVATIONS_FOLDER):
+    """
+    Fetch metadata and observations for one entry of the configuration file and save them.
+
+    Parameters:
+    series (dict): Configuration entry with 'series_id', 'start_date' and 'end_date'.
+    data_folder (str): Folder of the observation store.
+
+    Returns:
+    int: Number of observations saved.
+    """
+    series_id = series['series_id']
+    logging.info(f"Checking and processing series: {series_id}")
+
+    # Fetch series metadata
+    series_info = fetch_series_info(series_id)
+    logging.info(f"Series Info: Title: {series_info['title']}, Frequency: {series_info['frequency']}, Units: {series_info['units']}, Seasonal Adjustment: {series_info['seasonal_adjustment']}, Last Updated: {series_info['last_updated']}")
+    df = fetch_fred_data(series_id, series['start_date'], series['end_date'], include_realtime=False)
+    save_observations(df, series_id, series_info, data_folder)
+    return len(df)
+
+def download_all_data(config_file='data_config.json', max_workers=DEFAULT_MAX_WORKERS, data_folder=OBSERVATIONS_FOLDER):
     """
     Download all data specified in the configuration file.
+
+    Series are processed concurrently by a thread pool. All requests share the
+    client's rate limiter, so `max_workers` only bounds how many series are in
+    flight at once. A failing series is logged and skipped without stopping the run.
+
+    Parameters:
+    config_file (str): Path to the JSON configuration file.
+    max_workers (int): Maximum number of series downloaded concurrently.
+    data_folder (str): Folder of the observation store.
+
+    Returns:
+    dict: Mapping of failed series IDs to their error message.
     """
     config = load_config(config_file)
     logging.debug(config)
-    for series in config['series']:
-        series_id = series['series_id']
-        logging.info(f"Checking and processing series: {series_id}")
-        
-        # Fetch series metadata
-        series_info = fetch_series_info(series_id)
-        logging.info(f"Series Info: Title: {series_info['title']}, Frequency: {series_info['frequency']}, Units: {series_info['units']}, Seasonal Adjustment: {series_info['seasonal_adjustment']}, Last Updated: {series_info['last_updated']}")
-        series_id = series['series_id']
-        start_date = series['start_date']
-        end_date = series['end_date']
-        df = fetch_fred_data(series_id, start_date, end_date)
-        save_data_to_csv(df, series_id, data_folder='data')
-    logging.info("All data downloaded successfully.")
+    series_list = config['series']
+    total = len(series_list)
+    failures = {}
+    completed = 0
+    observations = 0
+    start_time = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(download_series, series, data_folder): series['series_id'] for series in series_list}
+        for future in as_completed(futures):
+            series_id = futures[future]
+            completed += 1
+            try:
+                observations += future.result()
+            except Exception as e:
+                logging.error(f"Failed to download series {series_id}: {e}")
+                failures[series_id] = str(e)
+            elapsed = time.monotonic() - start_time
+            logging.info(f"Progress: {completed}/{total} series ({len(failures)} failed), "
+                         f"{completed / elapsed:.2f} series/s, {observations / elapsed:.0f} observations/s")
+
+    logging.info(f"Downloaded {total - len(failures)}/{total} series in {time.monotonic() - start_time:.1f}s.")
+    if failures:
+        logging.warning(f"Failed series: {', '.join(sorted(failures))}")
+    else:
+        logging.info("All data downloaded successfully.")
+    return failures
 
 if __name__ == '__main__':
-    download_all_data(config_file='data_config.json')
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Download all series listed in the data configuration file.")
+    parser.add_argument("--config_file", type=str, default='data_config.json', help="Path to the data configuration file.")
+    parser.add_argument("--max_workers", type=int, default=DEFAULT_MAX_WORKERS, help="Maximum number of series downloaded concurrently.")
+    args = parser.parse_args()
+
+    download_all_data(config_file=args.config_file, max_workers=args.max_workers)
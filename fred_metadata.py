@@ -1,10 +1,24 @@
-import requests
 import os
 import json
 from datetime import datetime
 import logging
 import pandas as pd
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
 import config
+from fred_client import fred_get, background_requests
+from metadata_store import SERIES_INFO_TABLE, put_records
+from fred_data_downloader import fetch_series_tags, SeriesNotFoundError
+
+# Maximum page size of the category/series endpoint
+CATEGORY_SERIES_PAGE_SIZE = 1000
+# Number of concurrent tag requests during a prefetch; throughput is bounded by the client's rate limiter
+DEFAULT_PREFETCH_WORKERS = 4
+# Background prefetches run within a smaller budget, so fewer workers keep it busy
+BACKGROUND_PREFETCH_WORKERS = 2
+# Number of catalog rows stored per transaction by import_catalog_metadata
+CATALOG_IMPORT_BATCH_SIZE = 50000
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -25,21 +39,17 @@ def fetch_all_series_metadata(category_id, api_key=config.FRED_API_KEY, limit=20
             df_series_metadata = None
     else:
         logging.info(f"File {csv_file_path} does not exist. Fetching data from API.")
-        base_url = 'https://api.stlouisfed.org/fred/category/series'
-        params = {
-            'api_key': api_key,
-            'category_id': category_id,
-            'file_type': 'json',
-            'order_by': 'popularity',
-            'limit': limit,
-            'sort_order': 'desc'
-        }
-        
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
-        
-        data = response.json()
+        data = fred_get(
+            'category/series',
+            api_key=api_key,
+            category_id=category_id,
+            order_by='popularity',
+            limit=limit,
+            sort_order='desc'
+        )
         series_list = data['seriess']
+        # category/series returns full series records, so they also warm the metadata store
+        put_records(SERIES_INFO_TABLE, {series['id']: series for series in series_list})
         
         # Save the series metadata to a CSV file
         df_series_metadata = pd.json_normalize(series_list)
@@ -48,5 +58,184 @@ def fetch_all_series_metadata(category_id, api_key=config.FRED_API_KEY, limit=20
     return df_series_metadata
 
 
+def iter_category_series(category_id, api_key=config.FRED_API_KEY, page_size=CATEGORY_SERIES_PAGE_SIZE):
+    """
+    Yield pages of every series in a category.
+
+    Parameters:
+    category_id (int): The category to page through.
+    api_key (str): Your FRED API key.
+    page_size (int): Number of series requested per page.
+
+    Yields:
+    list: A page of series dicts.
+    """
+    offset = 0
+    while True:
+        data = fred_get('category/series', api_key=api_key, category_id=category_id,
+                        limit=page_size, offset=offset)
+        series_list = data.get('seriess', [])
+        if series_list:
+            yield series_list
+        offset += page_size
+        if offset >= data.get('count', 0) or not series_list:
+            break
+
+def iter_subcategories(category_id, api_key=config.FRED_API_KEY):
+    """
+    Yield the IDs of a category and all of its descendants, breadth-first.
+    """
+    to_visit = [category_id]
+    while to_visit:
+        current_id = to_visit.pop(0)
+        yield current_id
+        data = fred_get('category/children', api_key=api_key, category_id=current_id)
+        to_visit.extend(category['id'] for category in data.get('categories', []))
+
+def prefetch_category_metadata(category_id, api_key=config.FRED_API_KEY, include_tags=True,
+                               recursive=False, max_workers=DEFAULT_PREFETCH_WORKERS,
+                               tag_series_ids=None, cancel_event=None, background=False):
+    """
+    Warm the metadata and tag caches for every series in a category.
+
+    Series records come in pages of up to 1000 from category/series and are stored
+    in bulk, so metadata costs one request per page. Tags need one request per
+    series and are fetched with bounded concurrency through fetch_series_tags,
+    which skips series whose tags are already stored.
+
+    Parameters:
+    category_id (int): The category to prefetch.
+    api_key (str): Your FRED API key.
+    include_tags (bool): Also prefetch the tags of every series.
+    recursive (bool): Also prefetch every subcategory.
+    max_workers (int): Number of concurrent tag requests.
+    tag_series_ids (list): Only prefetch the tags of these series, e.g. the rows shown to the user.
+    cancel_event (threading.Event): Stop at the next request once set.
+    background (bool): Make the requests inside fred_client.background_requests().
+
+    Returns:
+    int: Number of series prefetched.
+    """
+    cancelled = cancel_event.is_set if cancel_event is not None else lambda: False
+    # The request context is per thread, so the tag workers enter it themselves
+    request_context = background_requests if background else nullcontext
+    category_ids = iter_subcategories(category_id, api_key) if recursive else [category_id]
+    series_ids = []
+    with request_context():
+        for current_id in category_ids:
+            for series_list in iter_category_series(current_id, api_key):
+                put_records(SERIES_INFO_TABLE, {series['id']: series for series in series_list})
+                series_ids.extend(series['id'] for series in series_list)
+                if cancelled():
+                    logging.info(f"Prefetch of category {category_id} cancelled")
+                    return len(series_ids)
+    logging.info(f"Prefetched metadata for {len(series_ids)} series in category {category_id}")
+
+    if include_tags:
+        tag_ids = list(dict.fromkeys(series_ids if tag_series_ids is None else tag_series_ids))
+
+        def prefetch_tags(series_id):
+            if cancelled():
+                return
+            try:
+                with request_context():
+                    fetch_series_tags(series_id)
+            except SeriesNotFoundError as e:
+                logging.warning(f"Skipping tags for missing series: {e}")
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(prefetch_tags, tag_ids))
+        if cancelled():
+            logging.info(f"Prefetch of category {category_id} cancelled")
+        else:
+            logging.info(f"Prefetched tags for {len(tag_ids)} series in category {category_id}")
+    return len(series_ids)
+
+def import_catalog_metadata(catalog_file, batch_size=CATALOG_IMPORT_BATCH_SIZE):
+    """
+    Store the series records of the combined catalog in the metadata store.
+
+    tags/series returns full series records, so this warms the metadata store for
+    every catalogued series without any API request. Records are stamped with the
+    catalog file's modification time rather than the import time, so they expire
+    as the catalog ages, and records fetched after the catalog was written are kept.
+
+    Parameters:
+    catalog_file (str): Path to the combined catalog written by combine_all_source_csv.
+    batch_size (int): Number of records stored per transaction.
+
+    Returns:
+    int: Number of series stored.
+    """
+    fetched_at = os.path.getmtime(catalog_file)
+    catalog = pd.read_parquet(catalog_file).drop(columns=['source_tag'], errors='ignore')
+    stored = 0
+    for start in range(0, len(catalog), batch_size):
+        records = catalog.iloc[start:start + batch_size].to_dict('records')
+        stored += put_records(SERIES_INFO_TABLE, {
+            record['id']: {key: value for key, value in record.items() if not pd.isna(value)}
+            for record in records
+        }, fetched_at=fetched_at, keep_newer=True)
+    logging.info(f"Stored metadata for {stored} of {len(catalog)} catalog series, "
+                 f"{len(catalog) - stored} already had newer records")
+    return stored
+
+_prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch')
+_prefetched_categories = set()
+_prefetch_lock = threading.Lock()
+# (category ID, cancel event, future) of the most recently requested prefetch
+_current_prefetch = None
+
+def start_background_prefetch(category_id, **kwargs):
+    """
+    Prefetch a category in a background thread, replacing any prefetch still queued or running.
+
+    Only the latest selection is worth warming, so a new category cancels the
+    previous prefetch. Requests are made as fred_client.background_requests(),
+    which keeps them within a smaller share of the request budget so interactive
+    requests are not slowed down. Each category is prefetched at most once per
+    process.
+
+    Parameters:
+    category_id (int): The category to prefetch.
+    kwargs: Passed on to prefetch_category_metadata, e.g. tag_series_ids.
+    """
+    global _current_prefetch
+    with _prefetch_lock:
+        if category_id in _prefetched_categories:
+            return
+        if _current_prefetch is not None:
+            current_id, cancel_event, future = _current_prefetch
+            if current_id == category_id and not future.done():
+                return
+            cancel_event.set()
+            future.cancel()
+
+        cancel_event = threading.Event()
+
+        def run():
+            try:
+                prefetch_category_metadata(category_id, cancel_event=cancel_event, background=True,
+                                           max_workers=BACKGROUND_PREFETCH_WORKERS, **kwargs)
+            except Exception as e:
+                logging.error(f"Background prefetch of category {category_id} failed: {e}")
+                return
+            if not cancel_event.is_set():
+                with _prefetch_lock:
+                    _prefetched_categories.add(category_id)
+
+        _current_prefetch = (category_id, cancel_event, _prefetch_executor.submit(run))
+
+
 if __name__ == "__main__":
-    pass
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Prefetch metadata and tags for every series in a category.")
+    parser.add_argument("--category_id", type=int, required=True, help="The category to prefetch.")
+    parser.add_argument("--recursive", action="store_true", help="Also prefetch every subcategory.")
+    parser.add_argument("--no_tags", action="store_true", help="Only prefetch series metadata.")
+    parser.add_argument("--max_workers", type=int, default=DEFAULT_PREFETCH_WORKERS, help="Number of concurrent tag requests.")
+    args = parser.parse_args()
+
+    prefetch_category_metadata(args.category_id, include_tags=not args.no_tags,
+                               recursive=args.recursive, max_workers=args.max_workers)
@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import logging
+import subprocess
+
+# Modules whose startup time is tracked: the CLI scripts and the app's imports
+BENCHMARK_MODULES = [
+    'fred_client',
+    'fred_data_downloader',
+    'fred_categories',
+    'fred_metadata',
+    'fetch_source_tags',
+    'data_sources_downloader',
+    'fetch_series_with_offset',
+    'observation_store',
+    'metadata_store',
+    'search_index',
+    'panel_store',
+    'series_summaries',
+    'utils',
+    'visualizations',
+]
+BASELINE_FILE = 'data/import_times.json'
+DEFAULT_RUNS = 5
+# A module regresses when it imports this much slower than its baseline
+REGRESSION_FACTOR = 1.5
+# Regressions smaller than this many milliseconds are ignored as noise
+REGRESSION_MIN_MS = 50
+# Number of slowest imported packages reported per module
+TOP_IMPORTS = 5
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def parse_importtime(output):
+    """
+    Parse `python -X importtime` output into (module, nesting level, cumulative microseconds) tuples.
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), level, int(cumulative)))
+    return entries
+
+
+def measure_import(module, runs=DEFAULT_RUNS):
+    """
+    Time importing a module in a fresh interpreter.
+
+    Parameters:
+    module (str): Module to import.
+    runs (int): Number of fresh interpreters; the fastest run is kept.
+
+    Returns:
+    dict: 'ms' (total import time) and 'top' (slowest third-party or standard library packages with their ms).
+    """
+    best = None
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed: {result.stderr.strip().splitlines()[-1]}")
+        entries = parse_importtime(result.stderr)
+        total = sum(cumulative for _, level, cumulative in entries if level == 0)
+        if best is None or total < best[0]:
+            best = (total, entries)
+
+    total, entries = best
+    # The outermost import of a package has the largest cumulative time
+    packages = {}
+    for name, _, cumulative in entries:
+        package = name.split('.')[0]
+        if package not in BENCHMARK_MODULES:
+            packages[package] = max(packages.get(package, 0), cumulative)
+    top = sorted(packages.items(), key=lambda item: -item[1])[:TOP_IMPORTS]
+    return {
+        'ms': round(total / 1000, 1),
+        'top': {package: round(cumulative / 1000, 1) for package, cumulative in top},
+    }
+
+
+def run_benchmark(modules=BENCHMARK_MODULES, runs=DEFAULT_RUNS):
+    """
+    Measure the import time of each module.
+
+    Returns:
+    dict: Mapping of module name to its measurement.
+    """
+    results = {}
+    for module in modules:
+        results[module] = measure_import(module, runs)
+        logging.info(f"{module}: {results[module]['ms']} ms (slowest imports: {results[module]['top']})")
+    return results
+
+
+def find_regressions(results, baseline):
+    """
+    Compare measurements with a baseline.
+
+    Returns:
+    list: (module, baseline ms, measured ms) for each module that got noticeably slower.
+    """
+    regressions = []
+    for module, result in results.items():
+        if module not in baseline:
+            continue
+        before, after = baseline[module]['ms'], result['ms']
+        if after > before * REGRESSION_FACTOR and after - before > REGRESSION_MIN_MS:
+            regressions.append((module, before, after))
+    return regressions
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure the import time of the project's scripts.")
+    parser.add_argument("modules", type=str, nargs='*', default=BENCHMARK_MODULES, help="Modules to measure.")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="Fresh interpreters per module.")
+    parser.add_argument("--baseline", type=str, default=BASELINE_FILE, help="Baseline file to compare with.")
+    parser.add_argument("--save", action='store_true', help="Save the measurements as the new baseline.")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.modules, args.runs)
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=2)
+        logging.info(f"Saved baseline to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as file:
+            regressions = find_regressions(results, json.load(file))
+        for module, before, after in regressions:
+            logging.error(f"{module} imports in {after} ms, up from {before} ms")
+        sys.exit(1 if regressions else 0)
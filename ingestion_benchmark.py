@@ -0,0 +1,184 @@
+import os
+import sys
+import json
+import time
+import logging
+import resource
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from mock_fred_server import MockFredServer, SyntheticFred
+
+BASELINE_FILE = 'data/ingestion_benchmark.json'
+BENCHMARKS = ['observations', 'categories', 'series_catalog', 'series_metadata']
+# Client budget used when the mock server has no rate limit, high enough that the fetchers themselves are measured
+BENCHMARK_REQUESTS_PER_MINUTE = 60000
+DEFAULT_SERIES_COUNT = 50
+DEFAULT_CATEGORY_COUNT = 20
+DEFAULT_LATENCY = 0.005
+# A benchmark regresses when its throughput falls below this share of the baseline
+REGRESSION_THRESHOLD = 0.67
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def _bench_observations(options):
+    from fred_data_downloader import download_all_data
+
+    series = [{'series_id': f"BENCH{number}", 'start_date': '1960-01-01', 'end_date': '2024-12-31'}
+              for number in range(options['series_count'])]
+    with open('data_config.json', 'w') as file:
+        json.dump({'series': series}, file)
+    failures = download_all_data('data_config.json')
+    if failures:
+        raise RuntimeError(f"{len(failures)} series failed")
+    import pyarrow.parquet as pq
+    return sum(pq.read_metadata(os.path.join('data', 'observations', f"{entry['series_id']}.parquet")).num_rows
+               for entry in series)
+
+
+def _bench_categories(options):
+    from fred_categories import fetch_all_categories
+
+    return len(fetch_all_categories('benchmark', max_depth=options['category_depth'], checkpoint_file=None))
+
+
+def _bench_series_catalog(options):
+    from fetch_series_with_offset import fetch_series_with_offset
+
+    return fetch_series_with_offset('bench', resume=False)
+
+
+def _bench_series_metadata(options):
+    from fred_metadata import fetch_all_series_metadata
+
+    return sum(len(fetch_all_series_metadata(category_id, api_key='benchmark', limit=1000))
+               for category_id in range(1, options['category_count'] + 1))
+
+
+BENCHMARK_FUNCTIONS = {
+    'observations': _bench_observations,
+    'categories': _bench_categories,
+    'series_catalog': _bench_series_catalog,
+    'series_metadata': _bench_series_metadata,
+}
+
+
+def _run_in_child(name, base_url, workdir, options, requests_per_minute):
+    """
+    Run one benchmark in a fresh process and return its timing and peak memory.
+    """
+    # Keep the project importable once the working directory changes
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(workdir)
+    from fred_client import configure_client
+
+    configure_client(api_key='benchmark', base_url=base_url, requests_per_minute=requests_per_minute)
+    logging.getLogger().setLevel(logging.WARNING)
+    start_time = time.perf_counter()
+    items = BENCHMARK_FUNCTIONS[name](options)
+    seconds = time.perf_counter() - start_time
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    return {'seconds': seconds, 'items': items, 'peak_rss_mb': peak_rss / 2 ** 20}
+
+
+def run_benchmark(name, server, options, requests_per_minute=BENCHMARK_REQUESTS_PER_MINUTE):
+    """
+    Run one ingestion path against the mock server in its own process and temporary folder.
+
+    Returns:
+    dict: Wall time, items ingested, requests, bytes, throughput and peak resident memory.
+    """
+    before = dict(server.stats)
+    with tempfile.TemporaryDirectory() as workdir:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            result = executor.submit(_run_in_child, name, server.base_url, workdir, options, requests_per_minute).result()
+    requests_made = server.stats['requests'] - before.get('requests', 0)
+    bytes_sent = server.stats['bytes_sent'] - before.get('bytes_sent', 0)
+    return {
+        'seconds': round(result['seconds'], 3),
+        'items': result['items'],
+        'items_per_second': round(result['items'] / result['seconds'], 1),
+        'requests': requests_made,
+        'requests_per_second': round(requests_made / result['seconds'], 1),
+        'megabytes': round(bytes_sent / 2 ** 20, 2),
+        'peak_rss_mb': round(result['peak_rss_mb'], 1),
+    }
+
+
+def run_benchmarks(names=BENCHMARKS, series_count=DEFAULT_SERIES_COUNT, category_count=DEFAULT_CATEGORY_COUNT,
+                   latency=DEFAULT_LATENCY, server_requests_per_minute=None):
+    """
+    Measure the throughput of each ingestion path against a local mock FRED API.
+
+    Parameters:
+    names (list): Benchmarks to run, from BENCHMARKS.
+    series_count (int): Series downloaded by the observations benchmark.
+    category_count (int): Categories listed by the series_metadata benchmark.
+    latency (float): Seconds the mock server adds to every response.
+    server_requests_per_minute (int): Rate limit enforced by the mock server, or None. The client
+    is given the same budget, so the benchmark shows throughput under the real API's limit.
+
+    Returns:
+    dict: Mapping of benchmark name to its measurements.
+    """
+    data = SyntheticFred()
+    options = {'series_count': series_count, 'category_count': category_count, 'category_depth': data.category_depth}
+    server = MockFredServer(latency=latency, requests_per_minute=server_requests_per_minute, data=data)
+    server.start()
+    results = {}
+    try:
+        for name in names:
+            results[name] = run_benchmark(name, server, options,
+                                          server_requests_per_minute or BENCHMARK_REQUESTS_PER_MINUTE)
+            logging.info(f"{name}: {results[name]}")
+    finally:
+        server.stop()
+    if server.stats['rate_limited']:
+        logging.info(f"Mock server answered {server.stats['rate_limited']} requests with 429")
+    return results
+
+
+def find_regressions(results, baseline):
+    """
+    Compare throughput with a baseline.
+
+    Returns:
+    list: (benchmark, baseline items/s, measured items/s) for each benchmark that got noticeably slower.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name in baseline and result['items_per_second'] < baseline[name]['items_per_second'] * REGRESSION_THRESHOLD:
+            regressions.append((name, baseline[name]['items_per_second'], result['items_per_second']))
+    return regressions
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the ingestion paths against a local mock FRED API.")
+    parser.add_argument("benchmarks", nargs='*', default=BENCHMARKS, help=f"Benchmarks to run: {', '.join(BENCHMARKS)}.")
+    parser.add_argument("--series_count", type=int, default=DEFAULT_SERIES_COUNT, help="Series downloaded by the observations benchmark.")
+    parser.add_argument("--category_count", type=int, default=DEFAULT_CATEGORY_COUNT, help="Categories listed by the series_metadata benchmark.")
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY, help="Seconds the mock server adds to every response.")
+    parser.add_argument("--server_requests_per_minute", type=int, help="Rate limit enforced by the mock server.")
+    parser.add_argument("--baseline", type=str, default=BASELINE_FILE, help="Baseline file to compare with.")
+    parser.add_argument("--save", action='store_true', help="Save the results as the new baseline.")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.benchmarks, args.series_count, args.category_count, args.latency,
+                             args.server_requests_per_minute)
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=2)
+        logging.info(f"Saved baseline to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as file:
+            regressions = find_regressions(results, json.load(file))
+        for name, before, after in regressions:
+            logging.error(f"{name} ingests {after} items/s, down from {before} items/s")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,255 @@
+import re
+import json
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DEFAULT_METRICS_PORT = 9108
+REDACTED = 'REDACTED'
+# api_key=<value> in URLs and query strings, and 'api_key': '<value>' in dict reprs
+API_KEY_PATTERN = re.compile(r"(api_key['\"]?\s*[=:]\s*['\"]?)[^&\s'\",)]+")
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class MetricsRegistry:
+    """
+    Thread-safe, in-process store of counters and histograms.
+
+    Each update is a dictionary lookup under a lock, so instrumentation can stay
+    on in production. Metrics are exported in the Prometheus text format or as a
+    JSON-serializable snapshot.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.descriptions = {}
+
+    def describe(self, name, description):
+        """
+        Set the help text exported for a metric.
+        """
+        self.descriptions[name] = description
+
+    def increment(self, name, amount=1, **labels):
+        """
+        Add `amount` to a counter.
+        """
+        key = (name, _label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        """
+        Record a value, e.g. a duration in seconds, in a histogram.
+        """
+        key = (name, _label_key(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {'buckets': buckets, 'counts': [0] * len(buckets), 'count': 0, 'sum': 0.0}
+            position = bisect.bisect_left(histogram['buckets'], value)
+            if position < len(buckets):
+                histogram['counts'][position] += 1
+            histogram['count'] += 1
+            histogram['sum'] += value
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        Record the duration of a block in a histogram.
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start_time, **labels)
+
+    def reset(self):
+        """
+        Forget every recorded value.
+        """
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self):
+        """
+        Return every metric as plain data.
+
+        Returns:
+        dict: 'counters' and 'histograms', each a list of entries with 'name' and 'labels'.
+        Histogram entries have 'count', 'sum' and cumulative 'buckets' keyed by upper bound.
+        """
+        with self.lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self.counters.items())]
+            histograms = []
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                cumulative, buckets = 0, {}
+                for bound, count in zip(histogram['buckets'], histogram['counts']):
+                    cumulative += count
+                    buckets[str(bound)] = cumulative
+                histograms.append({'name': name, 'labels': dict(labels), 'count': histogram['count'],
+                                   'sum': histogram['sum'], 'buckets': buckets})
+        return {'timestamp': time.time(), 'counters': counters, 'histograms': histograms}
+
+    def to_prometheus(self):
+        """
+        Return every metric in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in self.descriptions:
+                    lines.append(f"# HELP {name} {self.descriptions[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for counter in snapshot['counters']:
+            header(counter['name'], 'counter')
+            lines.append(f"{counter['name']}{_format_labels(_label_key(counter['labels']))} {counter['value']}")
+        for histogram in snapshot['histograms']:
+            name, label_key = histogram['name'], _label_key(histogram['labels'])
+            header(name, 'histogram')
+            for bound, count in histogram['buckets'].items():
+                lines.append(f"{name}_bucket{_format_labels(label_key, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{_format_labels(label_key, [('le', '+Inf')])} {histogram['count']}")
+            lines.append(f"{name}_sum{_format_labels(label_key)} {histogram['sum']}")
+            lines.append(f"{name}_count{_format_labels(label_key)} {histogram['count']}")
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry used by the project's modules
+metrics = MetricsRegistry()
+metrics.describe('fred_request_seconds', "Latency of FRED API requests by endpoint.")
+metrics.describe('fred_requests_total', "FRED API responses by endpoint and status code.")
+metrics.describe('fred_response_bytes_total', "Bytes received from the FRED API by endpoint.")
+metrics.describe('fred_retries_total', "Retried FRED API requests by endpoint and reason.")
+metrics.describe('fred_rate_limit_wait_seconds', "Time spent waiting for the client-side rate limiter.")
+metrics.describe('cache_requests_total', "Cache lookups by cache and result.")
+metrics.describe('app_stage_seconds', "Duration of the Streamlit app's stages per rerun.")
+
+
+def write_snapshot(path, registry=metrics):
+    """
+    Write a JSON snapshot of the metrics to a file.
+    """
+    with open(path, 'w') as file:
+        json.dump(registry.snapshot(), file, indent=2)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=DEFAULT_METRICS_PORT, host='127.0.0.1', registry=metrics):
+    """
+    Serve the metrics over HTTP in a background thread, at most once per process.
+
+    /metrics returns the Prometheus text format and /metrics.json a JSON snapshot.
+
+    Returns:
+    http.server.ThreadingHTTPServer: The running server.
+    """
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith('/metrics.json'):
+                body, content_type = json.dumps(registry.snapshot()).encode(), 'application/json'
+            elif self.path.startswith('/metrics'):
+                body, content_type = registry.to_prometheus().encode(), 'text/plain; version=0.0.4'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), Handler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True, name='metrics').start()
+            logging.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return _server
+
+
+def redact(text, secrets=()):
+    """
+    Replace API keys in a string: api_key query parameters and any of the given secret values.
+    """
+    text = API_KEY_PATTERN.sub(rf"\g<1>{REDACTED}", text)
+    for secret in secrets:
+        if secret:
+            text = text.replace(secret, REDACTED)
+    return text
+
+
+class RedactingFilter(logging.Filter):
+    """
+    Logging filter that removes API keys from log messages.
+
+    Parameters:
+    secrets (tuple): Secret values to remove wherever they appear.
+    """
+
+    def __init__(self, secrets=()):
+        super().__init__()
+        self.secrets = ()
+        self.add_secrets(secrets)
+
+    def add_secrets(self, secrets):
+        """
+        Also remove these secret values from log messages.
+        """
+        self.secrets = tuple(dict.fromkeys(self.secrets + tuple(secret for secret in secrets if secret)))
+
+    def filter(self, record):
+        message = record.getMessage()
+        if 'api_key' in message or any(secret in message for secret in self.secrets):
+            record.msg = redact(message, self.secrets)
+            record.args = None
+        return True
+
+
+def install_log_redaction(secrets=()):
+    """
+    Add a RedactingFilter to every handler of the root logger.
+
+    Handlers that already have one get the secrets added to it, so modules can
+    each register their own keys. Handler filters also apply to records
+    propagated from library loggers such as urllib3, which log request URLs.
+    """
+    for handler in logging.getLogger().handlers:
+        existing = [existing for existing in handler.filters if isinstance(existing, RedactingFilter)]
+        if existing:
+            existing[0].add_secrets(secrets)
+        else:
+            handler.addFilter(RedactingFilter(secrets))
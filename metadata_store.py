@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+METADATA_DB_PATH = 'data/metadata.db'
+SERIES_INFO_TABLE = 'series_info'
+SERIES_TAGS_TABLE = 'series_tags'
+# Series IDs the API reported as missing, with the error message
+MISSING_SERIES_TABLE = 'missing_series'
+# Offline LLM summaries of series, with the model and series version they were made from
+SERIES_SUMMARIES_TABLE = 'series_summaries'
+# LLM responses keyed by a hash of the model, prompts and series version
+LLM_RESPONSES_TABLE = 'llm_responses'
+# Seconds a connection waits for a lock held by another writer
+BUSY_TIMEOUT = 30
+# Number of rows written per transaction during bulk imports
+IMPORT_BATCH_SIZE = 5000
+# Number of series IDs looked up per query, below SQLite's limit on query parameters
+LOOKUP_BATCH_SIZE = 900
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+_local = threading.local()
+
+
+def get_connection(db_path=METADATA_DB_PATH):
+    """
+    Return this thread's connection to the metadata database, creating the schema on first use.
+
+    Parameters:
+    db_path (str): Path to the SQLite database file.
+
+    Returns:
+    sqlite3.Connection: Connection usable from the calling thread.
+    """
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    if db_path not in connections:
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        connection = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        for table in (SERIES_INFO_TABLE, SERIES_TAGS_TABLE, MISSING_SERIES_TABLE, SERIES_SUMMARIES_TABLE):
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "series_id TEXT PRIMARY KEY, data TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {LLM_RESPONSES_TABLE} ("
+            "cache_key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        connection.commit()
+        connections[db_path] = connection
+    return connections[db_path]
+
+
+def get_record(table, series_id, db_path=METADATA_DB_PATH):
+    """
+    Look up the stored record of a series.
+
+    Parameters:
+    table (str): One of the series tables, e.g. SERIES_INFO_TABLE.
+    series_id (str): Series ID to look up.
+    db_path (str): Path to the SQLite database file.
+
+    Returns:
+    tuple: (decoded JSON data, fetched_at timestamp), or None if the series is not stored.
+    """
+    row = get_connection(db_path).execute(
+        f"SELECT data, fetched_at FROM {table} WHERE series_id = ?", (series_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    return json.loads(row[0]), row[1]
+
+
+def get_records(table, series_ids, db_path=METADATA_DB_PATH):
+    """
+    Look up the stored records of many series with one query per LOOKUP_BATCH_SIZE IDs.
+
+    Parameters:
+    table (str): One of the series tables, e.g. SERIES_INFO_TABLE.
+    series_ids (list): Series IDs to look up.
+    db_path (str): Path to the SQLite database file.
+
+    Returns:
+    dict: Mapping of series ID to (decoded JSON data, fetched_at timestamp), for the stored series only.
+    """
+    connection = get_connection(db_path)
+    series_ids = list(series_ids)
+    records = {}
+    for start in range(0, len(series_ids), LOOKUP_BATCH_SIZE):
+        batch = series_ids[start:start + LOOKUP_BATCH_SIZE]
+        rows = connection.execute(
+            f"SELECT series_id, data, fetched_at FROM {table} WHERE series_id IN ({', '.join('?' * len(batch))})",
+            batch
+        )
+        for series_id, data, fetched_at in rows:
+            records[series_id] = (json.loads(data), fetched_at)
+    return records
+
+
+def put_record(table, series_id, data, fetched_at=None, db_path=METADATA_DB_PATH):
+    """
+    Insert or replace the stored record of a series.
+
+    Parameters:
+    table (str): One of the series tables, e.g. SERIES_INFO_TABLE.
+    series_id (str): Series ID of the record.
+    data (dict): JSON-serializable data to store.
+    fetched_at (float): Time the data was fetched. Defaults to now.
+    db_path (str): Path to the SQLite database file.
+    """
+    connection = get_connection(db_path)
+    with connection:
+        connection.execute(
+            f"INSERT OR REPLACE INTO {table} (series_id, data, fetched_at) VALUES (?, ?, ?)",
+            (series_id, json.dumps(data), time.time() if fetched_at is None else fetched_at)
+        )
+
+
+def put_records(table, records, fetched_at=None, keep_newer=False, db_path=METADATA_DB_PATH):
+    """
+    Insert or replace many records in a single transaction.
+
+    Parameters:
+    table (str): One of the series tables, e.g. SERIES_INFO_TABLE.
+    records (dict): Mapping of series ID to JSON-serializable data.
+    fetched_at (float): Time the data was fetched. Defaults to now.
+    keep_newer (bool): Leave stored records fetched after `fetched_at` unchanged.
+    db_path (str): Path to the SQLite database file.
+
+    Returns:
+    int: Number of records written.
+    """
+    fetched_at = time.time() if fetched_at is None else fetched_at
+    if keep_newer:
+        statement = (f"INSERT INTO {table} (series_id, data, fetched_at) VALUES (?, ?, ?) "
+                     "ON CONFLICT (series_id) DO UPDATE SET data = excluded.data, fetched_at = excluded.fetched_at "
+                     f"WHERE excluded.fetched_at > {table}.fetched_at")
+    else:
+        statement = f"INSERT OR REPLACE INTO {table} (series_id, data, fetched_at) VALUES (?, ?, ?)"
+    connection = get_connection(db_path)
+    with connection:
+        cursor = connection.executemany(
+            statement, ((series_id, json.dumps(data), fetched_at) for series_id, data in records.items())
+        )
+    return cursor.rowcount
+
+
+def get_llm_response(cache_key, db_path=METADATA_DB_PATH):
+    """
+    Return the stored LLM response for a cache key, or None.
+    """
+    row = get_connection(db_path).execute(
+        f"SELECT response FROM {LLM_RESPONSES_TABLE} WHERE cache_key = ?", (cache_key,)
+    ).fetchone()
+    return None if row is None else row[0]
+
+
+def put_llm_response(cache_key, model, response, db_path=METADATA_DB_PATH):
+    """
+    Store an LLM response under a cache key.
+    """
+    connection = get_connection(db_path)
+    with connection:
+        connection.execute(
+            f"INSERT OR REPLACE INTO {LLM_RESPONSES_TABLE} (cache_key, model, response, created_at) VALUES (?, ?, ?, ?)",
+            (cache_key, model, response, time.time())
+        )
+
+
+def import_json_folder(folder, table, db_path=METADATA_DB_PATH):
+    """
+    Bulk import a folder of `<series_id>.json` files into the metadata database.
+
+    Parameters:
+    folder (str): Folder containing the JSON files.
+    table (str): SERIES_INFO_TABLE or SERIES_TAGS_TABLE.
+    db_path (str): Path to the SQLite database file.
+
+    Returns:
+    int: Number of imported records.
+    """
+    if not os.path.isdir(folder):
+        return 0
+    connection = get_connection(db_path)
+    imported = 0
+    batch = []
+
+    def flush():
+        with connection:
+            connection.executemany(
+                f"INSERT OR REPLACE INTO {table} (series_id, data, fetched_at) VALUES (?, ?, ?)", batch
+            )
+        batch.clear()
+
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if not entry.name.endswith('.json'):
+                continue
+            with open(entry.path, 'r') as file:
+                data = file.read()
+            batch.append((entry.name[:-len('.json')], data, entry.stat().st_mtime))
+            imported += 1
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                flush()
+    if batch:
+        flush()
+    logging.info(f"Imported {imported} records from {folder} into {table}")
+    return imported
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import per-series metadata JSON files into the metadata database.")
+    parser.add_argument("--series_info_folder", type=str, default='data/series_info', help="Folder with series info JSON files.")
+    parser.add_argument("--series_tags_folder", type=str, default='data/series_tags', help="Folder with series tags JSON files.")
+    parser.add_argument("--db_path", type=str, default=METADATA_DB_PATH, help="Path to the SQLite database file.")
+    args = parser.parse_args()
+
+    import_json_folder(args.series_info_folder, SERIES_INFO_TABLE, args.db_path)
+    import_json_folder(args.series_tags_folder, SERIES_TAGS_TABLE, args.db_path)
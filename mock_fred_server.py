@@ -0,0 +1,395 @@
+import os
+import json
+import time
+import zlib
+import logging
+import threading
+from datetime import date
+from collections import Counter
+from urllib.parse import urlparse, parse_qsl, urlencode
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from fred_client import TokenBucket
+
+# Synthetic FRED universe served by default
+DEFAULT_CATEGORY_DEPTH = 3
+DEFAULT_CATEGORY_BRANCHING = 4
+DEFAULT_SERIES_PER_CATEGORY = 2500
+DEFAULT_SERIES_PER_TAG = 5000
+DEFAULT_SOURCE_COUNT = 20
+# Observation periods of synthetic series, picked from the series ID
+SYNTHETIC_FREQUENCIES = [('D', 'Daily'), ('W', 'Weekly'), ('M', 'Monthly'), ('Q', 'Quarterly')]
+SYNTHETIC_PERIODS = {'D': 'D', 'W': 'W-FRI', 'M': 'MS', 'Q': 'QS'}
+SYNTHETIC_START = '1960-01-01'
+SYNTHETIC_END = '2024-12-31'
+SYNTHETIC_LAST_UPDATED = '2025-01-02 08:01:02-06'
+# Share of synthetic observations reported as missing ('.')
+MISSING_VALUE_RATE = 0.01
+# Series IDs with this prefix are reported as missing
+MISSING_SERIES_PREFIX = 'MISSING'
+# Maximum page size FRED allows on paged endpoints
+MAX_PAGE_SIZE = 1000
+# Query parameters that do not identify a recorded response
+UNRECORDED_PARAMS = ('api_key', 'file_type')
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class FredApiError(Exception):
+    """
+    An error response of the mock API, rendered like FRED's JSON errors.
+    """
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+def series_seed(series_id):
+    """
+    Return a stable integer derived from a series ID.
+    """
+    return zlib.crc32(series_id.encode())
+
+
+def synthetic_series(series_id):
+    """
+    Return a deterministic FRED-like series record for any series ID.
+    """
+    frequency_short, frequency = SYNTHETIC_FREQUENCIES[series_seed(series_id) % len(SYNTHETIC_FREQUENCIES)]
+    return {
+        'id': series_id,
+        'realtime_start': date.today().isoformat(),
+        'realtime_end': date.today().isoformat(),
+        'title': f"Synthetic Series {series_id}",
+        'observation_start': SYNTHETIC_START,
+        'observation_end': SYNTHETIC_END,
+        'frequency': frequency,
+        'frequency_short': frequency_short,
+        'units': 'Index',
+        'units_short': 'Index',
+        'seasonal_adjustment': 'Not Seasonally Adjusted',
+        'seasonal_adjustment_short': 'NSA',
+        'last_updated': SYNTHETIC_LAST_UPDATED,
+        'popularity': series_seed(series_id) % 100,
+        'notes': f"Synthetic data generated for {series_id}.",
+    }
+
+
+def synthetic_observations(series_id, observation_start=None, observation_end=None):
+    """
+    Return deterministic observations of a synthetic series as FRED observation dicts.
+
+    Values follow a seeded random walk; a small share is reported as missing.
+    """
+    series = synthetic_series(series_id)
+    all_dates = pd.date_range(SYNTHETIC_START, SYNTHETIC_END, freq=SYNTHETIC_PERIODS[series['frequency_short']])
+    rng = np.random.default_rng(series_seed(series_id))
+    values = np.round(100 + np.cumsum(rng.normal(0, 1, len(all_dates))), 3).astype(str)
+    values[rng.random(len(all_dates)) < MISSING_VALUE_RATE] = '.'
+
+    keep = np.ones(len(all_dates), dtype=bool)
+    if observation_start:
+        keep &= all_dates >= pd.Timestamp(observation_start)
+    if observation_end:
+        keep &= all_dates <= pd.Timestamp(observation_end)
+    realtime = date.today().isoformat()
+    return [
+        {'realtime_start': realtime, 'realtime_end': realtime, 'date': day, 'value': value}
+        for day, value in zip(all_dates[keep].strftime('%Y-%m-%d'), values[keep])
+    ]
+
+
+class SyntheticFred:
+    """
+    Generates responses for the FRED endpoints the project uses.
+
+    Categories form a tree: the children of category `c` are `c * 10 + k` for
+    k = 1..branching, down to `category_depth` levels. Every series ID exists
+    except those starting with MISSING_SERIES_PREFIX.
+    """
+
+    def __init__(self, category_depth=DEFAULT_CATEGORY_DEPTH, category_branching=DEFAULT_CATEGORY_BRANCHING,
+                 series_per_category=DEFAULT_SERIES_PER_CATEGORY, series_per_tag=DEFAULT_SERIES_PER_TAG,
+                 source_count=DEFAULT_SOURCE_COUNT):
+        self.category_depth = category_depth
+        self.category_branching = min(category_branching, 9)
+        self.series_per_category = series_per_category
+        self.series_per_tag = series_per_tag
+        self.source_count = source_count
+        self.handlers = {
+            'series': self.series,
+            'series/tags': self.series_tags,
+            'series/observations': self.series_observations,
+            'category/children': self.category_children,
+            'category/series': self.category_series,
+            'tags/series': self.tags_series,
+            'sources': self.sources,
+            'tags': self.tags,
+        }
+
+    def respond(self, endpoint, params):
+        """
+        Return the decoded JSON response of an endpoint.
+
+        Raises:
+        FredApiError: For unknown endpoints, missing parameters and missing series.
+        """
+        if endpoint not in self.handlers:
+            raise FredApiError(404, f"Not Found. Endpoint {endpoint} is not served by the mock API.")
+        try:
+            return self.handlers[endpoint](params)
+        except KeyError as e:
+            raise FredApiError(400, f"Bad Request.  Variable {e.args[0]} is not set.")
+
+    @staticmethod
+    def _page(params, count):
+        limit = min(int(params.get('limit', MAX_PAGE_SIZE)), MAX_PAGE_SIZE)
+        offset = int(params.get('offset', 0))
+        return range(offset, min(count, offset + limit)), limit, offset
+
+    @staticmethod
+    def _check_series(series_id):
+        if series_id.startswith(MISSING_SERIES_PREFIX):
+            raise FredApiError(400, "Bad Request.  The series does not exist.")
+
+    def series(self, params):
+        self._check_series(params['series_id'])
+        return {'seriess': [synthetic_series(params['series_id'])]}
+
+    def series_tags(self, params):
+        series_id = params['series_id']
+        self._check_series(series_id)
+        series = synthetic_series(series_id)
+        tags = [
+            {'name': series['frequency'].lower(), 'group_id': 'freq', 'popularity': 90, 'series_count': 1000},
+            {'name': 'nsa', 'group_id': 'seas', 'popularity': 80, 'series_count': 1000},
+            {'name': f"src{series_seed(series_id) % self.source_count}", 'group_id': 'src', 'popularity': 70,
+             'series_count': self.series_per_tag},
+        ]
+        return {'count': len(tags), 'offset': 0, 'limit': 1000, 'tags': tags}
+
+    def series_observations(self, params):
+        self._check_series(params['series_id'])
+        observations = synthetic_observations(params['series_id'], params.get('observation_start'),
+                                              params.get('observation_end'))
+        return {'count': len(observations), 'offset': 0, 'limit': 100000, 'observations': observations}
+
+    def _category_depth(self, category_id):
+        return len(str(category_id)) if category_id else 0
+
+    def category_children(self, params):
+        category_id = int(params['category_id'])
+        if self._category_depth(category_id) >= self.category_depth:
+            return {'categories': []}
+        return {'categories': [
+            {'id': category_id * 10 + k, 'name': f"Category {category_id * 10 + k}", 'parent_id': category_id, 'notes': ''}
+            for k in range(1, self.category_branching + 1)
+        ]}
+
+    def category_series(self, params):
+        category_id = int(params['category_id'])
+        positions, limit, offset = self._page(params, self.series_per_category)
+        return {'count': self.series_per_category, 'offset': offset, 'limit': limit,
+                'seriess': [synthetic_series(f"C{category_id}S{position}") for position in positions]}
+
+    def tags_series(self, params):
+        tag = ''.join(character for character in params['tag_names'].upper() if character.isalnum())
+        positions, limit, offset = self._page(params, self.series_per_tag)
+        return {'count': self.series_per_tag, 'offset': offset, 'limit': limit,
+                'seriess': [synthetic_series(f"{tag}{position}") for position in positions]}
+
+    def sources(self, params):
+        return {'count': self.source_count, 'sources': [
+            {'id': number + 1, 'name': f"Synthetic Source {number}", 'link': f"https://example.com/{number}"}
+            for number in range(self.source_count)
+        ]}
+
+    def tags(self, params):
+        group_id = params.get('tag_group_id', 'src')
+        return {'count': self.source_count, 'tags': [
+            {'name': f"src{number}", 'group_id': group_id, 'notes': f"Synthetic Source {number}",
+             'created': '2012-02-27 10:18:19-06', 'popularity': 50, 'series_count': self.series_per_tag}
+            for number in range(self.source_count)
+        ]}
+
+
+def recording_path(recordings_folder, endpoint, params):
+    """
+    Return the file holding the recorded response of a request.
+    """
+    query = urlencode(sorted((key, value) for key, value in params.items() if key not in UNRECORDED_PARAMS))
+    name = ''.join(character if character.isalnum() or character in '-_.=' else '_' for character in query) or 'default'
+    return os.path.join(recordings_folder, endpoint.replace('/', '_'), f"{name}.json")
+
+
+class MockFredServer:
+    """
+    Local stand-in for the FRED API.
+
+    Serves recorded responses when a recording of the request exists and
+    synthetic ones otherwise. It can add latency to every response and enforce
+    a per-key rate limit, answering 429 with a Retry-After header like the
+    real API. Request counts and bytes sent are kept in `stats`.
+
+    Parameters:
+    host (str): Interface to listen on.
+    port (int): Port to listen on; 0 picks a free one.
+    latency (float): Seconds added to every response.
+    requests_per_minute (int): Per-key rate limit, or None for no limit.
+    recordings_folder (str): Folder of recorded responses, see recording_path.
+    data (SyntheticFred): Generator of synthetic responses.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, requests_per_minute=None,
+                 recordings_folder=None, data=None):
+        self.latency = latency
+        self.requests_per_minute = requests_per_minute
+        self.recordings_folder = recordings_folder
+        self.data = data or SyntheticFred()
+        self.stats = Counter()
+        self.stats_lock = threading.Lock()
+        self.limiters = {}
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/fred"
+
+    def _count(self, **counts):
+        with self.stats_lock:
+            self.stats.update(counts)
+
+    def _rate_limited(self, api_key):
+        if self.requests_per_minute is None:
+            return False
+        with self.stats_lock:
+            limiter = self.limiters.get(api_key)
+            if limiter is None:
+                # Allow a second's worth of burst so a client pacing itself at the limit is not refused for jitter
+                limiter = self.limiters[api_key] = TokenBucket(rate=self.requests_per_minute / 60,
+                                                               capacity=max(1, self.requests_per_minute / 60))
+        return not limiter.try_acquire()
+
+    def handle(self, endpoint, params):
+        """
+        Return (status code, headers, decoded JSON body) for a request.
+        """
+        self._count(requests=1, **{f"requests:{endpoint}": 1})
+        if self.latency:
+            time.sleep(self.latency)
+        if not params.get('api_key'):
+            return 400, {}, {'error_code': 400, 'error_message': "Bad Request.  Variable api_key is not set."}
+        if self._rate_limited(params['api_key']):
+            self._count(rate_limited=1)
+            return 429, {'Retry-After': '1'}, {'error_code': 429, 'error_message': "Too Many Requests.  Exceeded Rate Limit"}
+
+        if self.recordings_folder:
+            path = recording_path(self.recordings_folder, endpoint, params)
+            if os.path.exists(path):
+                self._count(recorded=1)
+                with open(path, 'r') as file:
+                    return 200, {}, json.load(file)
+        try:
+            return 200, {}, self.data.respond(endpoint, params)
+        except FredApiError as e:
+            return e.status_code, {}, {'error_code': e.status_code, 'error_message': e.message}
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                endpoint = url.path.split('/fred/', 1)[-1].strip('/')
+                status_code, headers, body = mock.handle(endpoint, dict(parse_qsl(url.query)))
+                payload = json.dumps(body).encode()
+                self.send_response(status_code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+                mock._count(bytes_sent=len(payload))
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """
+        Serve requests in a background thread and return the base URL.
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True, name='mock-fred')
+        self.thread.start()
+        logging.info(f"Mock FRED API listening on {self.base_url}")
+        return self.base_url
+
+    def stop(self):
+        """
+        Stop serving and close the socket.
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def record_responses(requests_file, recordings_folder):
+    """
+    Fetch requests from the live API and save them as recordings for the mock server.
+
+    Parameters:
+    requests_file (str): JSON list of {"endpoint": ..., "params": {...}} objects.
+    recordings_folder (str): Folder to save the recordings in.
+
+    Returns:
+    int: Number of recorded responses.
+    """
+    from fred_client import fred_get
+
+    with open(requests_file, 'r') as file:
+        requests_to_record = json.load(file)
+    for request in requests_to_record:
+        params = {key: str(value) for key, value in request.get('params', {}).items()}
+        path = recording_path(recordings_folder, request['endpoint'], params)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(fred_get(request['endpoint'], **params), file)
+        logging.info(f"Recorded {request['endpoint']} {params} to {path}")
+    return len(requests_to_record)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the FRED API.")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response.")
+    parser.add_argument("--requests_per_minute", type=int, help="Per-key rate limit to enforce.")
+    parser.add_argument("--recordings_folder", type=str, help="Folder of recorded responses to serve.")
+    parser.add_argument("--record", type=str, metavar='REQUESTS_FILE',
+                        help="Record the requests listed in this JSON file from the live API into --recordings_folder, then exit.")
+    args = parser.parse_args()
+
+    if args.record:
+        record_responses(args.record, args.recordings_folder)
+    else:
+        server = MockFredServer(port=args.port, latency=args.latency, requests_per_minute=args.requests_per_minute,
+                                recordings_folder=args.recordings_folder)
+        server.start()
+        logging.info("Point FredClient(base_url=...) at this URL; press Ctrl+C to stop")
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            server.stop()
@@ -0,0 +1,150 @@
+import re
+import json
+import time
+import logging
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Series IDs of the series described in a summarization prompt, see series_summaries.describe_series
+SERIES_ID_PATTERN = re.compile(r'^Series ID: (\S+)$', re.MULTILINE)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def default_reply(request):
+    """
+    Return the reply of the mock model to a chat completion request.
+
+    Summarization prompts get a JSON object mapping every described series ID
+    to a summary, as series_summaries expects. Other prompts get a fixed sentence.
+    """
+    user_prompt = request['messages'][-1]['content']
+    series_ids = SERIES_ID_PATTERN.findall(user_prompt)
+    if series_ids:
+        return json.dumps({series_id: f"Summary of {series_id}." for series_id in series_ids})
+    return f"Mock response from {request['model']}."
+
+
+class MockOpenAIServer:
+    """
+    Local HTTP server answering the OpenAI chat completions endpoint.
+
+    Point the client at it with `OPENAI_BASE_URL` set to `base_url`. Both plain
+    and streamed (`stream: true`) completions are served. Request counts are kept
+    in `stats`, and the decoded request bodies in `received`.
+
+    Parameters:
+    host (str): Interface to listen on.
+    port (int): Port to listen on; 0 picks a free one.
+    latency (float): Seconds added to every response.
+    reply (callable): Called with the decoded request body, returns the completion text.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, reply=default_reply):
+        self.latency = latency
+        self.reply = reply
+        self.stats = Counter()
+        self.received = []
+        self.stats_lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def handle(self, request):
+        """
+        Return (status code, completion text or error message) for a decoded request body.
+        """
+        with self.stats_lock:
+            self.stats.update(requests=1)
+            self.received.append(request)
+        if self.latency:
+            time.sleep(self.latency)
+        if not request.get('model') or not request.get('messages'):
+            return 400, "Both 'model' and 'messages' are required."
+        return 200, self.reply(request)
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _send(self, status_code, payload, content_type='application/json'):
+                self.send_response(status_code)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if self.path.rstrip('/') != '/v1/chat/completions':
+                    self._send(404, json.dumps({'error': {'message': f"Unknown path {self.path}"}}).encode())
+                    return
+                request = json.loads(body or b'{}')
+                status_code, text = mock.handle(request)
+                if status_code != 200:
+                    self._send(status_code, json.dumps({'error': {'message': text}}).encode())
+                    return
+
+                completion = {'id': f"chatcmpl-mock{mock.stats['requests']}", 'created': int(time.time()),
+                              'model': request['model']}
+                if request.get('stream'):
+                    chunks = [dict(completion, object='chat.completion.chunk', choices=[
+                        {'index': 0, 'delta': delta, 'finish_reason': finish_reason}])
+                        for delta, finish_reason in [({'role': 'assistant', 'content': text}, None), ({}, 'stop')]]
+                    payload = ''.join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks) + "data: [DONE]\n\n"
+                    self._send(200, payload.encode(), 'text/event-stream')
+                    return
+                prompt_tokens = sum(len(message['content'].split()) for message in request['messages'])
+                completion_tokens = len(text.split())
+                completion.update(object='chat.completion', choices=[
+                    {'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}
+                ], usage={'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                          'total_tokens': prompt_tokens + completion_tokens})
+                self._send(200, json.dumps(completion).encode())
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """
+        Serve requests in a background thread and return the base URL.
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True, name='mock-openai')
+        self.thread.start()
+        logging.info(f"Mock OpenAI API listening on {self.base_url}")
+        return self.base_url
+
+    def stop(self):
+        """
+        Stop serving and close the socket.
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the OpenAI chat completions API.")
+    parser.add_argument("--port", type=int, default=8766, help="Port to listen on.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response.")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(port=args.port, latency=args.latency)
+    server.start()
+    logging.info("Set OPENAI_BASE_URL in config.py to this URL; press Ctrl+C to stop")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
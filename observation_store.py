@@ -0,0 +1,217 @@
+import os
+import re
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+OBSERVATIONS_FOLDER = 'data/observations'
+# Key under which the series metadata is stored in the Parquet schema metadata
+SERIES_INFO_METADATA_KEY = b'series_info'
+# Key under which sync_series_data records when and from which date the observations were fetched
+SYNC_STATE_METADATA_KEY = b'sync_state'
+# FRED uses '.' for missing observations
+MISSING_VALUE = '.'
+# Observation fields read straight from the raw series/observations response
+OBSERVATION_FIELDS = ('realtime_start', 'realtime_end', 'date', 'value')
+FIELD_PATTERNS = {field: re.compile(rb'"%s"\s*:\s*"([^"]*)"' % field.encode()) for field in OBSERVATION_FIELDS}
+PAGING_PATTERNS = {field: re.compile(rb'"%s"\s*:\s*(\d+)' % field.encode()) for field in ('count', 'offset', 'limit')}
+# FRED marks the current vintage with a realtime_end of 9999-12-31, beyond the range of datetime64[ns]
+REALTIME_RESOLUTION = 'datetime64[s]'
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def observation_path(series_id, data_folder=OBSERVATIONS_FOLDER):
+    """
+    Return the path of the Parquet file holding the observations of a series.
+    """
+    return os.path.join(data_folder, f"{series_id}.parquet")
+
+def _parse_dates(values, dtype='datetime64[ns]'):
+    """
+    Convert YYYY-MM-DD strings or bytes to a datetime64 array.
+    """
+    return np.array(values).astype('datetime64[D]').astype(dtype)
+
+def _parse_values(values):
+    """
+    Convert observation value strings or bytes to a float64 array, with NaN for missing values.
+
+    The conversion is done on the whole array: missing markers are replaced by
+    'nan' with one comparison, then every value is parsed by numpy at once.
+    """
+    values = np.array(values)
+    if values.dtype.kind == 'S':
+        values = np.where(values == MISSING_VALUE.encode(), b'nan', values)
+    elif values.dtype.kind == 'U':
+        values = np.where(values == MISSING_VALUE, 'nan', values)
+    return values.astype('float64')
+
+def parse_observations(content, include_realtime=False):
+    """
+    Parse a raw series/observations response body into typed columns.
+
+    The fields are extracted from the body with regular expressions and converted
+    column by column, so no per-observation objects are built. Responses whose
+    field counts do not match the page size implied by `count`, `offset` and
+    `limit` fall back to decoding the whole document.
+
+    Parameters:
+    content (bytes): Response body of the series/observations endpoint.
+    include_realtime (bool): Also return the `realtime_start` and `realtime_end` columns.
+
+    Returns:
+    pd.DataFrame: datetime64 `date` and float64 `value` (NaN for missing) columns,
+    preceded by the realtime columns (second resolution) if requested.
+    """
+    fields = OBSERVATION_FIELDS if include_realtime else ('date', 'value')
+    start = content.find(b'"observations"')
+    header = content[:start] if start >= 0 else b''
+    paging = {}
+    for field, pattern in PAGING_PATTERNS.items():
+        match = pattern.search(header)
+        if match:
+            paging[field] = int(match.group(1))
+    columns = None
+    if 'count' in paging:
+        expected = paging['count'] - paging.get('offset', 0)
+        if 'limit' in paging:
+            expected = min(expected, paging['limit'])
+        # The observations array comes after the top-level realtime fields
+        columns = {field: FIELD_PATTERNS[field].findall(content, start) for field in fields}
+        if any(len(values) != expected for values in columns.values()):
+            columns = None
+    if columns is None:
+        from fred_client import json_loads
+
+        observations = json_loads(content)['observations']
+        columns = {field: [observation[field] for observation in observations] for field in fields}
+    return pd.DataFrame({
+        field: _parse_values(values) if field == 'value'
+        else _parse_dates(values) if field == 'date'
+        else _parse_dates(values, REALTIME_RESOLUTION)
+        for field, values in columns.items()
+    })
+
+def to_observation_frame(df):
+    """
+    Reduce an observations DataFrame to typed `date` and `value` columns.
+
+    Parameters:
+    df (pd.DataFrame): Observations as returned by the FRED API (string columns) or by parse_observations.
+
+    Returns:
+    pd.DataFrame: DataFrame with datetime64 `date` and float64 `value` (NaN for missing).
+    """
+    if not df.empty and pd.api.types.is_datetime64_dtype(df['date']) and df['value'].dtype == 'float64':
+        return df[['date', 'value']].reset_index(drop=True)
+    if df.empty:
+        return pd.DataFrame({'date': pd.Series(dtype='datetime64[ns]'), 'value': pd.Series(dtype='float64')})
+    return pd.DataFrame({
+        'date': pd.to_datetime(df['date']),
+        'value': pd.to_numeric(df['value'].replace(MISSING_VALUE, None), errors='coerce').astype('float64'),
+    })
+
+def save_observations(df, series_id, series_info, data_folder=OBSERVATIONS_FOLDER, sync_state=None):
+    """
+    Save the observations of a series as Parquet, storing its metadata once in the file schema.
+
+    Parameters:
+    df (pd.DataFrame): Observations with `date` and `value` columns.
+    series_id (str): Series ID for naming the file.
+    series_info (dict): Series metadata as returned by fetch_series_info.
+    data_folder (str): Folder to save the Parquet file in.
+    sync_state (dict): Optional sync bookkeeping stored alongside the metadata.
+
+    Returns:
+    str: Path of the written file.
+    """
+    os.makedirs(data_folder, exist_ok=True)
+    file_path = observation_path(series_id, data_folder)
+    table = pa.Table.from_pandas(to_observation_frame(df), preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[SERIES_INFO_METADATA_KEY] = json.dumps(series_info).encode()
+    if sync_state is not None:
+        metadata[SYNC_STATE_METADATA_KEY] = json.dumps(sync_state).encode()
+    table = table.replace_schema_metadata(metadata)
+    logging.info(f"Saving {table.num_rows} observations to file: {file_path}")
+    tmp_path = f"{file_path}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, file_path)
+    return file_path
+
+def read_observation_file(file_path):
+    """
+    Read a Parquet observation file.
+
+    Parameters:
+    file_path (str): Path to the Parquet file.
+
+    Returns:
+    pd.DataFrame: Observations, with the series metadata in `df.attrs['series_info']`
+    and the sync bookkeeping, if any, in `df.attrs['sync_state']`.
+    """
+    table = pq.read_table(file_path)
+    df = table.to_pandas()
+    metadata = table.schema.metadata or {}
+    series_info = metadata.get(SERIES_INFO_METADATA_KEY)
+    df.attrs['series_info'] = json.loads(series_info) if series_info else {}
+    sync_state = metadata.get(SYNC_STATE_METADATA_KEY)
+    df.attrs['sync_state'] = json.loads(sync_state) if sync_state else {}
+    return df
+
+def read_series_info(file_path):
+    """
+    Read only the series metadata of a Parquet observation file, without its observations.
+    """
+    metadata = pq.read_schema(file_path).metadata or {}
+    series_info = metadata.get(SERIES_INFO_METADATA_KEY)
+    return json.loads(series_info) if series_info else {}
+
+def load_observations(series_id, data_folder=OBSERVATIONS_FOLDER):
+    """
+    Load the stored observations and metadata of a series.
+
+    Parameters:
+    series_id (str): Series ID to load.
+    data_folder (str): Folder holding the Parquet files.
+
+    Returns:
+    tuple: (pd.DataFrame with the observations, dict with the series info).
+    """
+    df = read_observation_file(observation_path(series_id, data_folder))
+    return df, df.attrs['series_info']
+
+def convert_csv_to_parquet(csv_folder='data/series_data', data_folder=OBSERVATIONS_FOLDER):
+    """
+    Convert legacy per-series CSV files (observations with broadcast metadata) to the Parquet store.
+
+    Parameters:
+    csv_folder (str): Folder containing the `<series_id>.csv` files.
+    data_folder (str): Folder to save the Parquet files in.
+    """
+    for file_name in sorted(os.listdir(csv_folder)):
+        if not file_name.endswith('.csv'):
+            continue
+        series_id = file_name[:-len('.csv')]
+        df = pd.read_csv(os.path.join(csv_folder, file_name), dtype={'value': str})
+        metadata_columns = [column for column in df.columns
+                            if column not in ('date', 'value', 'realtime_start', 'realtime_end')]
+        series_info = json.loads(df[metadata_columns].iloc[:1].to_json(orient='records'))
+        series_info = series_info[0] if series_info else {}
+        save_observations(df, series_id, series_info, data_folder)
+    logging.info(f"Converted CSV files in {csv_folder} to Parquet files in {data_folder}")
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert per-series observation CSV files to Parquet.")
+    parser.add_argument("--csv_folder", type=str, default='data/series_data', help="Folder containing the CSV files.")
+    parser.add_argument("--data_folder", type=str, default=OBSERVATIONS_FOLDER, help="Folder to save the Parquet files in.")
+    args = parser.parse_args()
+
+    convert_csv_to_parquet(args.csv_folder, args.data_folder)
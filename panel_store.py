@@ -0,0 +1,326 @@
+import os
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from observation_store import OBSERVATIONS_FOLDER, observation_path, read_series_info
+
+PANELS_FOLDER = 'data/panels'
+VALUES_FILE_NAME = 'values.npy'
+DATES_FILE_NAME = 'dates.npy'
+SERIES_IDS_FILE_NAME = 'series_ids.json'
+# pandas period codes used when resampling to a FRED frequency
+RESAMPLE_PERIODS = {'D': 'D', 'W': 'W', 'M': 'M', 'Q': 'Q', 'A': 'Y'}
+# FRED frequencies without a pandas period, built from pairs of consecutive finer periods
+# (half-years from quarters, biweekly periods from weeks counted from the week of 1970-01-01)
+PAIRED_PERIODS = {'SA': 'Q', 'BW': 'W'}
+# Minimum number of overlapping observations for a correlation to be reported
+DEFAULT_MIN_PERIODS = 3
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class Panel:
+    """
+    Many series aligned on one date axis.
+
+    `values` has one row per date and one column per series, with NaN where a
+    series has no observation. Panels opened from disk are memory-mapped, so
+    only the parts touched by an operation are read. Operations return new
+    in-memory panels.
+
+    Parameters:
+    dates (np.ndarray): Sorted datetime64 dates.
+    series_ids (list): Series ID of each column.
+    values (np.ndarray): float64 array of shape (len(dates), len(series_ids)).
+    frequency (str): FRED short frequency code of the panel, e.g. 'M'.
+    """
+
+    def __init__(self, dates, series_ids, values, frequency=None):
+        self.dates = np.asarray(dates, dtype='datetime64[ns]')
+        self.series_ids = list(series_ids)
+        self.values = values
+        self.frequency = frequency
+        self.index = {series_id: position for position, series_id in enumerate(self.series_ids)}
+
+    @classmethod
+    def open(cls, panel_folder):
+        """
+        Open a panel saved by build_panel, memory-mapping its values.
+        """
+        with open(os.path.join(panel_folder, SERIES_IDS_FILE_NAME), 'r') as file:
+            header = json.load(file)
+        values = np.load(os.path.join(panel_folder, VALUES_FILE_NAME), mmap_mode='r')
+        dates = np.load(os.path.join(panel_folder, DATES_FILE_NAME))
+        return cls(dates, header['series_ids'], values, header.get('frequency'))
+
+    def _derive(self, values, dates=None):
+        return Panel(self.dates if dates is None else dates, self.series_ids, values, self.frequency)
+
+    def mask(self):
+        """
+        Return a boolean array that is True where a series has an observation.
+        """
+        return ~np.isnan(self.values)
+
+    def column(self, series_id):
+        """
+        Return one series as a pandas Series indexed by date.
+        """
+        return pd.Series(np.asarray(self.values[:, self.index[series_id]]), index=self.dates, name=series_id)
+
+    def select(self, series_ids):
+        """
+        Return a panel restricted to the given series.
+        """
+        positions = [self.index[series_id] for series_id in series_ids]
+        return self._derive(np.asarray(self.values[:, positions]))
+
+    def to_frame(self):
+        """
+        Return the panel as a pandas DataFrame (loads every value into memory).
+        """
+        return pd.DataFrame(np.asarray(self.values), index=self.dates, columns=self.series_ids)
+
+    def shift(self, periods=1):
+        """
+        Shift every series down by `periods` rows.
+        """
+        values = np.full(self.values.shape, np.nan)
+        if periods >= 0:
+            values[periods:] = self.values[:len(self.dates) - periods]
+        else:
+            values[:periods] = self.values[-periods:]
+        return self._derive(values)
+
+    def change(self, periods=1):
+        """
+        Return the change from `periods` rows earlier.
+        """
+        return self._derive(np.asarray(self.values) - self.shift(periods).values)
+
+    def pct_change(self, periods=1):
+        """
+        Return the percent change from `periods` rows earlier.
+        """
+        previous = self.shift(periods).values
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._derive((np.asarray(self.values) / previous - 1) * 100)
+
+    def year_ago(self):
+        """
+        Return the values of one year earlier.
+
+        The comparison value is each series' last observation on or before the same
+        date a year earlier, so irregular daily calendars and series missing on that
+        row are handled as well.
+        """
+        year_ago = (pd.DatetimeIndex(self.dates) - pd.DateOffset(years=1)).to_numpy()
+        positions = np.searchsorted(self.dates, year_ago, side='right') - 1
+        values = np.asarray(self.values)
+        # Index of the last observation at or before each row, per series
+        last_seen = np.where(~np.isnan(values), np.arange(len(values))[:, None], -1)
+        last_seen = np.maximum.accumulate(last_seen, axis=0)
+        rows = np.where(positions[:, None] >= 0, last_seen[np.maximum(positions, 0)], -1)
+        previous = np.where(rows >= 0, values[np.maximum(rows, 0), np.arange(values.shape[1])], np.nan)
+        return self._derive(previous)
+
+    def yoy(self):
+        """
+        Return the percent change from one year earlier, see year_ago.
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._derive((np.asarray(self.values) / self.year_ago().values - 1) * 100)
+
+    def period_starts(self, frequency):
+        """
+        Return the start date of the period of a FRED frequency that each row falls in.
+
+        Raises:
+        ValueError: If the frequency is not a known FRED short frequency code.
+        """
+        if frequency in PAIRED_PERIODS:
+            periods = pd.PeriodIndex(pd.DatetimeIndex(self.dates), freq=PAIRED_PERIODS[frequency])
+            periods = pd.PeriodIndex.from_ordinals(periods.asi8 // 2 * 2, freq=PAIRED_PERIODS[frequency])
+        elif frequency in RESAMPLE_PERIODS:
+            periods = pd.PeriodIndex(pd.DatetimeIndex(self.dates), freq=RESAMPLE_PERIODS[frequency])
+        else:
+            raise ValueError(f"Unknown frequency: {frequency}")
+        return periods.to_timestamp().to_numpy(dtype='datetime64[ns]')
+
+    def resample(self, frequency, how='mean'):
+        """
+        Aggregate the panel to a lower frequency.
+
+        Parameters:
+        frequency (str): FRED short frequency code: 'W', 'BW', 'M', 'Q', 'SA' or 'A'.
+        how (str): 'mean', 'sum' or 'last' (end of period).
+
+        Returns:
+        Panel: The aggregated panel, dated at the start of each period.
+        """
+        period_starts = self.period_starts(frequency)
+        starts = np.flatnonzero(np.r_[True, period_starts[1:] != period_starts[:-1]])
+        dates = period_starts[starts]
+        values = np.asarray(self.values)
+        present = ~np.isnan(values)
+        counts = np.add.reduceat(present, starts, axis=0)
+
+        if how in ('mean', 'sum'):
+            sums = np.add.reduceat(np.where(present, values, 0), starts, axis=0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result = sums / counts if how == 'mean' else sums
+        elif how == 'last':
+            # Index of the last observation at or before each row, per series
+            last_seen = np.where(present, np.arange(len(values))[:, None], -1)
+            last_seen = np.maximum.accumulate(last_seen, axis=0)
+            ends = np.r_[starts[1:], len(values)] - 1
+            rows = last_seen[ends]
+            result = np.take_along_axis(values, np.maximum(rows, 0), axis=0)
+        else:
+            raise ValueError(f"Unknown aggregation: {how}")
+        result = np.where(counts > 0, result, np.nan)
+        return Panel(dates, self.series_ids, result, frequency)
+
+    def rolling(self, window, how='mean'):
+        """
+        Return rolling statistics over `window` rows; windows with a missing value are NaN.
+
+        Parameters:
+        window (int): Number of rows in each window.
+        how (str): 'mean', 'sum' or 'std'.
+        """
+        values = np.asarray(self.values)
+        present = ~np.isnan(values)
+        filled = np.where(present, values, 0)
+
+        def window_sum(array):
+            cumulative = np.cumsum(np.vstack([np.zeros((1, array.shape[1])), array]), axis=0)
+            return cumulative[window:] - cumulative[:-window]
+
+        result = np.full(values.shape, np.nan)
+        if len(values) < window:
+            return self._derive(result)
+        counts = window_sum(present.astype('float64'))
+        sums = window_sum(filled)
+        if how == 'sum':
+            stat = sums
+        elif how == 'mean':
+            stat = sums / window
+        elif how == 'std':
+            squares = window_sum(filled ** 2)
+            variance = (squares - sums ** 2 / window) / (window - 1)
+            stat = np.sqrt(np.maximum(variance, 0))
+        else:
+            raise ValueError(f"Unknown rolling statistic: {how}")
+        result[window - 1:] = np.where(counts == window, stat, np.nan)
+        return self._derive(result)
+
+    def corr(self, min_periods=DEFAULT_MIN_PERIODS):
+        """
+        Return the pairwise Pearson correlation matrix of all series.
+
+        Each pair uses only the dates where both series have an observation, like
+        pandas.DataFrame.corr, but computed with a few matrix products instead
+        of a loop over pairs.
+
+        Parameters:
+        min_periods (int): Minimum number of overlapping observations per pair.
+
+        Returns:
+        pd.DataFrame: Correlation matrix indexed by series ID.
+        """
+        values = np.asarray(self.values)
+        present = (~np.isnan(values)).astype('float64')
+        filled = np.where(present > 0, values, 0)
+
+        counts = present.T @ present
+        sum_x = filled.T @ present          # sum of series i over dates shared with j
+        sum_xx = (filled ** 2).T @ present
+        sum_xy = filled.T @ filled
+        with np.errstate(divide='ignore', invalid='ignore'):
+            covariance = sum_xy - sum_x * sum_x.T / counts
+            variance_x = sum_xx - sum_x ** 2 / counts
+            correlation = covariance / np.sqrt(variance_x * variance_x.T)
+        correlation[counts < min_periods] = np.nan
+        return pd.DataFrame(np.clip(correlation, -1, 1), index=self.series_ids, columns=self.series_ids)
+
+
+def build_panel(series_ids, panel_folder, frequency=None, data_folder=OBSERVATIONS_FOLDER):
+    """
+    Align stored series on their union of dates and save them as a memory-mapped panel.
+
+    Series are read one at a time and written straight into the memory-mapped
+    array, so memory use does not grow with the number of series.
+
+    Parameters:
+    series_ids (list): Series to include; all should share one frequency.
+    panel_folder (str): Folder to write the panel to.
+    frequency (str): FRED short frequency code recorded with the panel.
+    data_folder (str): Folder of the observation store.
+
+    Returns:
+    Panel: The saved panel, memory-mapped.
+    """
+    os.makedirs(panel_folder, exist_ok=True)
+    all_dates = set()
+    for series_id in series_ids:
+        df = pd.read_parquet(observation_path(series_id, data_folder), columns=['date'])
+        all_dates.update(df['date'].to_numpy(dtype='datetime64[ns]'))
+    dates = np.array(sorted(all_dates), dtype='datetime64[ns]')
+
+    values = np.lib.format.open_memmap(os.path.join(panel_folder, VALUES_FILE_NAME), mode='w+',
+                                       dtype='float64', shape=(len(dates), len(series_ids)))
+    values[:] = np.nan
+    for position, series_id in enumerate(series_ids):
+        df = pd.read_parquet(observation_path(series_id, data_folder))
+        rows = np.searchsorted(dates, df['date'].to_numpy(dtype='datetime64[ns]'))
+        values[rows, position] = df['value'].to_numpy(dtype='float64')
+    values.flush()
+    del values
+
+    np.save(os.path.join(panel_folder, DATES_FILE_NAME), dates)
+    with open(os.path.join(panel_folder, SERIES_IDS_FILE_NAME), 'w') as file:
+        json.dump({'frequency': frequency, 'series_ids': list(series_ids)}, file)
+    logging.info(f"Saved panel of {len(series_ids)} series x {len(dates)} dates to {panel_folder}")
+    return Panel.open(panel_folder)
+
+
+def build_panels(series_ids=None, data_folder=OBSERVATIONS_FOLDER, panels_folder=PANELS_FOLDER):
+    """
+    Build one panel per frequency from the observation store.
+
+    Parameters:
+    series_ids (list): Series to include. Defaults to every stored series.
+    data_folder (str): Folder of the observation store.
+    panels_folder (str): Folder to write the panels to, one subfolder per frequency.
+
+    Returns:
+    dict: Mapping of FRED short frequency code to its Panel.
+    """
+    if series_ids is None:
+        series_ids = sorted(name[:-len('.parquet')] for name in os.listdir(data_folder) if name.endswith('.parquet'))
+
+    by_frequency = {}
+    for series_id in series_ids:
+        series_info = read_series_info(observation_path(series_id, data_folder))
+        by_frequency.setdefault(series_info.get('frequency_short', 'NA'), []).append(series_id)
+
+    return {
+        frequency: build_panel(ids, os.path.join(panels_folder, frequency), frequency, data_folder)
+        for frequency, ids in by_frequency.items()
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build memory-mapped multi-series panels from the observation store.")
+    parser.add_argument("--data_folder", type=str, default=OBSERVATIONS_FOLDER, help="Folder of the observation store.")
+    parser.add_argument("--panels_folder", type=str, default=PANELS_FOLDER, help="Folder to write the panels to.")
+    args = parser.parse_args()
+
+    build_panels(data_folder=args.data_folder, panels_folder=args.panels_folder)
@@ -0,0 +1,297 @@
+import os
+import glob
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import pandas as pd
+
+from config import FRED_API_KEY
+from fred_client import REQUESTS_PER_MINUTE, configure_client
+from data_sources_downloader import fetch_all_sources
+from fetch_source_tags import fetch_source_tags
+from fetch_series_with_offset import SOURCE_BASE_FOLDER, COMBINED_CATALOG_FILE_NAME, fetch_series_with_offset, combine_all_source_csv
+from fred_categories import CATEGORIES_FOLDER, fetch_all_categories, save_categories
+from fred_metadata import import_catalog_metadata
+from fred_data_downloader import download_all_data
+from observation_store import OBSERVATIONS_FOLDER
+from search_index import SEARCH_INDEX_PATH, build_search_index
+from instrumentation import write_snapshot
+
+PIPELINE_STATE_FILE = 'data/pipeline_state.json'
+SOURCES_FILE = os.path.join('data', 'sources', 'sources.csv')
+SOURCE_TAGS_FILE = os.path.join('data', 'source_tags', 'source_tags.csv')
+CATALOG_FILE = os.path.join(SOURCE_BASE_FOLDER, COMBINED_CATALOG_FILE_NAME)
+# Number of stages run at once; all of them share the client's request budget
+DEFAULT_MAX_PARALLEL_STAGES = 4
+# Number of sources whose series are paged through at once by the series_catalog stage
+DEFAULT_SOURCE_WORKERS = 4
+DAY = 24 * 3600
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class Stage:
+    """
+    One step of the ingestion pipeline.
+
+    Parameters:
+    name (str): Stage name used on the command line.
+    run (callable): Called with the parsed options to run the stage.
+    depends_on (tuple): Names of the stages whose outputs this stage reads.
+    outputs (callable): Called with the options, returns the glob patterns the stage must produce.
+    max_age (int): Seconds after which the stage is stale, or None if it only reruns when a dependency did.
+    description (str): One line shown by the status command.
+    settings (callable): Called with the options, returns the JSON-serializable options that shape the
+        stage's outputs; the stage is stale when they differ from those of its last run.
+    """
+
+    def __init__(self, name, run, depends_on=(), outputs=None, max_age=None, description='', settings=None):
+        self.name = name
+        self.run = run
+        self.depends_on = tuple(depends_on)
+        self.outputs = outputs or (lambda options: [])
+        self.max_age = max_age
+        self.description = description
+        self.settings = settings or (lambda options: {})
+
+
+def run_series_catalog(options):
+    """
+    Page through the series of every source tag, then combine the batches into one catalog.
+    """
+    source_tags = pd.read_csv(SOURCE_TAGS_FILE)['name'].tolist()
+    if options.sources:
+        source_tags = [name for name in source_tags if name in options.sources]
+    with ThreadPoolExecutor(max_workers=options.source_workers) as executor:
+        list(executor.map(fetch_series_with_offset, source_tags))
+    combine_all_source_csv()
+
+
+def run_categories(options):
+    """
+    Crawl the category tree and save it with the app's cleaned artifact.
+    """
+    save_categories(fetch_all_categories(FRED_API_KEY, max_depth=options.max_depth))
+
+
+def run_observations(options):
+    """
+    Download the series listed in the data configuration file.
+    """
+    failures = download_all_data(config_file=options.config_file)
+    if failures:
+        logging.warning(f"Observations stage finished with {len(failures)} failed series")
+
+
+STAGES = {stage.name: stage for stage in [
+    Stage('sources', lambda options: fetch_all_sources(),
+          outputs=lambda options: [SOURCES_FILE], max_age=7 * DAY,
+          description="List of FRED data sources"),
+    Stage('source_tags', lambda options: fetch_source_tags(),
+          outputs=lambda options: [SOURCE_TAGS_FILE], max_age=7 * DAY,
+          description="Source tags used to page through the series catalog"),
+    Stage('categories', run_categories,
+          outputs=lambda options: [os.path.join(CATEGORIES_FOLDER, 'categories_*.csv')], max_age=30 * DAY,
+          settings=lambda options: {'max_depth': options.max_depth},
+          description="Category tree shown by the app"),
+    Stage('series_catalog', run_series_catalog, depends_on=['source_tags'],
+          outputs=lambda options: [CATALOG_FILE], max_age=7 * DAY,
+          settings=lambda options: {'sources': sorted(options.sources or [])},
+          description="Combined catalog of every series of every source"),
+    Stage('series_metadata', lambda options: import_catalog_metadata(CATALOG_FILE), depends_on=['series_catalog'],
+          description="Catalog series records stored in the metadata store"),
+    Stage('search_index', lambda options: build_search_index(CATALOG_FILE), depends_on=['series_metadata'],
+          outputs=lambda options: [SEARCH_INDEX_PATH],
+          description="Full-text index over the catalog"),
+    Stage('observations', run_observations, depends_on=['series_metadata'],
+          outputs=lambda options: [OBSERVATIONS_FOLDER], max_age=DAY,
+          settings=lambda options: {'config_file': options.config_file},
+          description="Observations of the series in the data configuration file"),
+]}
+
+
+def load_state(state_file=PIPELINE_STATE_FILE):
+    """
+    Return the recorded completion time, duration and settings of each stage.
+    """
+    if not os.path.exists(state_file):
+        return {}
+    with open(state_file, 'r') as file:
+        return json.load(file)
+
+
+def save_state(state, state_file=PIPELINE_STATE_FILE):
+    """
+    Atomically write the pipeline state.
+    """
+    os.makedirs(os.path.dirname(state_file) or '.', exist_ok=True)
+    tmp_path = f"{state_file}.tmp"
+    with open(tmp_path, 'w') as file:
+        json.dump(state, file, indent=2)
+    os.replace(tmp_path, state_file)
+
+
+def resolve_stages(targets=None, with_dependencies=True):
+    """
+    Return the stages needed to build the targets, in dependency order.
+
+    Parameters:
+    targets (list): Stage names. Defaults to every stage.
+    with_dependencies (bool): Include the stages the targets depend on.
+    """
+    for name in targets or []:
+        if name not in STAGES:
+            raise ValueError(f"Unknown stage: {name}")
+    selected = set(targets or STAGES)
+    if with_dependencies:
+        to_visit = list(selected)
+        while to_visit:
+            for dependency in STAGES[to_visit.pop()].depends_on:
+                if dependency not in selected:
+                    selected.add(dependency)
+                    to_visit.append(dependency)
+    return [name for name in STAGES if name in selected]
+
+
+def is_up_to_date(stage, state, options, now=None):
+    """
+    Return whether a stage can be skipped.
+
+    A stage is up to date when its outputs exist, it completed after every stage
+    it depends on, it last ran with the same settings, and it is younger than its
+    maximum age.
+    """
+    now = time.time() if now is None else now
+    completed_at = state.get(stage.name, {}).get('completed_at')
+    if completed_at is None:
+        return False
+    if state[stage.name].get('settings', {}) != stage.settings(options):
+        return False
+    if not all(glob.glob(pattern) for pattern in stage.outputs(options)):
+        return False
+    if any(state.get(dependency, {}).get('completed_at', now) > completed_at for dependency in stage.depends_on):
+        return False
+    return stage.max_age is None or now - completed_at < stage.max_age
+
+
+def run_pipeline(options, targets=None, with_dependencies=True, force=False,
+                 max_parallel=DEFAULT_MAX_PARALLEL_STAGES, state_file=PIPELINE_STATE_FILE, dry_run=False):
+    """
+    Run the ingestion stages as a dependency graph.
+
+    A stage starts as soon as the stages it depends on have finished, so
+    independent stages (e.g. sources, source tags and categories) run
+    concurrently. All stages go through the shared FRED client, so together
+    they stay within one request budget. Stages that are up to date are skipped,
+    and the dependents of a failed stage are not run.
+
+    Parameters:
+    options (argparse.Namespace): Options passed to the stages.
+    targets (list): Stages to build. Defaults to every stage.
+    with_dependencies (bool): Also build the stages the targets depend on.
+    force (bool): Run the selected stages even if they are up to date.
+    max_parallel (int): Maximum number of stages running at once.
+    state_file (str): File recording when each stage last completed.
+    dry_run (bool): Only report what would run.
+
+    Returns:
+    dict: Mapping of stage name to 'completed', 'up to date', 'would run', 'failed' or 'blocked'.
+    """
+    names = resolve_stages(targets, with_dependencies)
+    state = load_state(state_file)
+    state_lock = threading.Lock()
+    results = {}
+
+    def execute(stage):
+        logging.info(f"Running stage {stage.name}")
+        start_time = time.monotonic()
+        stage.run(options)
+        duration = time.monotonic() - start_time
+        with state_lock:
+            state[stage.name] = {'completed_at': time.time(), 'duration': round(duration, 1),
+                                 'settings': stage.settings(options)}
+            save_state(state, state_file)
+        logging.info(f"Stage {stage.name} completed in {duration:.1f}s")
+
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        running = {}
+        while len(results) < len(names):
+            for name in names:
+                stage = STAGES[name]
+                dependencies = [dependency for dependency in stage.depends_on if dependency in names]
+                if name in results or name in running.values() \
+                        or any(dependency not in results for dependency in dependencies):
+                    continue
+                if any(results[dependency] in ('failed', 'blocked') for dependency in dependencies):
+                    results[name] = 'blocked'
+                elif dry_run and any(results[dependency] == 'would run' for dependency in dependencies):
+                    results[name] = 'would run'
+                elif not force and is_up_to_date(stage, state, options):
+                    logging.info(f"Stage {name} is up to date")
+                    results[name] = 'up to date'
+                elif dry_run:
+                    results[name] = 'would run'
+                else:
+                    running[executor.submit(execute, stage)] = name
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    future.result()
+                    results[name] = 'completed'
+                except Exception as e:
+                    logging.error(f"Stage {name} failed: {e}")
+                    results[name] = 'failed'
+
+    for name in names:
+        logging.info(f"{name}: {results[name]}")
+    return results
+
+
+def print_status(options, state_file=PIPELINE_STATE_FILE):
+    """
+    Print when each stage last completed and whether it is up to date.
+    """
+    state = load_state(state_file)
+    for name, stage in STAGES.items():
+        completed_at = state.get(name, {}).get('completed_at')
+        last_run = time.strftime('%Y-%m-%d %H:%M', time.localtime(completed_at)) if completed_at else 'never'
+        status = 'up to date' if is_up_to_date(stage, state, options) else 'stale'
+        print(f"{name:<16} {status:<11} last run: {last_run:<17} {stage.description}")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the FRED ingestion pipeline.")
+    parser.add_argument("command", choices=['run', 'status'], help="Run stages or show their status.")
+    parser.add_argument("stages", nargs='*', help=f"Stages to run: {', '.join(STAGES)}. Defaults to all.")
+    parser.add_argument("--force", action='store_true', help="Run the stages even if they are up to date.")
+    parser.add_argument("--no_deps", action='store_true', help="Do not run the stages the selected ones depend on.")
+    parser.add_argument("--dry_run", action='store_true', help="Only report which stages would run.")
+    parser.add_argument("--max_parallel", type=int, default=DEFAULT_MAX_PARALLEL_STAGES, help="Stages run at once.")
+    parser.add_argument("--requests_per_minute", type=int, default=REQUESTS_PER_MINUTE, help="Request budget shared by all stages.")
+    parser.add_argument("--sources", type=str, nargs='*', help="Only catalog these source tags, e.g. irs bls.")
+    parser.add_argument("--source_workers", type=int, default=DEFAULT_SOURCE_WORKERS, help="Sources paged through at once.")
+    parser.add_argument("--max_depth", type=int, default=1, help="Depth of the category crawl.")
+    parser.add_argument("--config_file", type=str, default='data_config.json', help="Series to download observations for.")
+    parser.add_argument("--metrics_file", type=str, help="Write a JSON snapshot of the request and cache metrics here.")
+    parser.add_argument("--state_file", type=str, default=PIPELINE_STATE_FILE, help="File recording stage completion.")
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        print_status(args, args.state_file)
+    else:
+        configure_client(requests_per_minute=args.requests_per_minute)
+        results = run_pipeline(args, args.stages, with_dependencies=not args.no_deps, force=args.force,
+                               max_parallel=args.max_parallel, state_file=args.state_file, dry_run=args.dry_run)
+        if args.metrics_file:
+            write_snapshot(args.metrics_file)
+        if any(result in ('failed', 'blocked') for result in results.values()):
+            raise SystemExit(1)
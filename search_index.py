@@ -0,0 +1,192 @@
+import os
+import re
+import json
+import sqlite3
+import logging
+
+import pandas as pd
+
+from metadata_store import METADATA_DB_PATH, SERIES_TAGS_TABLE
+
+SEARCH_INDEX_PATH = 'data/search_index.db'
+CATALOG_FILE = os.path.join('data', 'series', 'source', 'all_sources_combined.parquet')
+# Indexed columns and their bm25 weights; matches in the ID or title rank highest
+SEARCH_COLUMN_WEIGHTS = {
+    'id': 10.0,
+    'title': 5.0,
+    'tags': 2.0,
+    'units': 1.0,
+    'source': 1.0,
+    'notes': 0.5,
+}
+DEFAULT_SEARCH_LIMIT = 20
+DEFAULT_SUGGESTION_LIMIT = 10
+# Minimum length of a term before it is suggested as a completion
+MIN_SUGGESTION_LENGTH = 3
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def load_series_tag_names(metadata_db_path=METADATA_DB_PATH):
+    """
+    Return a mapping of series ID to its space-separated tag names from the metadata store.
+    """
+    if not os.path.exists(metadata_db_path):
+        return {}
+    connection = sqlite3.connect(metadata_db_path)
+    try:
+        rows = connection.execute(f"SELECT series_id, data FROM {SERIES_TAGS_TABLE}").fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    finally:
+        connection.close()
+    return {series_id: ' '.join(tag['name'] for tag in json.loads(data).get('tags', [])) for series_id, data in rows}
+
+
+def build_search_index(catalog_file=CATALOG_FILE, index_path=SEARCH_INDEX_PATH, metadata_db_path=METADATA_DB_PATH):
+    """
+    Build a full-text index over the combined series catalog.
+
+    Titles, notes, units, source tags and, where the metadata store has them,
+    series tags are indexed in an SQLite FTS5 table. The index is built in a
+    temporary file and swapped in atomically, so readers never see a partial index.
+
+    Parameters:
+    catalog_file (str): Path to the combined catalog written by combine_all_source_csv.
+    index_path (str): Path of the index database to write.
+    metadata_db_path (str): Path to the metadata store holding series tags.
+
+    Returns:
+    int: Number of indexed series.
+    """
+    catalog = pd.read_parquet(catalog_file)
+    catalog = catalog.reindex(columns=['id', 'title', 'notes', 'units', 'source_tag', 'frequency', 'popularity'])
+    tag_names = load_series_tag_names(metadata_db_path)
+    catalog['tags'] = catalog['id'].map(tag_names)
+    catalog['popularity'] = pd.to_numeric(catalog['popularity'], errors='coerce').fillna(0).astype('int64')
+    text_columns = ['id', 'title', 'notes', 'units', 'source_tag', 'frequency', 'tags']
+    catalog[text_columns] = catalog[text_columns].fillna('').astype(str)
+
+    os.makedirs(os.path.dirname(index_path) or '.', exist_ok=True)
+    tmp_path = f"{index_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    connection = sqlite3.connect(tmp_path)
+    with connection:
+        connection.execute(
+            "CREATE TABLE series (rowid INTEGER PRIMARY KEY, id TEXT, title TEXT, units TEXT, "
+            "frequency TEXT, source TEXT, popularity INTEGER)"
+        )
+        connection.execute(
+            f"CREATE VIRTUAL TABLE series_fts USING fts5({', '.join(SEARCH_COLUMN_WEIGHTS)}, "
+            "tokenize='unicode61', prefix='2 3')"
+        )
+        connection.execute("CREATE VIRTUAL TABLE series_vocab USING fts5vocab(series_fts, 'row')")
+        rows = catalog[['id', 'title', 'units', 'frequency', 'source_tag', 'popularity']].itertuples(index=False)
+        connection.executemany(
+            "INSERT INTO series (rowid, id, title, units, frequency, source, popularity) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((rowid, *row) for rowid, row in enumerate(rows, start=1))
+        )
+        rows = catalog[['id', 'title', 'tags', 'units', 'source_tag', 'notes']].itertuples(index=False)
+        connection.executemany(
+            f"INSERT INTO series_fts (rowid, {', '.join(SEARCH_COLUMN_WEIGHTS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((rowid, *row) for rowid, row in enumerate(rows, start=1))
+        )
+        connection.execute("INSERT INTO series_fts (series_fts) VALUES ('optimize')")
+    connection.close()
+    os.replace(tmp_path, index_path)
+    logging.info(f"Indexed {len(catalog)} series into {index_path}")
+    return len(catalog)
+
+
+def connect_search_index(index_path=SEARCH_INDEX_PATH):
+    """
+    Open a read-only connection to the search index.
+    """
+    return sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+
+
+def to_match_query(query):
+    """
+    Turn free text into an FTS5 query matching all words, treating the last one as a prefix.
+    """
+    tokens = TOKEN_PATTERN.findall(query.lower())
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_series(query, limit=DEFAULT_SEARCH_LIMIT, index_path=SEARCH_INDEX_PATH):
+    """
+    Search the local series catalog.
+
+    Results are ranked by bm25 relevance with per-column weights, ties broken by popularity.
+
+    Parameters:
+    query (str): Free text query.
+    limit (int): Maximum number of results.
+    index_path (str): Path of the index database.
+
+    Returns:
+    pd.DataFrame: Matching series with id, title, units, frequency, source and popularity.
+    """
+    columns = ['id', 'title', 'units', 'frequency', 'source', 'popularity']
+    match_query = to_match_query(query)
+    if match_query is None:
+        return pd.DataFrame(columns=columns)
+    weights = ', '.join(str(weight) for weight in SEARCH_COLUMN_WEIGHTS.values())
+    connection = connect_search_index(index_path)
+    try:
+        rows = connection.execute(
+            f"SELECT s.id, s.title, s.units, s.frequency, s.source, s.popularity "
+            f"FROM series_fts JOIN series s ON s.rowid = series_fts.rowid "
+            f"WHERE series_fts MATCH ? ORDER BY bm25(series_fts, {weights}), s.popularity DESC LIMIT ?",
+            (match_query, limit)
+        ).fetchall()
+    finally:
+        connection.close()
+    return pd.DataFrame(rows, columns=columns)
+
+
+def suggest_terms(prefix, limit=DEFAULT_SUGGESTION_LIMIT, index_path=SEARCH_INDEX_PATH):
+    """
+    Suggest indexed terms completing the last word of a query, most common first.
+
+    Parameters:
+    prefix (str): Query text typed so far.
+    limit (int): Maximum number of suggestions.
+    index_path (str): Path of the index database.
+
+    Returns:
+    list: Completed terms.
+    """
+    tokens = TOKEN_PATTERN.findall(prefix.lower())
+    if not tokens:
+        return []
+    last = tokens[-1]
+    connection = connect_search_index(index_path)
+    try:
+        rows = connection.execute(
+            "SELECT term FROM series_vocab WHERE term >= ? AND term < ? AND length(term) >= ? "
+            "ORDER BY doc DESC LIMIT ?",
+            (last, f"{last}\uffff", MIN_SUGGESTION_LENGTH, limit)
+        ).fetchall()
+    finally:
+        connection.close()
+    return [row[0] for row in rows]
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the local full-text search index over the series catalog.")
+    parser.add_argument("--catalog_file", type=str, default=CATALOG_FILE, help="Path to the combined series catalog.")
+    parser.add_argument("--index_path", type=str, default=SEARCH_INDEX_PATH, help="Path of the index database to write.")
+    args = parser.parse_args()
+
+    build_search_index(args.catalog_file, args.index_path)
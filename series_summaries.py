@@ -0,0 +1,257 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from fred_client import TokenBucket
+from metadata_store import (SERIES_INFO_TABLE, SERIES_TAGS_TABLE, SERIES_SUMMARIES_TABLE, get_record, get_records,
+                            put_records)
+from search_index import CATALOG_FILE
+from utils import call_openai, count_tokens
+
+SUMMARY_MODEL = 'gpt-4o'
+SUMMARY_SYSTEM_PROMPT = (
+    "You summarize economic data series from FRED. For every series you are given, write 2-3 sentences "
+    "saying what it measures, who publishes it and what it is commonly used for. Reply with a JSON object "
+    "mapping each series ID to its summary and nothing else."
+)
+# Prompt tokens allowed per request, including the system prompt
+DEFAULT_MAX_PROMPT_TOKENS = 6000
+MAX_SERIES_PER_REQUEST = 20
+# Completion tokens reserved for each series in a request
+SUMMARY_TOKENS_PER_SERIES = 120
+# Longest series description sent to the model, in characters
+MAX_NOTES_LENGTH = 1500
+DEFAULT_MAX_WORKERS = 4
+# Number of catalog rows whose stored metadata is looked up at once
+LOAD_BATCH_SIZE = 5000
+# Default rate budget of the OpenAI account
+REQUESTS_PER_MINUTE = 500
+TOKENS_PER_MINUTE = 200000
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def describe_series(series_id, series_info, tag_names):
+    """
+    Return the text describing one series in a summarization prompt.
+    """
+    lines = [f"Series ID: {series_id}"]
+    for key in ('title', 'units', 'frequency', 'seasonal_adjustment', 'observation_start', 'observation_end'):
+        if series_info.get(key):
+            lines.append(f"{key}: {series_info[key]}")
+    if tag_names:
+        lines.append(f"tags: {', '.join(tag_names)}")
+    notes = ' '.join(str(series_info.get('notes') or '').split())
+    if notes:
+        lines.append(f"notes: {notes[:MAX_NOTES_LENGTH]}")
+    return '\n'.join(lines)
+
+
+def _is_current(stored, last_updated, model_name):
+    return (stored is not None and stored[0].get('last_updated') == last_updated
+            and stored[0].get('model') == model_name)
+
+
+def load_summary_items(catalog_file=CATALOG_FILE, series_ids=None, model_name=None):
+    """
+    Collect the series to summarize with their prompt text.
+
+    Series info and tags come from the metadata store where available, and
+    otherwise from the catalog row. They are looked up in bulk, LOAD_BATCH_SIZE
+    catalog rows at a time, and series already summarized are dropped before
+    their prompts are built.
+
+    Parameters:
+    catalog_file (str): Path to the combined series catalog.
+    series_ids (list): Restrict to these series. Defaults to the whole catalog.
+    model_name (str): Leave out series with a current summary by this model, see is_summary_current.
+
+    Returns:
+    tuple: (list of (series_id, last_updated, description) tuples, number of series left out).
+    """
+    catalog = pd.read_parquet(catalog_file)
+    if series_ids is not None:
+        catalog = catalog[catalog['id'].isin(series_ids)]
+
+    items = []
+    skipped = 0
+    for start in range(0, len(catalog), LOAD_BATCH_SIZE):
+        chunk = catalog.iloc[start:start + LOAD_BATCH_SIZE]
+        ids = chunk['id'].tolist()
+        stored_infos = get_records(SERIES_INFO_TABLE, ids)
+        catalog_versions = chunk['last_updated'].tolist() if 'last_updated' in chunk else [None] * len(ids)
+        versions = [stored_infos[series_id][0].get('last_updated') if series_id in stored_infos
+                    else None if pd.isna(version) else version
+                    for series_id, version in zip(ids, catalog_versions)]
+        pending = [True] * len(ids)
+        if model_name is not None:
+            stored_summaries = get_records(SERIES_SUMMARIES_TABLE, ids)
+            pending = [not _is_current(stored_summaries.get(series_id), version, model_name)
+                       for series_id, version in zip(ids, versions)]
+        skipped += pending.count(False)
+        if not any(pending):
+            continue
+
+        chunk = chunk[pending]
+        versions = [version for version, is_pending in zip(versions, pending) if is_pending]
+        stored_tags = get_records(SERIES_TAGS_TABLE, chunk['id'].tolist())
+        for row, version in zip(chunk.to_dict('records'), versions):
+            series_id = row['id']
+            if series_id in stored_infos:
+                series_info = stored_infos[series_id][0]
+            else:
+                series_info = {key: value for key, value in row.items() if not pd.isna(value)}
+            tags = stored_tags[series_id][0].get('tags', []) if series_id in stored_tags else []
+            items.append((series_id, version, describe_series(series_id, series_info, [tag['name'] for tag in tags])))
+    return items, skipped
+
+
+def is_summary_current(series_id, last_updated, model_name):
+    """
+    Return whether a stored summary exists for this version of the series and model.
+    """
+    return _is_current(get_record(SERIES_SUMMARIES_TABLE, series_id), last_updated, model_name)
+
+
+def pack_batches(items, model_name=SUMMARY_MODEL, max_prompt_tokens=DEFAULT_MAX_PROMPT_TOKENS,
+                 max_series=MAX_SERIES_PER_REQUEST):
+    """
+    Greedily pack series into requests that fit a prompt token budget.
+
+    A series that exceeds the budget on its own is sent alone.
+
+    Parameters:
+    items (list): (series_id, last_updated, description) tuples.
+    model_name (str): Model whose tokenizer is used for counting.
+    max_prompt_tokens (int): Prompt tokens allowed per request.
+    max_series (int): Maximum number of series per request.
+
+    Returns:
+    list: Batches as (items, prompt tokens) tuples.
+    """
+    budget = max_prompt_tokens - count_tokens(SUMMARY_SYSTEM_PROMPT, model_name)
+    batches = []
+    batch, batch_tokens = [], 0
+    for item in items:
+        tokens = count_tokens(item[2], model_name) + 2  # separator between series
+        if batch and (batch_tokens + tokens > budget or len(batch) >= max_series):
+            batches.append((batch, batch_tokens))
+            batch, batch_tokens = [], 0
+        batch.append(item)
+        batch_tokens += tokens
+    if batch:
+        batches.append((batch, batch_tokens))
+    return batches
+
+
+def parse_summaries(response):
+    """
+    Decode the model's JSON reply, tolerating a surrounding Markdown code fence.
+    """
+    return json.loads(response[response.index('{'):response.rindex('}') + 1])
+
+
+def summarize_batch(batch, model_name=SUMMARY_MODEL):
+    """
+    Summarize a batch of series in one request.
+
+    Parameters:
+    batch (list): (series_id, last_updated, description) tuples.
+    model_name (str): The name of the OpenAI model to use.
+
+    Returns:
+    dict: Mapping of series ID to its summary record.
+    """
+    user_prompt = '\n\n'.join(description for _, _, description in batch)
+    response = call_openai(user_prompt, model_name=model_name, system_prompt=SUMMARY_SYSTEM_PROMPT,
+                           max_tokens=SUMMARY_TOKENS_PER_SERIES * len(batch), use_cache=False)
+    summaries = parse_summaries(response)
+    records = {}
+    for series_id, last_updated, _ in batch:
+        summary = summaries.get(series_id)
+        if not summary:
+            logging.warning(f"No summary returned for series {series_id}")
+            continue
+        records[series_id] = {'summary': summary, 'model': model_name, 'last_updated': last_updated}
+    return records
+
+
+def summarize_catalog(catalog_file=CATALOG_FILE, series_ids=None, model_name=SUMMARY_MODEL,
+                      max_prompt_tokens=DEFAULT_MAX_PROMPT_TOKENS, max_workers=DEFAULT_MAX_WORKERS,
+                      requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE):
+    """
+    Summarize the series catalog and store the summaries in the metadata store.
+
+    Series whose stored summary was made by the same model from the same
+    `last_updated` are skipped, so an interrupted run resumes where it stopped
+    and later runs only summarize new or updated series. Requests are sent
+    concurrently within a shared request and token budget.
+
+    Parameters:
+    catalog_file (str): Path to the combined series catalog.
+    series_ids (list): Restrict to these series. Defaults to the whole catalog.
+    model_name (str): The name of the OpenAI model to use.
+    max_prompt_tokens (int): Prompt tokens allowed per request.
+    max_workers (int): Number of concurrent requests.
+    requests_per_minute (int): Request budget.
+    tokens_per_minute (int): Prompt plus completion token budget.
+
+    Returns:
+    dict: Number of 'summarized', 'skipped' and 'failed' series.
+    """
+    pending, skipped = load_summary_items(catalog_file, series_ids, model_name)
+    batches = pack_batches(pending, model_name, max_prompt_tokens)
+    logging.info(f"Summarizing {len(pending)} of {len(pending) + skipped} series in {len(batches)} requests")
+
+    request_limiter = TokenBucket(rate=requests_per_minute / 60)
+    token_limiter = TokenBucket(rate=tokens_per_minute / 60, capacity=tokens_per_minute)
+
+    def run(batch, prompt_tokens):
+        request_limiter.acquire()
+        token_limiter.acquire(prompt_tokens + SUMMARY_TOKENS_PER_SERIES * len(batch))
+        return summarize_batch(batch, model_name)
+
+    counts = {'summarized': 0, 'skipped': skipped, 'failed': 0}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run, batch, prompt_tokens): batch for batch, prompt_tokens in batches}
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                records = future.result()
+            except Exception as e:
+                logging.error(f"Failed to summarize {len(batch)} series starting with {batch[0][0]}: {e}")
+                counts['failed'] += len(batch)
+                continue
+            put_records(SERIES_SUMMARIES_TABLE, records)
+            counts['summarized'] += len(records)
+            counts['failed'] += len(batch) - len(records)
+    logging.info(f"Summaries: {counts}")
+    return counts
+
+
+def get_series_summary(series_id):
+    """
+    Return the stored summary record of a series ('summary', 'model', 'last_updated'), or None.
+    """
+    stored = get_record(SERIES_SUMMARIES_TABLE, series_id)
+    return None if stored is None else stored[0]
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize the series catalog with an LLM and store the summaries.")
+    parser.add_argument("--catalog_file", type=str, default=CATALOG_FILE, help="Path to the combined series catalog.")
+    parser.add_argument("--series_ids", type=str, nargs='*', help="Only summarize these series.")
+    parser.add_argument("--model", type=str, default=SUMMARY_MODEL, help="OpenAI model to use.")
+    parser.add_argument("--max_prompt_tokens", type=int, default=DEFAULT_MAX_PROMPT_TOKENS, help="Prompt tokens per request.")
+    parser.add_argument("--max_workers", type=int, default=DEFAULT_MAX_WORKERS, help="Number of concurrent requests.")
+    parser.add_argument("--requests_per_minute", type=int, default=REQUESTS_PER_MINUTE, help="Request budget.")
+    parser.add_argument("--tokens_per_minute", type=int, default=TOKENS_PER_MINUTE, help="Token budget.")
+    args = parser.parse_args()
+
+    summarize_catalog(args.catalog_file, args.series_ids, args.model, args.max_prompt_tokens,
+                      args.max_workers, args.requests_per_minute, args.tokens_per_minute)
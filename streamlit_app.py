@@ -1,26 +1,85 @@
 import os
-import json
+import time
 import logging
 from datetime import datetime
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import plotly.io as pio
 from streamlit_plotly_events import plotly_events
 
-from fred_metadata import fetch_all_series_metadata
+from fred_metadata import fetch_all_series_metadata, start_background_prefetch
 from fred_data_downloader import (
     fetch_series_info,
     fetch_series_tags,
-    save_data_to_csv,
-    fetch_fred_data
+    sync_series_data,
+    SeriesNotFoundError
 )
+from observation_store import OBSERVATIONS_FOLDER, observation_path
 from visualizations import plot_time_series, plot_category_sunburst
-from utils import load_category_data, load_data, call_openai
+from transforms import UNITS, AGGREGATION_METHODS, FREQUENCIES, lower_frequencies, get_transformed_observations
+from utils import load_category_data, stream_openai
+from search_index import SEARCH_INDEX_PATH, search_series, suggest_terms
+from series_summaries import get_series_summary
+from instrumentation import metrics, start_metrics_server, install_log_redaction
+import config
 
 pio.templates.default = "plotly_dark"
 
+# Maximum number of results kept per cached loader or figure builder
+CACHE_MAX_ENTRIES = 32
+
+rerun_start = time.perf_counter()
+install_log_redaction(secrets=(config.FRED_API_KEY, config.OPENAI_API_KEY))
+# Set METRICS_PORT in config to expose /metrics (Prometheus) and /metrics.json
+if getattr(config, 'METRICS_PORT', None):
+    start_metrics_server(config.METRICS_PORT)
+
+
+def file_mtime(path):
+    """
+    Return the modification time of a file, or None if it does not exist.
+
+    Passed to the cached functions below so their entries are invalidated when the file changes.
+    """
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_category_data(data_file, mtime):
+    """Load the category data, cached per file version."""
+    return load_category_data(data_file)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_category_sunburst(data_file, mtime):
+    """Build the category sunburst figure, cached per file version."""
+    return plot_category_sunburst(data_file, df=cached_category_data(data_file, mtime))
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_series_metadata(category_id, limit, mtime):
+    """Load the popular series of a category, cached per metadata file version."""
+    return fetch_all_series_metadata(category_id, limit=limit)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_search(query, mtime):
+    """Search the local series catalog, cached per index version."""
+    return search_series(query), suggest_terms(query)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_time_series(series_id, data_folder, mtime, start_date=None, end_date=None,
+                       units='lin', frequency=None, aggregation='avg'):
+    """Build the time series figure for a date range and view, cached per observation file version."""
+    data_file = observation_path(series_id, data_folder)
+    df = None
+    if units != 'lin' or frequency:
+        df = get_transformed_observations(series_id, units, frequency, aggregation, data_folder)
+    return plot_time_series(data_file, start_date=start_date, end_date=end_date, df=df)
+
+
 # Set the Streamlit layout to use the full width
 st.set_page_config(layout="wide")
 
@@ -29,16 +88,39 @@ st.markdown("## :world_map: Freddy's Insights")
 st.markdown("### Explore and visualize FRED data series")
 st.markdown("**FRED (Federal Reserve Economic Data)** is a comprehensive collection of economic data from various sources. Use this tool to explore and visualize different data series.")
 
+selected_series_id = None
+
+with st.expander(":mag: Search the series catalog", expanded=False):
+    search_query = st.text_input("Search by title, notes, units, tags or source")
+    if search_query:
+        if not os.path.exists(SEARCH_INDEX_PATH):
+            st.info("The local search index has not been built yet. Run `python search_index.py` to build it.")
+        else:
+            with metrics.timer('app_stage_seconds', stage='search'):
+                search_results, suggestions = cached_search(search_query, file_mtime(SEARCH_INDEX_PATH))
+            if suggestions:
+                st.caption(f"Suggestions: {', '.join(suggestions)}")
+            search_selection = st.dataframe(
+                search_results,
+                hide_index=True,
+                on_select="rerun",
+                selection_mode="single-row"
+            )
+            if search_selection['selection']['rows']:
+                selected_series_id = search_results.iloc[search_selection['selection']['rows'][0]]['id']
+
 # Create the layout with different sections
 top_left_col, top_mid_col, top_right_col = st.columns([1, 1, 1])
 bottom_left_col, bottom_right_col = st.columns([1, 3])
 
 data_file = './data/categories/categories_20240615145115.csv'
-df = load_category_data(data_file)
-    
+with metrics.timer('app_stage_seconds', stage='category_data'):
+    df = cached_category_data(data_file, file_mtime(data_file))
+
 with top_left_col:
     st.subheader("1. Select a FRED category", divider='rainbow')
-    fig = plot_category_sunburst(data_file)
+    with metrics.timer('app_stage_seconds', stage='category_sunburst'):
+        fig = cached_category_sunburst(data_file, file_mtime(data_file))
     selected_points = plotly_events(fig, click_event=True, select_event=True)
 
 with top_mid_col:
@@ -51,8 +133,12 @@ with top_mid_col:
 
         # Fetch series metadata for the selected category
         selected_category_id = filtered_data['id'].values[0]
-        series_metadata = fetch_all_series_metadata(selected_category_id, limit=20)
+        metadata_file = os.path.join("data", "metadata_series", f"{selected_category_id}.csv")
+        with metrics.timer('app_stage_seconds', stage='series_metadata'):
+            series_metadata = cached_series_metadata(selected_category_id, 20, file_mtime(metadata_file))
         if series_metadata is not None:
+            # Warm the metadata cache, and the tags of the rows shown, so row clicks are served locally
+            start_background_prefetch(int(selected_category_id), tag_series_ids=series_metadata['id'].tolist())
             # Display the series metadata in a clean table
             st.session_state.series_id_selection = st.dataframe(
                 series_metadata, 
@@ -61,23 +147,24 @@ with top_mid_col:
                 selection_mode="single-row"
             )
 
-            if 'series_id_selection' in st.session_state:
-                if st.session_state.series_id_selection['selection']['rows']:
-                    row_num = st.session_state.series_id_selection['selection']['rows'][0]
-                    selected_series_id = series_metadata.iloc[row_num]['id']
-                    series_info = fetch_series_info(selected_series_id)
-                    series_tags = fetch_series_tags(selected_series_id)
-                    # explanation = get_series_explanation(series_info)
-                    # st.subheader("Series Explanation")
-                    # st.write(explanation)
+            if st.session_state.series_id_selection['selection']['rows']:
+                row_num = st.session_state.series_id_selection['selection']['rows'][0]
+                selected_series_id = series_metadata.iloc[row_num]['id']
+
+if selected_series_id is not None:
+    try:
+        with metrics.timer('app_stage_seconds', stage='series_lookup'):
+            series_info = fetch_series_info(selected_series_id)
+            series_tags = fetch_series_tags(selected_series_id)
+    except SeriesNotFoundError as e:
+        st.error(f"Series not found: {e}")
+        selected_series_id = None
 
 
 
 with top_right_col:
     st.subheader("3. Get help understanding the series", divider='rainbow')
-    if 'series_id_selection' in st.session_state and \
-        st.session_state.series_id_selection['selection']['rows'] and \
-            selected_points and 'pointNumber' in selected_points[0]:
+    if selected_series_id is not None:
         # Generate user prompt
         user_prompt = f"""Explain the following series that was collected from FRED's data portal:\n\
             Series Info: {series_info}\n\n\
@@ -86,6 +173,10 @@ with top_right_col:
             where it was sourced from, and talk about it\'s significance (in bullets only) \
             and what kind of insights we can derive from it. Keep it less than 300 words"""
         with st.container(height=430):
+            # Show the pre-generated summary when it was made from the current version of the series
+            summary = get_series_summary(selected_series_id)
+            if summary is not None and summary['last_updated'] == series_info.get('last_updated'):
+                st.markdown(summary['summary'])
             # Display user prompt in an editable text box
             with st.expander("Use this query to have the LLM explain selected series", expanded=True):
                 user_prompt = st.text_area("Edit the user prompt below:", user_prompt, height=200)
@@ -94,64 +185,54 @@ with top_right_col:
                     # Add a button to generate the OpenAI-driven explanation
             if st.button("Generate Explanation"):
                 logging.info("Calling OpenAI API for series explanation")
-                explanation = call_openai(user_prompt, model_name="gpt-4o")
-                logging.info("Received explanation from OpenAI API")
                 st.subheader("Series Explanation")
-                st.markdown(explanation, )
+                st.write_stream(stream_openai(user_prompt, model_name="gpt-4o",
+                                              series_last_updated=series_info.get('last_updated')))
+                logging.info("Received explanation from OpenAI API")
 
 
 with bottom_left_col:
     st.subheader("4. Input series for plotting", divider='rainbow')
     with st.container(height=500):
         # Input fields for series_id, start_date, and end_date
-        if 'series_id_selection' in st.session_state:
-            if st.session_state.series_id_selection['selection']['rows']:
-                id = selected_series_id
-                series_id = st.text_input("Enter Series ID", value=id)
-        else:
-            series_id = st.text_input("Enter Series ID")
+        series_id = st.text_input("Enter Series ID", value=selected_series_id or "")
         start_date = st.date_input("Start Date", value=datetime(2000, 1, 1), help="Select the start date (YYYY/MM/DD)")
         end_date = st.date_input("End Date", value=datetime.today(), help="Select the end date (YYYY/MM/DD)")
 
-        if 'series_id_selection' in st.session_state:
-            if st.session_state.series_id_selection['selection']['rows']:
-                data_folder = 'data/series_data'
-                data_file = os.path.join(data_folder, f"{selected_series_id}.csv")
-                
-                series_info_file = os.path.join('data/series_info', f"{selected_series_id}.json")
-                
-                if os.path.exists(series_info_file):
-                    logging.info(f"Loading series info for series_id: {selected_series_id} from local file: {series_info_file}")
-                    with open(series_info_file, 'r') as file:
-                        series_info = json.load(file)
-                else:
-                    logging.info(f"Fetching series info for series_id: {selected_series_id} from FRED API")
-                    series_info = fetch_series_info(series_id)
-                
-                if not os.path.exists(data_file):
-                    df = fetch_fred_data(selected_series_id, start_date, end_date, series_info)
-                    save_data_to_csv(df, selected_series_id, data_folder)
-                else:
-                    logging.info(f"Loading data for series_id: {selected_series_id} from local file: {data_file}")
-                    df = load_data(data_file)
-                
-                if 'notes' not in series_info:
-                    series_info['notes'] = ''
-                st.markdown("#### Series information")
-                st.markdown(f"<p style='font-size: 16px; color: grey;'><strong>Title:</strong> <span style='color: darkgrey;'>{series_info['title']}</span></p>", unsafe_allow_html=True)
-                st.markdown(f"<p style='font-size: 16px; color: grey;'><strong>Frequency:</strong> <span style='color: darkgrey;'>{series_info['frequency']}</span></p>", unsafe_allow_html=True)
-                st.markdown(f"<p style='font-size: 16px; color: grey;'><strong>Notes:</strong> <span style='color: darkgrey;'>{series_info['notes']}</span></p>", unsafe_allow_html=True)
+        if selected_series_id is not None:
+            data_folder = OBSERVATIONS_FOLDER
+            data_file = observation_path(selected_series_id, data_folder)
+            
+            with metrics.timer('app_stage_seconds', stage='observations_sync'):
+                df, series_info = sync_series_data(selected_series_id, start_date, end_date, data_folder)
+            
+            if 'notes' not in series_info:
+                series_info['notes'] = ''
+            st.markdown("#### Series information")
+            st.markdown(f"<p style='font-size: 16px; color: grey;'><strong>Title:</strong> <span style='color: darkgrey;'>{series_info['title']}</span></p>", unsafe_allow_html=True)
+            st.markdown(f"<p style='font-size: 16px; color: grey;'><strong>Frequency:</strong> <span style='color: darkgrey;'>{series_info['frequency']}</span></p>", unsafe_allow_html=True)
+            st.markdown(f"<p style='font-size: 16px; color: grey;'><strong>Notes:</strong> <span style='color: darkgrey;'>{series_info['notes']}</span></p>", unsafe_allow_html=True)
 
 
 with bottom_right_col:
     st.subheader("5. Visualize the trend", divider='rainbow')
     with st.container(height=500):
-        if 'series_id_selection' in st.session_state:
-            if st.session_state.series_id_selection['selection']['rows']:
-                fig = plot_time_series(data_file)
-                if fig is None:
-                    logging.info(f"No data returned for series_id: {series_id} for the given time period")
-                    st.write('No data returned for series for given time period')
-                else:
-                    st.plotly_chart(fig, use_container_width=True)
-
+        if selected_series_id is not None:
+            # Views are computed locally from the stored observations, without API calls
+            units_col, frequency_col, aggregation_col = st.columns(3)
+            units = units_col.selectbox("Units", list(UNITS), format_func=UNITS.get)
+            frequency = frequency_col.selectbox(
+                "Frequency", [None] + lower_frequencies(series_info.get('frequency_short')),
+                format_func=lambda code: "As published" if code is None else FREQUENCIES[code])
+            aggregation = aggregation_col.selectbox("Aggregation", list(AGGREGATION_METHODS),
+                                                    format_func=AGGREGATION_METHODS.get, disabled=frequency is None)
+            with metrics.timer('app_stage_seconds', stage='time_series_plot'):
+                fig = cached_time_series(selected_series_id, data_folder, file_mtime(data_file), start_date, end_date,
+                                         units, frequency, aggregation)
+            if fig is None:
+                logging.info(f"No data returned for series_id: {series_id} for the given time period")
+                st.write('No data returned for series for given time period')
+            else:
+                st.plotly_chart(fig, use_container_width=True)
+
+metrics.observe('app_stage_seconds', time.perf_counter() - rerun_start, stage='rerun')
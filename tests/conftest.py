@@ -0,0 +1,82 @@
+import os
+import sys
+import types
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+try:
+    import config
+except ImportError:
+    # config.py holds the user's API keys and is not part of the repository
+    config = types.ModuleType('config')
+    config.FRED_API_KEY = 'test-fred-key'
+    config.OPENAI_API_KEY = 'test-openai-key'
+    sys.modules['config'] = config
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """
+    Run every test in its own folder, so the relative data/ paths and the metadata database start empty.
+    """
+    import metadata_store
+
+    monkeypatch.chdir(tmp_path)
+    # Connections are cached per thread and relative path, which now points elsewhere
+    monkeypatch.setattr(metadata_store._local, 'connections', {}, raising=False)
+    return tmp_path
+
+
+@pytest.fixture(scope='session')
+def fred_server():
+    """
+    A local mock FRED API shared by the tests.
+    """
+    from mock_fred_server import MockFredServer
+
+    server = MockFredServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def fred_api(fred_server):
+    """
+    Point the shared FRED client at the mock server for one test.
+    """
+    import fred_client
+
+    fred_client.configure_client(api_key='test', base_url=fred_server.base_url, requests_per_minute=60000,
+                                 background_requests_per_minute=60000, max_retries=0)
+    yield fred_server
+    fred_client.configure_client()
+
+
+@pytest.fixture(scope='session')
+def openai_server():
+    """
+    A local mock of the OpenAI chat completions API shared by the tests.
+    """
+    from mock_openai_server import MockOpenAIServer
+
+    server = MockOpenAIServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def openai_api(openai_server, monkeypatch):
+    """
+    Point the shared OpenAI client at the mock server for one test.
+    """
+    import utils
+
+    monkeypatch.setattr(config, 'OPENAI_BASE_URL', openai_server.base_url, raising=False)
+    utils.get_openai_client.cache_clear()
+    yield openai_server
+    utils.get_openai_client.cache_clear()
@@ -0,0 +1,90 @@
+import os
+import json
+
+import pandas as pd
+import pytest
+
+import fetch_series_with_offset as fetcher
+from fetch_series_with_offset import PROGRESS_FILE_NAME, SOURCE_BASE_FOLDER, combine_all_source_csv, fetch_series_with_offset
+
+
+def write_batch(folder, name, rows):
+    os.makedirs(folder, exist_ok=True)
+    pd.DataFrame(rows).to_csv(os.path.join(folder, name), index=False)
+
+
+def test_combined_catalog_is_deduplicated_first_wins(tmp_path):
+    base = str(tmp_path / 'source')
+    write_batch(os.path.join(base, 'bea'), 'batch_1.csv',
+                [{'id': 'GDP', 'title': 'GDP from bea', 'popularity': 90, 'source_tag': 'bea'},
+                 {'id': 'GDPC1', 'title': 'Real GDP', 'popularity': '', 'source_tag': 'bea'}])
+    # A later source repeating a series and adding a column
+    write_batch(os.path.join(base, 'bls'), 'batch_1.csv',
+                [{'id': 'GDP', 'title': 'GDP from bls', 'popularity': 10, 'source_tag': 'bls', 'notes': 'n'},
+                 {'id': 'UNRATE', 'title': 'Unemployment', 'popularity': 80, 'source_tag': 'bls', 'notes': 'u'}])
+
+    combined_path = combine_all_source_csv(base, max_workers=1, write_csv=True)
+    catalog = pd.read_parquet(combined_path)
+
+    assert list(catalog['id']) == ['GDP', 'GDPC1', 'UNRATE']
+    assert catalog.loc[0, 'title'] == 'GDP from bea'
+    assert str(catalog['popularity'].dtype) == 'Int64' and pd.isna(catalog.loc[1, 'popularity'])
+    assert pd.isna(catalog.loc[0, 'notes']) and catalog.loc[2, 'notes'] == 'u'
+    assert list(pd.read_csv(os.path.join(base, 'all_sources_combined.csv'))['id']) == ['GDP', 'GDPC1', 'UNRATE']
+
+
+def test_combined_catalog_is_not_rebuilt_when_nothing_changed(tmp_path):
+    base = str(tmp_path / 'source')
+    write_batch(os.path.join(base, 'bea'), 'batch_1.csv', [{'id': 'GDP', 'title': 'GDP', 'source_tag': 'bea'}])
+    combined_path = combine_all_source_csv(base, max_workers=1)
+    modified = os.path.getmtime(combined_path)
+
+    assert combine_all_source_csv(base, max_workers=1) == combined_path
+    assert os.path.getmtime(combined_path) == modified
+
+
+def batch_files(tag):
+    return sorted(name for name in os.listdir(os.path.join(SOURCE_BASE_FOLDER, tag)) if name.startswith('batch_'))
+
+
+def test_refetch_removes_batches_beyond_the_last_page(fred_api, monkeypatch):
+    monkeypatch.setattr(fred_api.data, 'series_per_tag', 2500)
+    assert fetch_series_with_offset('bls', limit=1000) == 2500
+    assert batch_files('bls') == ['batch_1.csv', 'batch_2.csv', 'batch_3.csv']
+
+    # The source lost series since the completed fetch
+    monkeypatch.setattr(fred_api.data, 'series_per_tag', 1500)
+    assert fetch_series_with_offset('bls', limit=1000) == 1500
+
+    assert batch_files('bls') == ['batch_1.csv', 'batch_2.csv']
+    catalog = pd.read_parquet(combine_all_source_csv(max_workers=1))
+    assert len(catalog) == 1500
+
+
+def test_interrupted_fetch_resumes_from_the_recorded_offset(fred_api, monkeypatch):
+    monkeypatch.setattr(fred_api.data, 'series_per_tag', 3500)
+    fetch_page = fetcher.fetch_series_page
+    requested = []
+
+    def interrupted_page(tag_source_name, limit, offset):
+        requested.append(offset)
+        if offset == 2000:
+            raise ConnectionError('connection reset')
+        return fetch_page(tag_source_name, limit, offset)
+
+    monkeypatch.setattr(fetcher, 'fetch_series_page', interrupted_page)
+    with pytest.raises(ConnectionError):
+        fetch_series_with_offset('bea', limit=1000, max_workers=1)
+
+    with open(os.path.join(SOURCE_BASE_FOLDER, 'bea', PROGRESS_FILE_NAME)) as file:
+        assert json.load(file) == {'limit': 1000, 'count': 3500, 'next_offset': 2000}
+    assert batch_files('bea') == ['batch_1.csv', 'batch_2.csv']
+
+    monkeypatch.setattr(fetcher, 'fetch_series_page', fetch_page)
+    before = fred_api.stats['requests:tags/series']
+    assert fetch_series_with_offset('bea', limit=1000, max_workers=1) == 1500
+
+    assert fred_api.stats['requests:tags/series'] - before == 2
+    assert batch_files('bea') == ['batch_1.csv', 'batch_2.csv', 'batch_3.csv', 'batch_4.csv']
+    with open(os.path.join(SOURCE_BASE_FOLDER, 'bea', PROGRESS_FILE_NAME)) as file:
+        assert json.load(file)['next_offset'] == 4000
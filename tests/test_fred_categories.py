@@ -0,0 +1,58 @@
+import os
+import json
+
+import pytest
+
+import fred_categories
+from fred_categories import fetch_all_categories
+
+
+def category_ids(categories):
+    return sorted(category['id'] for category in categories)
+
+
+def test_crawl_fetches_every_level(fred_api):
+    categories = fetch_all_categories('test', max_depth=3, checkpoint_file=None)
+
+    # 4 children of the root, 16 grandchildren and 64 great-grandchildren
+    assert len(categories) == 84 and len(set(category_ids(categories))) == 84
+    assert {(category['id'], category['parent_id'], category['level']) for category in categories} >= {
+        (1, 0, 1), (23, 2, 2), (234, 23, 3)}
+
+
+def test_interrupted_crawl_resumes_from_the_checkpoint(fred_api, monkeypatch):
+    checkpoint_file = os.path.join('data', 'categories', 'checkpoint.json')
+    monkeypatch.setattr(fred_categories, 'CHECKPOINT_INTERVAL', 1)
+    fred_get = fred_categories.fred_get
+
+    def interrupted_get(endpoint, category_id, **params):
+        if category_id == 3:
+            raise ConnectionError('connection reset')
+        return fred_get(endpoint, category_id=category_id, **params)
+
+    monkeypatch.setattr(fred_categories, 'fred_get', interrupted_get)
+    with pytest.raises(ConnectionError):
+        fetch_all_categories('test', max_depth=3, max_workers=1, checkpoint_file=checkpoint_file)
+
+    with open(checkpoint_file) as file:
+        state = json.load(file)
+    # The root and categories 1 and 2 are done; their children wait with the rest of level 2
+    assert category_ids(state['categories']) == [1, 2, 3, 4, 11, 12, 13, 14, 21, 22, 23, 24]
+    assert sorted(node[0] for node in state['pending']) == [3, 4, 11, 12, 13, 14, 21, 22, 23, 24]
+
+    monkeypatch.setattr(fred_categories, 'fred_get', fred_get)
+    before = fred_api.stats['requests:category/children']
+    categories = fetch_all_categories('test', max_depth=3, max_workers=2, checkpoint_file=checkpoint_file)
+
+    assert fred_api.stats['requests:category/children'] - before == 18
+    assert category_ids(categories) == category_ids(fetch_all_categories('test', max_depth=3, checkpoint_file=None))
+    assert not os.path.exists(checkpoint_file)
+
+
+def test_checkpoint_of_another_depth_is_ignored(fred_api):
+    checkpoint_file = 'checkpoint.json'
+    fred_categories.save_checkpoint(checkpoint_file, {'max_depth': 2, 'categories': [], 'pending': [[4, 'x', 2]]})
+
+    categories = fetch_all_categories('test', max_depth=1, checkpoint_file=checkpoint_file)
+
+    assert category_ids(categories) == [1, 2, 3, 4]
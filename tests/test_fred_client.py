@@ -0,0 +1,184 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+import fred_client
+from fred_client import MAX_BACKOFF_SECONDS, FredClient, SingleFlight, TokenBucket
+from mock_fred_server import FredApiError, MockFredServer, SyntheticFred
+
+
+class FlakyFred(SyntheticFred):
+    """
+    Synthetic API answering the first `failures` requests with a server error.
+    """
+
+    def __init__(self, failures, status_code=503):
+        super().__init__()
+        self.failures = failures
+        self.status_code = status_code
+
+    def respond(self, endpoint, params):
+        if self.failures > 0:
+            self.failures -= 1
+            raise FredApiError(self.status_code, "Service Unavailable")
+        return super().respond(endpoint, params)
+
+
+@pytest.fixture
+def serve():
+    """
+    Start mock servers for one test and stop them afterwards.
+    """
+    servers = []
+
+    def start(**kwargs):
+        server = MockFredServer(**kwargs)
+        server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def waits(monkeypatch):
+    """
+    Record the backoff sleeps of the client instead of waiting.
+    """
+    recorded = []
+    sleep = time.sleep
+
+    def record(seconds):
+        # Pacing waits of the token bucket are short and still slept
+        if seconds >= 0.5:
+            recorded.append(seconds)
+        else:
+            sleep(seconds)
+
+    monkeypatch.setattr(fred_client.time, 'sleep', record)
+    return recorded
+
+
+def client_for(server, **kwargs):
+    return FredClient(api_key='secret-key', base_url=server.base_url, requests_per_minute=60000, **kwargs)
+
+
+def test_server_errors_are_retried_with_exponential_backoff(serve, waits):
+    server = serve(data=FlakyFred(failures=2))
+
+    series = client_for(server, max_retries=3).get('series', series_id='GDPX')
+
+    assert series['seriess'][0]['id'] == 'GDPX'
+    assert server.stats['requests'] == 3
+    assert waits == [1.0, 2.0]
+
+
+def test_errors_are_raised_once_retries_run_out(serve, waits):
+    server = serve(data=FlakyFred(failures=5, status_code=500))
+
+    with pytest.raises(requests.HTTPError) as error:
+        client_for(server, max_retries=1).get('series', series_id='GDPX')
+
+    assert error.value.response.status_code == 500
+    assert 'secret-key' not in str(error.value)
+    assert server.stats['requests'] == 2
+
+
+def test_client_errors_are_not_retried(serve, waits):
+    server = serve()
+
+    with pytest.raises(requests.HTTPError):
+        client_for(server, max_retries=3).get('series', series_id='MISSINGX')
+
+    assert server.stats['requests'] == 1
+    assert waits == []
+
+
+def test_rate_limited_requests_wait_for_retry_after(serve, waits):
+    server = serve(requests_per_minute=6)
+    client = client_for(server, max_retries=2)
+    client.get('series', series_id='GDPX')
+
+    with pytest.raises(requests.HTTPError) as error:
+        client.get('series', series_id='GDPX')
+
+    assert error.value.response.status_code == 429
+    assert server.stats['rate_limited'] == 3
+    assert waits == [1, 1]
+
+
+class Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+def test_backoff_caps_retry_after():
+    client = FredClient(api_key='test')
+
+    assert client._backoff(0, Response({'Retry-After': '5'})) == 5
+    assert client._backoff(0, Response({'Retry-After': '86400'})) == MAX_BACKOFF_SECONDS
+    assert client._backoff(0, Response({'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'})) == 1.0
+    assert client._backoff(10) == MAX_BACKOFF_SECONDS
+
+
+def test_token_bucket_paces_requests():
+    bucket = TokenBucket(rate=20)
+
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    elapsed = time.monotonic() - start
+
+    # The first token is available at once, the other five come 1/20s apart
+    assert 0.24 <= elapsed < 0.5
+    assert not bucket.try_acquire()
+
+
+def test_token_bucket_caps_large_amounts_at_its_capacity():
+    bucket = TokenBucket(rate=1000, capacity=10)
+
+    start = time.monotonic()
+    bucket.acquire(10)
+    bucket.acquire(50)
+
+    assert time.monotonic() - start < 0.1
+
+
+def test_single_flight_shares_one_call_between_concurrent_callers():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow_lookup(key):
+        calls.append(key)
+        release.wait(5)
+        return f"record of {key}"
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(flight.do, 'GDP', slow_lookup, 'GDP') for _ in range(8)]
+        while not calls:
+            time.sleep(0.01)
+        # Let every caller reach the in-flight call before it finishes
+        time.sleep(0.1)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert calls == ['GDP']
+    assert results == ['record of GDP'] * 8
+    assert flight.calls == {}
+
+
+def test_single_flight_raises_and_forgets_finished_calls():
+    flight = SingleFlight()
+
+    def fail():
+        raise LookupError('missing')
+
+    with pytest.raises(LookupError):
+        flight.do('GDP', fail)
+    assert flight.do('GDP', lambda: 'retried') == 'retried'
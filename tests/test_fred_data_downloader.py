@@ -0,0 +1,156 @@
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+import fred_client
+import fred_data_downloader
+import mock_fred_server
+from fred_data_downloader import SeriesNotFoundError, fetch_series_info, fetch_series_tags, sync_series_data
+from metadata_store import MISSING_SERIES_TABLE, SERIES_INFO_TABLE, get_record
+from observation_store import load_observations, to_observation_frame
+
+# A monthly series of the mock API
+SERIES_ID = 'GDPX'
+
+
+def synthetic_frame(start=None, end=None):
+    df = to_observation_frame(pd.DataFrame(mock_fred_server.synthetic_observations(SERIES_ID, start, end)))
+    return df.astype({'date': 'datetime64[ns]'})
+
+
+def stored_frame():
+    return load_observations(SERIES_ID)[0][['date', 'value']]
+
+
+@pytest.fixture
+def requests_made(fred_api):
+    """
+    Return a function giving the number of requests per endpoint since the test started.
+    """
+    before = dict(fred_api.stats)
+
+    def count(endpoint):
+        key = f"requests:{endpoint}"
+        return fred_api.stats[key] - before.get(key, 0)
+
+    return count
+
+
+def test_first_sync_stores_everything_from_the_start_date(requests_made):
+    df, series_info = sync_series_data(SERIES_ID, '2020-01-01', '2022-06-30')
+
+    assert df['date'].min() == pd.Timestamp('2020-01-01')
+    assert df['date'].max() == pd.Timestamp('2022-06-01')
+    assert series_info['last_updated'] == mock_fred_server.SYNTHETIC_LAST_UPDATED
+    pd.testing.assert_frame_equal(stored_frame(), synthetic_frame('2020-01-01'))
+    assert requests_made('series/observations') == 1
+
+
+def test_recent_sync_makes_no_requests(requests_made):
+    sync_series_data(SERIES_ID, '2020-01-01', '2024-12-31')
+
+    df, _ = sync_series_data(SERIES_ID, '2021-01-01', '2021-12-31')
+
+    assert len(df) == 12
+    assert requests_made('series') == 1
+    assert requests_made('series/observations') == 1
+
+
+def test_unchanged_series_only_checks_the_series_record(requests_made):
+    sync_series_data(SERIES_ID, '2020-01-01', '2024-12-31')
+
+    df, _ = sync_series_data(SERIES_ID, '2020-01-01', '2024-12-31', max_age=0)
+
+    assert requests_made('series') == 2
+    assert requests_made('series/observations') == 1
+    pd.testing.assert_frame_equal(df[['date', 'value']], synthetic_frame('2020-01-01'))
+
+
+def test_new_release_is_merged_incrementally(requests_made, monkeypatch):
+    sync_series_data(SERIES_ID, '2020-01-01', '2024-12-31')
+    monkeypatch.setattr(mock_fred_server, 'SYNTHETIC_END', '2025-03-31')
+    monkeypatch.setattr(mock_fred_server, 'SYNTHETIC_LAST_UPDATED', '2025-04-01 08:01:02-05')
+
+    df, series_info = sync_series_data(SERIES_ID, '2020-01-01', None, max_age=0, revision_window_days=90)
+
+    fetch_start = pd.Timestamp('2024-12-01') - pd.Timedelta(days=90)
+    old = synthetic_frame('2020-01-01', '2024-12-31')
+    expected = pd.concat([old[old['date'] < fetch_start], synthetic_frame(fetch_start)], ignore_index=True)
+    assert requests_made('series/observations') == 2
+    assert series_info['last_updated'] == '2025-04-01 08:01:02-05'
+    assert df['date'].max() == pd.Timestamp('2025-03-01')
+    pd.testing.assert_frame_equal(stored_frame(), expected)
+    pd.testing.assert_frame_equal(df[['date', 'value']], expected)
+
+
+def test_earlier_start_date_is_backfilled(requests_made):
+    sync_series_data(SERIES_ID, '2020-01-01', '2024-12-31')
+
+    df, _ = sync_series_data(SERIES_ID, '2018-01-01', '2019-12-31')
+
+    assert requests_made('series/observations') == 2
+    pd.testing.assert_frame_equal(df[['date', 'value']], synthetic_frame('2018-01-01', '2019-12-31'))
+    pd.testing.assert_frame_equal(stored_frame(), synthetic_frame('2018-01-01'))
+
+    sync_series_data(SERIES_ID, '2018-06-01', '2019-12-31')
+    assert requests_made('series/observations') == 2
+
+
+def test_narrow_request_does_not_truncate_the_store(requests_made):
+    sync_series_data(SERIES_ID, '2020-01-01', '2020-12-31')
+
+    df, _ = sync_series_data(SERIES_ID, '2020-01-01', '2024-12-31')
+
+    assert df['date'].max() == pd.Timestamp('2024-12-01')
+    assert requests_made('series/observations') == 1
+
+
+def test_concurrent_metadata_lookups_make_one_request():
+    server = mock_fred_server.MockFredServer(latency=0.2)
+    server.start()
+    try:
+        fred_client.configure_client(api_key='test', base_url=server.base_url, requests_per_minute=60000,
+                                     max_retries=0)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            records = list(executor.map(fetch_series_info, ['GDPX'] * 8))
+    finally:
+        fred_client.configure_client()
+        server.stop()
+
+    assert server.stats['requests:series'] == 1
+    assert all(record['id'] == 'GDPX' for record in records)
+
+
+def test_missing_series_are_cached(requests_made, monkeypatch):
+    with pytest.raises(SeriesNotFoundError):
+        fetch_series_info('MISSINGX')
+    with pytest.raises(SeriesNotFoundError):
+        fetch_series_tags('MISSINGX')
+
+    assert requests_made('series') == 1
+    assert requests_made('series/tags') == 0
+    assert 'does not exist' in get_record(MISSING_SERIES_TABLE, 'MISSINGX')[0]
+
+    monkeypatch.setattr(fred_data_downloader, 'MISSING_SERIES_TTL', 0)
+    with pytest.raises(SeriesNotFoundError):
+        fetch_series_info('MISSINGX')
+    assert requests_made('series') == 2
+
+
+def test_legacy_records_are_imported_without_revalidation(requests_made):
+    os.makedirs(fred_data_downloader.SERIES_INFO_FOLDER)
+    legacy_path = os.path.join(fred_data_downloader.SERIES_INFO_FOLDER, 'GDPX.json')
+    with open(legacy_path, 'w') as file:
+        json.dump({'id': 'GDPX', 'title': 'Legacy title'}, file)
+    old = time.time() - 30 * 24 * 3600
+    os.utime(legacy_path, (old, old))
+
+    assert fetch_series_info('GDPX')['title'] == 'Legacy title'
+    assert fetch_series_info('GDPX')['title'] == 'Legacy title'
+
+    assert requests_made('series') == 0
+    assert time.time() - get_record(SERIES_INFO_TABLE, 'GDPX')[1] < 60
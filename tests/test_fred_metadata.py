@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import fred_metadata
+from fred_client import FredClient, background_requests
+from fred_data_downloader import SERIES_INFO_TTL, fetch_series_info
+from metadata_store import SERIES_INFO_TABLE, SERIES_TAGS_TABLE, get_record, put_record
+
+
+@pytest.fixture
+def prefetch_state(monkeypatch):
+    monkeypatch.setattr(fred_metadata, '_prefetched_categories', set())
+    monkeypatch.setattr(fred_metadata, '_current_prefetch', None)
+
+
+def test_prefetch_only_fetches_tags_of_the_given_rows(fred_api):
+    before = fred_api.stats['requests:series/tags']
+
+    count = fred_metadata.prefetch_category_metadata(7, tag_series_ids=['C7S0', 'C7S1'])
+
+    assert count == 2500
+    assert fred_api.stats['requests:series/tags'] - before == 2
+    assert get_record(SERIES_INFO_TABLE, 'C7S2400') is not None
+    assert get_record(SERIES_TAGS_TABLE, 'C7S1') is not None
+    assert get_record(SERIES_TAGS_TABLE, 'C7S2') is None
+
+
+def test_prefetch_stops_once_cancelled(fred_api):
+    cancel_event = threading.Event()
+    cancel_event.set()
+    before = fred_api.stats['requests:series/tags']
+
+    fred_metadata.prefetch_category_metadata(8, cancel_event=cancel_event)
+
+    assert fred_api.stats['requests:series/tags'] == before
+
+
+def test_new_selection_replaces_the_running_prefetch(fred_api, prefetch_state):
+    fred_metadata.start_background_prefetch(11)
+    first_id, first_cancel, first_future = fred_metadata._current_prefetch
+    fred_metadata.start_background_prefetch(12, tag_series_ids=['C12S0'])
+    second_future = fred_metadata._current_prefetch[2]
+
+    second_future.result(timeout=30)
+    assert first_cancel.is_set()
+    assert first_future.cancelled() or first_future.done()
+    assert fred_metadata._prefetched_categories == {12}
+
+
+def test_background_requests_use_their_own_budget(fred_api):
+    client = FredClient(api_key='test', base_url=fred_api.base_url, requests_per_minute=60000,
+                        background_requests_per_minute=600, max_retries=0)
+
+    start = time.monotonic()
+    for _ in range(4):
+        client.get('series', series_id='GDP')
+    interactive_seconds = time.monotonic() - start
+
+    start = time.monotonic()
+    with background_requests():
+        for _ in range(4):
+            client.get('series', series_id='GDP')
+    background_seconds = time.monotonic() - start
+
+    # 600 requests per minute leave 0.1s between background requests after the first
+    assert background_seconds >= 0.25
+    assert interactive_seconds < background_seconds
+
+
+def test_catalog_import_keeps_newer_records_and_the_catalog_age(fred_api):
+    catalog_time = time.time() - 2 * SERIES_INFO_TTL
+    pd.DataFrame({'id': ['OLDX', 'NEWX', 'GDPX'], 'title': ['Catalog'] * 3,
+                  'source_tag': ['bea'] * 3}).to_parquet('catalog.parquet')
+    os.utime('catalog.parquet', (catalog_time, catalog_time))
+    put_record(SERIES_INFO_TABLE, 'OLDX', {'id': 'OLDX', 'title': 'Older'}, fetched_at=catalog_time - 60)
+    put_record(SERIES_INFO_TABLE, 'NEWX', {'id': 'NEWX', 'title': 'Fetched from fred/series'})
+
+    assert fred_metadata.import_catalog_metadata('catalog.parquet') == 2
+
+    assert get_record(SERIES_INFO_TABLE, 'OLDX') == ({'id': 'OLDX', 'title': 'Catalog'}, catalog_time)
+    assert get_record(SERIES_INFO_TABLE, 'NEWX')[0]['title'] == 'Fetched from fred/series'
+    # The imported record is as old as the catalog, so it is revalidated
+    before = fred_api.stats['requests:series']
+    assert fetch_series_info('GDPX')['title'] == 'Synthetic Series GDPX'
+    assert fred_api.stats['requests:series'] - before == 1
@@ -0,0 +1,38 @@
+import logging
+
+from instrumentation import MetricsRegistry, install_log_redaction, redact
+
+
+def test_redact_removes_api_key_parameters_and_secrets():
+    text = "GET https://api.stlouisfed.org/fred/series?api_key=abc123&series_id=GDP with sk-secret"
+
+    redacted = redact(text, secrets=('sk-secret',))
+
+    assert 'abc123' not in redacted and 'sk-secret' not in redacted
+    assert 'series_id=GDP' in redacted
+
+
+def test_later_secrets_are_added_to_an_installed_filter():
+    install_log_redaction(secrets=('first-secret',))
+    install_log_redaction(secrets=('second-secret',))
+    handler = logging.getLogger().handlers[0]
+    record = logging.LogRecord('test', logging.INFO, __file__, 0, "keys %s %s", ('first-secret', 'second-secret'), None)
+
+    for log_filter in handler.filters:
+        log_filter.filter(record)
+
+    assert 'first-secret' not in record.getMessage()
+    assert 'second-secret' not in record.getMessage()
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    for value in (0.001, 0.02, 0.02, 7):
+        registry.observe('latency', value, endpoint='series')
+
+    histogram = registry.snapshot()['histograms'][0]
+
+    assert histogram['count'] == 4
+    assert histogram['buckets']['0.005'] == 1
+    assert histogram['buckets']['0.025'] == 3
+    assert histogram['buckets']['30.0'] == 4
@@ -0,0 +1,177 @@
+import os
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import fred_client
+from fred_client import fred_get_raw
+from mock_fred_server import synthetic_observations
+from observation_store import (OBSERVATIONS_FOLDER, SERIES_INFO_METADATA_KEY, convert_csv_to_parquet, load_observations,
+                               observation_path, parse_observations, read_series_info, save_observations,
+                               to_observation_frame)
+
+SERIES_INFO = {'id': 'GDPX', 'title': 'Synthetic Series GDPX', 'frequency_short': 'M',
+               'last_updated': '2025-01-02 08:01:02-06'}
+
+
+def api_frame():
+    """
+    Observations as the FRED API returns them, with string columns and '.' for missing values.
+    """
+    return pd.DataFrame({'realtime_start': ['2025-01-02'] * 3, 'realtime_end': ['2025-01-02'] * 3,
+                         'date': ['2020-01-01', '2020-02-01', '2020-03-01'], 'value': ['1.5', '.', '2.25']})
+
+
+def test_to_observation_frame_types_api_columns():
+    df = to_observation_frame(api_frame())
+
+    assert list(df.columns) == ['date', 'value']
+    assert pd.api.types.is_datetime64_dtype(df['date'])
+    assert df['value'].dtype == 'float64'
+    assert np.isnan(df['value'][1]) and df['value'][2] == 2.25
+
+
+def test_save_and_load_keep_metadata_once_in_the_schema():
+    sync_state = {'checked_at': 1735826462.0, 'start': '2020-01-01'}
+
+    file_path = save_observations(api_frame(), 'GDPX', SERIES_INFO, sync_state=sync_state)
+    df, series_info = load_observations('GDPX')
+
+    assert file_path == observation_path('GDPX')
+    assert pq.read_schema(file_path).names == ['date', 'value']
+    assert json.loads(pq.read_schema(file_path).metadata[SERIES_INFO_METADATA_KEY]) == SERIES_INFO
+    assert series_info == SERIES_INFO == read_series_info(file_path)
+    assert df.attrs['sync_state'] == sync_state
+    pd.testing.assert_frame_equal(df[['date', 'value']], to_observation_frame(api_frame()), check_dtype=False)
+
+
+def test_save_replaces_the_file_atomically():
+    save_observations(api_frame(), 'GDPX', SERIES_INFO)
+    save_observations(api_frame().iloc[:1], 'GDPX', dict(SERIES_INFO, title='Updated'))
+
+    df, series_info = load_observations('GDPX')
+
+    assert len(df) == 1 and series_info['title'] == 'Updated'
+    assert os.listdir(OBSERVATIONS_FOLDER) == ['GDPX.parquet']
+
+
+def test_convert_legacy_csv_moves_broadcast_metadata_to_the_schema(tmp_path):
+    csv_folder = tmp_path / 'series_data'
+    csv_folder.mkdir()
+    legacy = api_frame().assign(id='GDPX', title='Synthetic Series GDPX', frequency_short='M')
+    legacy.to_csv(csv_folder / 'GDPX.csv', index=False)
+
+    convert_csv_to_parquet(str(csv_folder))
+    df, series_info = load_observations('GDPX')
+
+    assert series_info == {'id': 'GDPX', 'title': 'Synthetic Series GDPX', 'frequency_short': 'M'}
+    assert list(df.columns) == ['date', 'value']
+    assert len(df) == 3 and np.isnan(df['value'][1])
+
+
+def observations_response(observations, indent=None, **paging):
+    paging = {'count': len(observations), 'offset': 0, 'limit': 100000, **paging}
+    body = {'realtime_start': '2025-01-02', 'realtime_end': '2025-01-02', 'observation_start': '1600-01-01',
+            'observation_end': '9999-12-31', 'units': 'lin', **paging, 'observations': observations}
+    separators = (',', ':') if indent is None else None
+    return json.dumps(body, indent=indent, separators=separators).encode()
+
+
+def expected_frame(observations, include_realtime):
+    df = pd.DataFrame(observations)
+    expected = pd.DataFrame({
+        'date': pd.to_datetime(df['date']).astype('datetime64[ns]'),
+        'value': pd.to_numeric(df['value'].replace('.', None), errors='coerce').astype('float64'),
+    })
+    if include_realtime:
+        expected.insert(0, 'realtime_end', pd.to_datetime(df['realtime_end']).astype('datetime64[s]'))
+        expected.insert(0, 'realtime_start', pd.to_datetime(df['realtime_start']).astype('datetime64[s]'))
+    return expected
+
+
+@pytest.fixture
+def json_decodes(monkeypatch):
+    """
+    Count the full JSON decodes made by the fallback of parse_observations.
+    """
+    calls = []
+    json_loads = fred_client.json_loads
+
+    def counting_json_loads(content):
+        calls.append(len(content))
+        return json_loads(content)
+
+    monkeypatch.setattr(fred_client, 'json_loads', counting_json_loads)
+    return calls
+
+
+@pytest.mark.parametrize('indent', [None, 2])
+@pytest.mark.parametrize('include_realtime', [False, True])
+def test_fast_path_matches_full_decode(indent, include_realtime, json_decodes):
+    observations = synthetic_observations('GDPX', '2000-01-01', '2005-12-31')
+    content = observations_response(observations, indent)
+
+    df = parse_observations(content, include_realtime)
+
+    assert json_decodes == []
+    pd.testing.assert_frame_equal(df, expected_frame(observations, include_realtime))
+
+
+def test_count_mismatch_falls_back_to_full_decode(json_decodes):
+    observations = synthetic_observations('GDPX', '2000-01-01', '2000-12-31')
+    content = observations_response(observations, count=len(observations) + 1)
+
+    df = parse_observations(content, include_realtime=True)
+
+    assert len(json_decodes) == 1
+    pd.testing.assert_frame_equal(df, expected_frame(observations, include_realtime=True))
+
+
+def test_fast_path_expects_the_page_size_of_offset_and_limit(json_decodes):
+    observations = synthetic_observations('GDPX', '2000-01-01', '2000-12-31')
+    last_page = observations_response(observations[:5], count=25, offset=20, limit=10)
+    middle_page = observations_response(observations[:10], count=25, offset=10, limit=10)
+
+    assert len(parse_observations(last_page)) == 5
+    assert len(parse_observations(middle_page)) == 10
+    assert json_decodes == []
+
+
+def test_empty_response():
+    df = parse_observations(observations_response([]), include_realtime=True)
+
+    assert list(df.columns) == ['realtime_start', 'realtime_end', 'date', 'value']
+    assert df.empty
+
+
+def test_missing_values_are_nan():
+    observations = [{'realtime_start': '2025-01-02', 'realtime_end': '2025-01-02', 'date': '2020-01-01', 'value': '.'},
+                    {'realtime_start': '2025-01-02', 'realtime_end': '2025-01-02', 'date': '2020-02-01', 'value': '1.5'}]
+
+    df = parse_observations(observations_response(observations))
+
+    assert np.isnan(df['value'][0]) and df['value'][1] == 1.5
+
+
+@pytest.mark.parametrize('count', [2, 3])
+def test_only_missing_values(count):
+    # A matching count takes the fast path (bytes), a wrong one the full decode (str)
+    observations = [{'realtime_start': '2025-01-02', 'realtime_end': '2025-01-02', 'date': f"2020-0{month}-01",
+                     'value': '.'} for month in (1, 2)]
+
+    df = parse_observations(observations_response(observations, count=count))
+
+    assert len(df) == 2 and np.isnan(df['value']).all()
+
+
+def test_mock_server_response_parses_like_full_decode(fred_api, json_decodes):
+    content = fred_get_raw('series/observations', series_id='GDPX', observation_start='1990-01-01')
+    observations = json.loads(content)['observations']
+
+    df = parse_observations(content, include_realtime=True)
+
+    assert json_decodes == []
+    pd.testing.assert_frame_equal(df, expected_frame(observations, include_realtime=True))
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from panel_store import Panel
+
+
+@pytest.fixture
+def frame():
+    """
+    Three daily business-day series with scattered missing values.
+    """
+    rng = np.random.default_rng(7)
+    dates = pd.bdate_range('2018-01-01', '2021-12-31').astype('datetime64[ns]')
+    values = 100 + np.cumsum(rng.normal(0, 1, (len(dates), 3)), axis=0)
+    values[:, 1] += 0.5 * values[:, 0]
+    values[rng.random(values.shape) < 0.05] = np.nan
+    values[:40, 2] = np.nan
+    return pd.DataFrame(values, index=dates, columns=['A', 'B', 'C'])
+
+
+def panel_of(frame, frequency='D'):
+    return Panel(frame.index.to_numpy(), list(frame.columns), frame.to_numpy(), frequency)
+
+
+@pytest.mark.parametrize('frequency, period', [('W', 'W'), ('M', 'M'), ('Q', 'Q'), ('A', 'Y')])
+@pytest.mark.parametrize('how', ['mean', 'sum', 'last'])
+def test_resample_matches_pandas(frame, frequency, period, how):
+    resampled = panel_of(frame).resample(frequency, how)
+
+    groups = frame.groupby(frame.index.to_period(period).to_timestamp())
+    expected = groups.last() if how == 'last' else groups.mean() if how == 'mean' else groups.sum(min_count=1)
+    expected.index = expected.index.astype('datetime64[ns]')
+    pd.testing.assert_frame_equal(resampled.to_frame(), expected, check_names=False, check_freq=False)
+    assert resampled.frequency == frequency
+
+
+@pytest.mark.parametrize('how', ['mean', 'sum', 'std'])
+def test_rolling_matches_pandas(frame, how):
+    rolled = panel_of(frame).rolling(20, how)
+
+    expected = getattr(frame.rolling(20), how)()
+    pd.testing.assert_frame_equal(rolled.to_frame(), expected, check_freq=False)
+
+
+def test_rolling_window_longer_than_panel(frame):
+    rolled = panel_of(frame.iloc[:5]).rolling(20)
+
+    assert np.isnan(rolled.values).all()
+
+
+def test_corr_matches_pandas(frame):
+    frame = frame.copy()
+    frame['D'] = np.nan
+    frame.iloc[:2, 3] = [1.0, 2.0]
+
+    correlation = panel_of(frame).corr(min_periods=3)
+
+    pd.testing.assert_frame_equal(correlation, frame.corr(min_periods=3))
+
+
+def test_year_ago_uses_the_last_observation_of_each_series(frame):
+    panel = panel_of(frame)
+
+    previous = panel.year_ago().to_frame()
+
+    filled = frame.ffill()
+    for date in [pd.Timestamp('2019-03-04'), pd.Timestamp('2021-03-01'), pd.Timestamp('2021-12-31')]:
+        expected = filled.loc[:date - pd.DateOffset(years=1)].iloc[-1]
+        pd.testing.assert_series_equal(previous.loc[date], expected, check_names=False)
+    # Nothing is observed a year before the first rows, nor before series C starts
+    assert np.isnan(previous.loc[:'2018-12-31'].to_numpy()).all()
+    assert np.isnan(previous.loc['2019-01-01':'2019-02-25', 'C'].to_numpy()).all()
+    assert not np.isnan(previous.loc['2019-03-01':].to_numpy()).any()
+
+
+def test_unknown_operations_raise(frame):
+    panel = panel_of(frame)
+
+    with pytest.raises(ValueError):
+        panel.resample('X')
+    with pytest.raises(ValueError):
+        panel.resample('M', 'median')
+    with pytest.raises(ValueError):
+        panel.rolling(5, 'median')
@@ -0,0 +1,132 @@
+import argparse
+import os
+
+import pytest
+
+import pipeline
+from pipeline import Stage, load_state, run_pipeline
+
+STATE_FILE = os.path.join('data', 'pipeline_state.json')
+
+
+@pytest.fixture
+def stages(monkeypatch):
+    """
+    Replace the pipeline's stages with a small graph recording the stages it runs:
+    raw -> clean -> report, plus an independent extra stage.
+    """
+    runs = []
+    failing = set()
+
+    def writer(name, output):
+        def run(options):
+            runs.append(name)
+            if name in failing:
+                raise RuntimeError(f"{name} failed")
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            with open(output, 'w') as file:
+                file.write(name)
+        return run
+
+    graph = [
+        Stage('raw', writer('raw', 'data/raw.txt'), outputs=lambda options: ['data/raw.txt'], max_age=3600,
+              settings=lambda options: {'sources': sorted(getattr(options, 'sources', None) or [])}),
+        Stage('clean', writer('clean', 'data/clean.txt'), depends_on=['raw'],
+              outputs=lambda options: ['data/clean.txt']),
+        Stage('report', writer('report', 'data/report.txt'), depends_on=['clean'],
+              outputs=lambda options: ['data/report.txt']),
+        Stage('extra', writer('extra', 'data/extra.txt'), outputs=lambda options: ['data/extra.txt']),
+    ]
+    monkeypatch.setattr(pipeline, 'STAGES', {stage.name: stage for stage in graph})
+    return runs, failing
+
+
+def run(options=None, **kwargs):
+    return run_pipeline(options or argparse.Namespace(), state_file=STATE_FILE, **kwargs)
+
+
+def test_runs_every_stage_once_then_skips_them(stages):
+    runs, _ = stages
+
+    assert set(run().values()) == {'completed'}
+    assert runs.index('raw') < runs.index('clean') < runs.index('report')
+    assert set(load_state(STATE_FILE)) == {'raw', 'clean', 'report', 'extra'}
+
+    runs.clear()
+    assert set(run().values()) == {'up to date'}
+    assert runs == []
+
+
+def test_rerun_stage_makes_its_dependents_stale(stages):
+    runs, _ = stages
+    run()
+    runs.clear()
+
+    assert run(targets=['raw'], force=True) == {'raw': 'completed'}
+    results = run()
+
+    assert results == {'raw': 'up to date', 'clean': 'completed', 'report': 'completed', 'extra': 'up to date'}
+    assert runs == ['raw', 'clean', 'report']
+
+
+def test_missing_output_or_expired_stage_is_rerun(stages):
+    runs, _ = stages
+    run()
+    runs.clear()
+
+    os.remove('data/extra.txt')
+    state = load_state(STATE_FILE)
+    state['raw']['completed_at'] -= 7200
+    pipeline.save_state(state, STATE_FILE)
+
+    results = run()
+
+    assert results['extra'] == 'completed'
+    assert results['raw'] == results['clean'] == results['report'] == 'completed'
+
+
+def test_changed_settings_make_the_stage_stale(stages):
+    runs, _ = stages
+    run(argparse.Namespace(sources=['bls', 'bea']))
+    runs.clear()
+
+    assert set(run(argparse.Namespace(sources=['bea', 'bls'])).values()) == {'up to date'}
+    results = run(argparse.Namespace(sources=['bls']))
+
+    assert results == {'raw': 'completed', 'clean': 'completed', 'report': 'completed', 'extra': 'up to date'}
+    assert load_state(STATE_FILE)['raw']['settings'] == {'sources': ['bls']}
+    assert load_state(STATE_FILE)['extra']['settings'] == {}
+
+
+def test_failed_stage_blocks_its_dependents(stages):
+    runs, failing = stages
+    failing.add('clean')
+
+    results = run()
+
+    assert results == {'raw': 'completed', 'clean': 'failed', 'report': 'blocked', 'extra': 'completed'}
+    assert 'report' not in runs
+    assert 'clean' not in load_state(STATE_FILE)
+
+
+def test_dry_run_reports_without_running(stages):
+    runs, _ = stages
+    run(targets=['raw'])
+    runs.clear()
+
+    results = run(targets=['report'], dry_run=True)
+
+    assert results == {'raw': 'up to date', 'clean': 'would run', 'report': 'would run'}
+    assert runs == []
+
+
+def test_no_deps_only_runs_the_targets(stages):
+    runs, _ = stages
+
+    assert run(targets=['report'], with_dependencies=False) == {'report': 'completed'}
+    assert runs == ['report']
+
+
+def test_unknown_stage_is_rejected(stages):
+    with pytest.raises(ValueError):
+        run(targets=['nope'])
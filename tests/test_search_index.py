@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+from metadata_store import SERIES_TAGS_TABLE, put_record
+from search_index import SEARCH_INDEX_PATH, build_search_index, connect_search_index, search_series, suggest_terms
+
+
+def write_catalog(rows, catalog_file='catalog.parquet'):
+    columns = ['id', 'title', 'notes', 'units', 'source_tag', 'frequency', 'popularity']
+    pd.DataFrame(rows, columns=columns).to_parquet(catalog_file)
+    return catalog_file
+
+
+@pytest.fixture
+def catalog_file():
+    return write_catalog([
+        ('NOTESONLY', 'Industrial Production Index', 'Compare with the unemployment rate of the month.',
+         'Index', 'frb', 'Monthly', 99),
+        ('UNRATE', 'Unemployment Rate', 'Share of the labor force without a job.', 'Percent', 'bls', 'Monthly', 10),
+        ('PAYEMS', 'All Employees, Total Nonfarm', 'Number of jobs.', 'Thousands of Persons', 'bls', 'Monthly', 80),
+        ('GDP', 'Gross Domestic Product', 'Value of final goods and services.', 'Billions of Dollars', 'bea',
+         'Quarterly', 95),
+    ])
+
+
+def test_title_matches_rank_above_notes_matches(catalog_file):
+    assert build_search_index(catalog_file) == 4
+
+    results = search_series('unemployment')
+
+    # NOTESONLY is more popular, but only mentions the word in its notes
+    assert results['id'].tolist() == ['UNRATE', 'NOTESONLY']
+    assert results.iloc[0].to_dict() == {'id': 'UNRATE', 'title': 'Unemployment Rate', 'units': 'Percent',
+                                         'frequency': 'Monthly', 'source': 'bls', 'popularity': 10}
+
+
+def test_all_words_must_match_and_the_last_is_a_prefix(catalog_file):
+    build_search_index(catalog_file)
+
+    assert search_series('gross dom')['id'].tolist() == ['GDP']
+    assert search_series('gross unemployment').empty
+    assert search_series('  ,;  ').empty
+
+
+def test_series_tags_from_the_metadata_store_are_searchable(catalog_file):
+    put_record(SERIES_TAGS_TABLE, 'PAYEMS', {'tags': [{'name': 'payroll'}, {'name': 'employment'}]})
+
+    build_search_index(catalog_file)
+
+    assert search_series('payroll')['id'].tolist() == ['PAYEMS']
+
+
+def test_suggest_terms_completes_the_last_word(catalog_file):
+    build_search_index(catalog_file)
+
+    assert suggest_terms('unem') == ['unemployment']
+    assert set(suggest_terms('monthly pro')) == {'product', 'production'}
+    assert suggest_terms('zzz') == []
+    assert suggest_terms('') == []
+
+
+def test_rebuild_swaps_the_index_atomically(catalog_file):
+    build_search_index(catalog_file)
+    reader = connect_search_index()
+    assert reader.execute("SELECT count(*) FROM series").fetchone() == (4,)
+
+    build_search_index(write_catalog([('CPI', 'Consumer Price Index', '', 'Index', 'bls', 'Monthly', 90)]))
+
+    # An open reader keeps the old index, new readers see the new one
+    assert reader.execute("SELECT count(*) FROM series").fetchone() == (4,)
+    reader.close()
+    assert search_series('consumer')['id'].tolist() == ['CPI']
+    assert search_series('unemployment').empty
+
+
+def test_failed_rebuild_leaves_the_old_index(catalog_file):
+    build_search_index(catalog_file)
+
+    with pytest.raises(Exception):
+        build_search_index('missing.parquet')
+
+    assert search_series('unemployment')['id'].tolist() == ['UNRATE', 'NOTESONLY']
+    reader = connect_search_index(SEARCH_INDEX_PATH)
+    assert reader.execute("SELECT count(*) FROM series").fetchone() == (4,)
+    reader.close()
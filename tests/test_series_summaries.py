@@ -0,0 +1,128 @@
+import pandas as pd
+import pytest
+
+import series_summaries
+import utils
+from metadata_store import SERIES_INFO_TABLE, SERIES_SUMMARIES_TABLE, SERIES_TAGS_TABLE, get_records, put_record
+from series_summaries import is_summary_current, load_summary_items, pack_batches, summarize_catalog
+
+SERIES_IDS = [f"S{number}" for number in range(30)]
+
+
+class WhitespaceEncoder:
+    """
+    Stand-in for a tiktoken encoder that counts whitespace-separated words.
+    """
+
+    def encode(self, text):
+        return text.split()
+
+
+@pytest.fixture(autouse=True)
+def whitespace_tokens(monkeypatch):
+    monkeypatch.setattr(utils, 'get_encoder', lambda model_name: WhitespaceEncoder())
+
+
+@pytest.fixture
+def catalog_file():
+    catalog = pd.DataFrame({
+        'id': SERIES_IDS,
+        'title': [f"Synthetic Series {series_id}" for series_id in SERIES_IDS],
+        'frequency': 'Monthly',
+        'units': 'Index',
+        'last_updated': '2025-01-02 08:01:02-06',
+        'notes': [f"Notes on {series_id} " * 5 for series_id in SERIES_IDS],
+    })
+    catalog.to_parquet('catalog.parquet')
+    # The metadata store is preferred over the catalog row
+    put_record(SERIES_INFO_TABLE, 'S0', {'id': 'S0', 'title': 'Gross Domestic Product',
+                                          'last_updated': '2025-02-01 07:00:00-06'})
+    put_record(SERIES_TAGS_TABLE, 'S0', {'tags': [{'name': 'gdp'}, {'name': 'quarterly'}]})
+    return 'catalog.parquet'
+
+
+def test_load_summary_items_prefers_the_metadata_store(catalog_file):
+    items, skipped = load_summary_items(catalog_file)
+
+    assert skipped == 0
+    assert [series_id for series_id, _, _ in items] == SERIES_IDS
+    series_id, last_updated, description = items[0]
+    assert last_updated == '2025-02-01 07:00:00-06'
+    assert 'title: Gross Domestic Product' in description and 'tags: gdp, quarterly' in description
+    assert items[1][1] == '2025-01-02 08:01:02-06'
+    assert 'notes: Notes on S1' in items[1][2]
+
+
+def test_pack_batches_respects_the_token_and_series_limits():
+    items = [(f"S{number}", None, 'word ' * 10) for number in range(10)]
+    system_tokens = len(series_summaries.SUMMARY_SYSTEM_PROMPT.split())
+
+    batches = pack_batches(items, max_prompt_tokens=system_tokens + 40, max_series=3)
+
+    assert [len(batch) for batch, _ in batches] == [3, 3, 3, 1]
+    assert all(tokens == 12 * len(batch) for batch, tokens in batches)
+
+    oversized = pack_batches([('BIG', None, 'word ' * 500)] + items[:2], max_prompt_tokens=system_tokens + 40)
+    assert [len(batch) for batch, _ in oversized] == [1, 2]
+
+
+def test_summarize_catalog_end_to_end_and_resume(catalog_file, openai_api):
+    before = openai_api.stats['requests']
+
+    counts = summarize_catalog(catalog_file, max_prompt_tokens=200, max_workers=2, requests_per_minute=60000)
+
+    requests = openai_api.stats['requests'] - before
+    assert counts == {'summarized': 30, 'skipped': 0, 'failed': 0}
+    assert 1 < requests < 30
+    summaries = get_records(SERIES_SUMMARIES_TABLE, SERIES_IDS)
+    assert sorted(summaries) == sorted(SERIES_IDS)
+    assert summaries['S3'][0] == {'summary': 'Summary of S3.', 'model': series_summaries.SUMMARY_MODEL,
+                                  'last_updated': '2025-01-02 08:01:02-06'}
+    assert is_summary_current('S0', '2025-02-01 07:00:00-06', series_summaries.SUMMARY_MODEL)
+    assert any('tags: gdp, quarterly' in request['messages'][-1]['content']
+               for request in openai_api.received[before:])
+
+    assert summarize_catalog(catalog_file) == {'summarized': 0, 'skipped': 30, 'failed': 0}
+    assert openai_api.stats['requests'] - before == requests
+
+    # A new release of one series only resummarizes that series
+    put_record(SERIES_INFO_TABLE, 'S0', {'id': 'S0', 'title': 'Gross Domestic Product',
+                                          'last_updated': '2025-03-01 07:00:00-06'})
+    assert summarize_catalog(catalog_file) == {'summarized': 1, 'skipped': 29, 'failed': 0}
+    assert openai_api.stats['requests'] - before == requests + 1
+
+
+def test_series_missing_from_the_reply_are_retried_next_run(catalog_file, openai_api, monkeypatch):
+    monkeypatch.setattr(openai_api, 'reply', lambda request: '```json\n{"S1": "Only S1."}\n```')
+
+    counts = summarize_catalog(catalog_file, series_ids=['S1', 'S2'])
+
+    assert counts == {'summarized': 1, 'skipped': 0, 'failed': 1}
+    assert get_records(SERIES_SUMMARIES_TABLE, ['S1', 'S2'])['S1'][0]['summary'] == 'Only S1.'
+    items, skipped = load_summary_items(catalog_file, ['S1', 'S2'], series_summaries.SUMMARY_MODEL)
+    assert skipped == 1 and [series_id for series_id, _, _ in items] == ['S2']
+
+
+def test_requests_draw_from_the_request_and_token_budgets(catalog_file, openai_api, monkeypatch):
+    limiters = []
+
+    class RecordingBucket(series_summaries.TokenBucket):
+        def __init__(self, rate, **kwargs):
+            super().__init__(rate, **kwargs)
+            self.acquired = []
+            limiters.append(self)
+
+        def acquire(self, amount=1):
+            self.acquired.append(amount)
+            super().acquire(amount)
+
+    monkeypatch.setattr(series_summaries, 'TokenBucket', RecordingBucket)
+    batches = pack_batches(load_summary_items(catalog_file)[0], max_prompt_tokens=200)
+
+    summarize_catalog(catalog_file, max_prompt_tokens=200, requests_per_minute=6000, tokens_per_minute=90000)
+
+    request_limiter, token_limiter = limiters
+    assert request_limiter.rate == 100 and token_limiter.rate == 1500
+    assert request_limiter.acquired == [1] * len(batches)
+    assert sorted(token_limiter.acquired) == sorted(
+        tokens + series_summaries.SUMMARY_TOKENS_PER_SERIES * len(batch) for batch, tokens in batches)
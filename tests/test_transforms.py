@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from transforms import lower_frequencies, transform_observations
+
+
+def monthly_frame(periods=24, start='2020-01-01'):
+    dates = pd.date_range(start, periods=periods, freq='MS')
+    return pd.DataFrame({'date': dates, 'value': np.arange(1, periods + 1, dtype='float64')})
+
+
+def test_semiannual_aggregation_returns_half_years():
+    result = transform_observations(monthly_frame(), frequency='SA', aggregation='avg', series_frequency='M')
+
+    assert len(result) == 4
+    assert list(result['date']) == list(pd.to_datetime(['2020-01-01', '2020-07-01', '2021-01-01', '2021-07-01']))
+    assert list(result['value']) == [3.5, 9.5, 15.5, 21.5]
+
+
+def test_semiannual_annualized_rate_uses_two_periods_per_year():
+    result = transform_observations(monthly_frame(), units='pca', frequency='SA', aggregation='eop',
+                                    series_frequency='M')
+
+    assert np.isnan(result['value'].iloc[0])
+    assert result['value'].iloc[1] == pytest.approx(((12 / 6) ** 2 - 1) * 100)
+
+
+def test_biweekly_aggregation_pairs_weeks():
+    dates = pd.date_range('2020-01-03', periods=8, freq='W-FRI')
+    df = pd.DataFrame({'date': dates, 'value': np.ones(8)})
+
+    result = transform_observations(df, frequency='BW', aggregation='sum', series_frequency='W')
+
+    assert (result['date'].diff().dropna() == pd.Timedelta(weeks=2)).all()
+    assert result['value'].sum() == 8
+
+
+@pytest.mark.parametrize('units, expected', [
+    ('chg', lambda s: s.diff()),
+    ('ch1', lambda s: s - s.shift(12)),
+    ('pch', lambda s: (s / s.shift() - 1) * 100),
+    ('pc1', lambda s: (s / s.shift(12) - 1) * 100),
+    ('pca', lambda s: ((s / s.shift()) ** 12 - 1) * 100),
+    ('cch', lambda s: np.log(s).diff() * 100),
+    ('cca', lambda s: np.log(s).diff() * 1200),
+    ('log', lambda s: np.log(s)),
+])
+def test_units_match_pandas(units, expected):
+    df = monthly_frame(36)
+    series = df.set_index('date')['value']
+
+    result = transform_observations(df, units=units, series_frequency='M')
+
+    np.testing.assert_allclose(result['value'], expected(series).to_numpy(), equal_nan=True)
+
+
+def test_lower_frequencies_only_offers_coarser_frequencies():
+    assert lower_frequencies('M') == ['Q', 'SA', 'A']
+    assert lower_frequencies('W') == ['BW', 'M', 'Q', 'SA', 'A']
+    assert lower_frequencies('A') == []
@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+import pandas as pd
+
+import utils
+from metadata_store import get_llm_response
+
+
+class WhitespaceEncoder:
+    """
+    Stand-in for a tiktoken encoder that counts whitespace-separated words.
+    """
+
+    def encode_ordinary_batch(self, texts, num_threads=1):
+        return [text.split() for text in texts]
+
+
+class EchoOpenAI:
+    """
+    Stand-in for the OpenAI client that answers with the number of the request.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, model, max_tokens, stream=False):
+        self.requests += 1
+        content = f"response {self.requests}"
+        if stream:
+            return iter([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def test_call_openai_without_cache_does_not_write_responses(monkeypatch):
+    client = EchoOpenAI()
+    monkeypatch.setattr(utils, 'get_openai_client', lambda: client)
+    cache_key = utils.llm_cache_key('Summarize GDP', 'gpt-4o')
+
+    assert utils.call_openai('Summarize GDP', use_cache=False) == 'response 1'
+    assert ''.join(utils.stream_openai('Summarize GDP', use_cache=False)) == 'response 2'
+    assert get_llm_response(cache_key) is None
+
+    assert utils.call_openai('Summarize GDP') == 'response 3'
+    assert utils.call_openai('Summarize GDP') == 'response 3'
+    assert client.requests == 3
+
+
+def test_token_breakdown_reads_parquet_catalog_in_batches(monkeypatch, tmp_path):
+    monkeypatch.setattr(utils, 'get_encoder', lambda model_name: WhitespaceEncoder())
+    catalog = pd.DataFrame({
+        'title': ['Gross Domestic Product', 'Unemployment Rate', 'Consumer Price Index'],
+        'popularity': pd.array([90, None, 80], dtype='Int64'),
+        'source_tag': ['bea', 'bls', 'bls'],
+    })
+    file_path = str(tmp_path / 'catalog.parquet')
+    catalog.to_parquet(file_path, row_group_size=2)
+
+    breakdown = utils.count_tokens_breakdown_in_csv(file_path, chunksize=2, max_workers=1)
+
+    assert breakdown['columns'] == {'title': 8, 'popularity': 2, 'source_tag': 3}
+    assert breakdown['sources'] == {'bea': 5, 'bls': 8}
+    assert breakdown['total'] == 13
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from vintage_store import VintageIndex, coalesce_revisions, merge_vintages
+
+
+def revisions(rows):
+    """
+    Build a revision history from (date, realtime_start, realtime_end, value) tuples.
+    """
+    df = pd.DataFrame(rows, columns=['date', 'realtime_start', 'realtime_end', 'value'])
+    return pd.DataFrame({
+        'date': pd.to_datetime(df['date']).astype('datetime64[ns]'),
+        'realtime_start': pd.to_datetime(df['realtime_start']).astype('datetime64[s]'),
+        'realtime_end': pd.to_datetime(df['realtime_end']).astype('datetime64[s]'),
+        'value': df['value'].astype('float64'),
+    })
+
+
+def test_coalesce_merges_consecutive_periods_with_the_same_value():
+    df = revisions([
+        ('2020-01-01', '2020-03-01', '2020-03-31', 1.0),
+        ('2020-01-01', '2020-04-01', '2020-04-30', 1.0),
+        ('2020-01-01', '2020-05-01', '9999-12-31', 1.5),
+        ('2020-02-01', '2020-04-01', '2020-04-30', np.nan),
+        ('2020-02-01', '2020-05-01', '9999-12-31', np.nan),
+    ])
+
+    merged = coalesce_revisions(df.iloc[::-1])
+
+    pd.testing.assert_frame_equal(merged, revisions([
+        ('2020-01-01', '2020-03-01', '2020-04-30', 1.0),
+        ('2020-01-01', '2020-05-01', '9999-12-31', 1.5),
+        ('2020-02-01', '2020-04-01', '9999-12-31', np.nan),
+    ]))
+
+
+def test_coalesce_keeps_periods_separated_by_a_gap():
+    df = revisions([
+        ('2020-01-01', '2020-03-01', '2020-03-31', 1.0),
+        ('2020-01-01', '2020-04-02', '9999-12-31', 1.0),
+    ])
+
+    pd.testing.assert_frame_equal(coalesce_revisions(df), df)
+
+
+def test_merge_vintages_cuts_stored_periods_at_the_fetched_start():
+    stored = revisions([
+        ('2020-01-01', '2020-03-01', '9999-12-31', 1.0),
+        ('2020-02-01', '2020-04-01', '9999-12-31', 2.0),
+    ])
+    fetched = revisions([
+        ('2020-01-01', '2020-06-01', '9999-12-31', 1.0),
+        ('2020-02-01', '2020-06-01', '9999-12-31', 2.5),
+        ('2020-03-01', '2020-06-01', '9999-12-31', 3.0),
+    ])
+
+    merged = merge_vintages(stored, fetched, '2020-06-01')
+
+    pd.testing.assert_frame_equal(merged, revisions([
+        ('2020-01-01', '2020-03-01', '9999-12-31', 1.0),
+        ('2020-02-01', '2020-04-01', '2020-05-31', 2.0),
+        ('2020-02-01', '2020-06-01', '9999-12-31', 2.5),
+        ('2020-03-01', '2020-06-01', '9999-12-31', 3.0),
+    ]))
+
+
+def test_merge_vintages_closes_observations_dropped_by_the_latest_vintage():
+    stored = revisions([('2020-01-01', '2020-03-01', '9999-12-31', 1.0)])
+    fetched = revisions([('2020-02-01', '2020-06-01', '9999-12-31', 2.0)])
+
+    merged = merge_vintages(stored, fetched, '2020-06-01')
+
+    assert VintageIndex(merged).value_as_of('2020-01-01', '2020-05-31') == 1.0
+    assert VintageIndex(merged).value_as_of('2020-01-01', '2020-06-01') is None
+
+
+def test_value_as_of():
+    index = VintageIndex(revisions([
+        ('2020-01-01', '2020-03-01', '2020-04-30', 1.0),
+        ('2020-01-01', '2020-05-01', '9999-12-31', 1.5),
+        ('2020-02-01', '2020-04-01', '9999-12-31', np.nan),
+    ]))
+
+    assert index.value_as_of('2020-01-01', '2020-02-28') is None
+    assert index.value_as_of('2020-01-01', '2020-03-01') == 1.0
+    assert index.value_as_of('2020-01-01', '2020-04-30') == 1.0
+    assert index.value_as_of('2020-01-01', '2020-05-01') == 1.5
+    assert index.value_as_of('2020-01-01', '2030-01-01') == 1.5
+    assert np.isnan(index.value_as_of('2020-02-01', '2020-04-01'))
+    assert index.value_as_of('2020-03-01', '2030-01-01') is None
+
+
+def test_as_of_returns_the_vintage_of_the_day():
+    index = VintageIndex(revisions([
+        ('2020-01-01', '2020-03-01', '2020-04-30', 1.0),
+        ('2020-01-01', '2020-05-01', '9999-12-31', 1.5),
+        ('2020-02-01', '2020-04-01', '9999-12-31', 2.0),
+    ]))
+
+    vintage = index.as_of('2020-04-15')
+
+    assert vintage['date'].tolist() == [pd.Timestamp('2020-01-01'), pd.Timestamp('2020-02-01')]
+    assert vintage['value'].tolist() == [1.0, 2.0]
+    assert index.as_of('2020-05-01')['value'].tolist() == [1.5, 2.0]
+    assert index.as_of('2020-01-01').empty
+    assert len(index.vintage_dates()) == 3
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from visualizations import break_at_gaps, minmax_downsample, plot_time_series
+
+
+def observations(values, start='2000-01-01', freq='D'):
+    return pd.DataFrame({'date': pd.date_range(start, periods=len(values), freq=freq), 'value': values})
+
+
+def test_minmax_downsample_keeps_extremes_in_order():
+    y = np.sin(np.linspace(0, 20, 10000))
+    y[1234] = 5.0
+    x = np.arange(len(y))
+
+    x_drawn, y_drawn = minmax_downsample(x, y, 200)
+
+    assert len(y_drawn) <= 201
+    assert np.all(np.diff(x_drawn) > 0)
+    assert y_drawn.max() == 5.0 and y_drawn.min() == y.min()
+
+
+def test_missing_observations_break_the_line():
+    df = observations([1.0, 2.0, np.nan, np.nan, 3.0, 4.0, np.nan])
+
+    fig = plot_time_series(None, df=df)
+
+    trace = fig.data[0]
+    assert np.array_equal(trace.y, [1.0, 2.0, np.nan, 3.0, 4.0], equal_nan=True)
+    assert pd.Timestamp(trace.x[2]) == pd.Timestamp('2000-01-03')
+
+
+def test_gaps_survive_downsampling():
+    y = np.arange(10000, dtype='float64')
+    y[[10, 5000, 5001, 9000]] = np.nan
+    x = np.arange(len(y))
+
+    x_drawn, y_drawn = break_at_gaps(x, y, max_points=100)
+
+    assert np.isnan(y_drawn).sum() == 3
+    assert list(x_drawn[np.isnan(y_drawn)]) == [10, 5000, 9000]
+    assert (~np.isnan(y_drawn)).sum() <= 101
+
+
+def test_requested_range_limits_the_drawn_points():
+    df = observations(np.arange(5000, dtype='float64'))
+
+    fig = plot_time_series(None, start_date='2005-01-01', end_date='2005-12-31', df=df)
+
+    x = pd.to_datetime(fig.data[0].x)
+    assert len(x) == 365
+    assert x.min() == pd.Timestamp('2005-01-01') and x.max() == pd.Timestamp('2005-12-31')
+
+
+def test_all_missing_series_draws_nothing():
+    fig = plot_time_series(None, df=observations([np.nan, np.nan]))
+
+    assert len(fig.data[0].y) == 0
@@ -0,0 +1,191 @@
+import os
+import logging
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from observation_store import OBSERVATIONS_FOLDER, observation_path, read_observation_file
+from panel_store import Panel
+
+# FRED `units` options and their labels
+UNITS = {
+    'lin': 'Levels',
+    'chg': 'Change',
+    'ch1': 'Change from Year Ago',
+    'pch': 'Percent Change',
+    'pc1': 'Percent Change from Year Ago',
+    'pca': 'Compounded Annual Rate of Change',
+    'cch': 'Continuously Compounded Rate of Change',
+    'cca': 'Continuously Compounded Annual Rate of Change',
+    'log': 'Natural Log',
+}
+# FRED `aggregation_method` options, with the Panel.resample method implementing each
+AGGREGATION_METHODS = {'avg': 'Average', 'sum': 'Sum', 'eop': 'End of Period'}
+PANEL_AGGREGATIONS = {'avg': 'mean', 'sum': 'sum', 'eop': 'last'}
+# FRED short frequency codes, from highest to lowest frequency
+FREQUENCIES = {'D': 'Daily', 'W': 'Weekly', 'BW': 'Biweekly', 'M': 'Monthly', 'Q': 'Quarterly',
+               'SA': 'Semiannual', 'A': 'Annual'}
+# Frequencies series can be aggregated to, see Panel.period_starts
+AGGREGATION_FREQUENCIES = ('W', 'BW', 'M', 'Q', 'SA', 'A')
+# Periods per year used by the annualized units, as FRED counts them
+OBSERVATIONS_PER_YEAR = {'D': 260, 'W': 52, 'BW': 26, 'M': 12, 'Q': 4, 'SA': 2, 'A': 1}
+# Number of transformed series kept in memory
+TRANSFORM_CACHE_SIZE = 128
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def lower_frequencies(frequency):
+    """
+    Return the frequencies a series of the given frequency can be aggregated to.
+
+    Parameters:
+    frequency (str): FRED short frequency code of the series, e.g. 'M'.
+
+    Returns:
+    list: Short frequency codes, from highest to lowest frequency.
+    """
+    if frequency not in FREQUENCIES:
+        return []
+    order = list(FREQUENCIES)
+    return [code for code in AGGREGATION_FREQUENCIES if order.index(code) > order.index(frequency)]
+
+
+def units_label(units, series_units=''):
+    """
+    Return the axis label of a series shown in the given units.
+    """
+    if units == 'lin':
+        return series_units
+    if units in ('chg', 'ch1'):
+        return f"{UNITS[units]}, {series_units}" if series_units else UNITS[units]
+    if units == 'log':
+        return f"Natural Log of {series_units}" if series_units else UNITS[units]
+    return UNITS[units]
+
+
+def apply_units(panel, units):
+    """
+    Convert every series of a panel to one of FRED's units.
+
+    Changes are taken between consecutive rows, year-ago comparisons against the
+    last observation a year earlier. Logs of non-positive values are NaN.
+
+    Parameters:
+    panel (Panel): Panel of levels. Its frequency is needed by 'pca' and 'cca'.
+    units (str): Key of UNITS.
+
+    Returns:
+    Panel: The transformed panel.
+    """
+    if units not in UNITS:
+        raise ValueError(f"Unknown units: {units}")
+    if units in ('pca', 'cca') and panel.frequency not in OBSERVATIONS_PER_YEAR:
+        raise ValueError(f"Units {units} need a known frequency, got {panel.frequency}")
+    values = np.asarray(panel.values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if units == 'lin':
+            return panel
+        if units == 'chg':
+            return panel.change()
+        if units == 'ch1':
+            return panel._derive(values - panel.year_ago().values)
+        if units == 'pch':
+            return panel.pct_change()
+        if units == 'pc1':
+            return panel.yoy()
+        if units == 'pca':
+            ratio = values / panel.shift(1).values
+            return panel._derive((ratio ** OBSERVATIONS_PER_YEAR[panel.frequency] - 1) * 100)
+        logs = np.log(np.where(values > 0, values, np.nan))
+        if units == 'log':
+            return panel._derive(logs)
+        log_change = panel._derive(logs).change().values * 100
+        if units == 'cch':
+            return panel._derive(log_change)
+        return panel._derive(log_change * OBSERVATIONS_PER_YEAR[panel.frequency])
+
+
+def transform_observations(df, units='lin', frequency=None, aggregation='avg', series_frequency=None):
+    """
+    Apply FRED's `frequency`, `aggregation_method` and `units` options to observations.
+
+    As in the API, observations are aggregated to the requested frequency first,
+    then converted to the requested units.
+
+    Parameters:
+    df (pd.DataFrame): Observations with `date` and `value` columns.
+    units (str): Key of UNITS.
+    frequency (str): Short frequency code to aggregate to, or None to keep the series frequency.
+    aggregation (str): Key of AGGREGATION_METHODS.
+    series_frequency (str): Short frequency code of the series, e.g. 'M'.
+
+    Returns:
+    pd.DataFrame: Transformed `date` and `value` columns.
+    """
+    if aggregation not in AGGREGATION_METHODS:
+        raise ValueError(f"Unknown aggregation method: {aggregation}")
+    df = df.sort_values('date')
+    panel = Panel(df['date'].to_numpy(), ['value'], df['value'].to_numpy(dtype='float64')[:, None], series_frequency)
+    if frequency and frequency != series_frequency:
+        if frequency not in AGGREGATION_FREQUENCIES:
+            raise ValueError(f"Cannot aggregate to frequency: {frequency}")
+        panel = panel.resample(frequency, PANEL_AGGREGATIONS[aggregation])
+    panel = apply_units(panel, units)
+    return pd.DataFrame({'date': panel.dates, 'value': np.asarray(panel.values[:, 0])})
+
+
+@lru_cache(maxsize=TRANSFORM_CACHE_SIZE)
+def _transform_file(file_path, mtime, units, frequency, aggregation):
+    df = read_observation_file(file_path)
+    series_info = df.attrs['series_info']
+    transformed = transform_observations(df, units, frequency, aggregation, series_info.get('frequency_short'))
+    series_info = dict(series_info, units=units_label(units, series_info.get('units', '')))
+    if frequency and frequency != series_info.get('frequency_short'):
+        series_info['frequency'] = f"{FREQUENCIES[frequency]}, {AGGREGATION_METHODS[aggregation]}"
+        series_info['frequency_short'] = frequency
+    transformed.attrs['series_info'] = series_info
+    return transformed
+
+
+def get_transformed_observations(series_id, units='lin', frequency=None, aggregation='avg',
+                                 data_folder=OBSERVATIONS_FOLDER):
+    """
+    Return the stored observations of a series in other units or at a lower frequency.
+
+    Results are memoized per series file version and transform, so switching
+    between views of a series reads and computes each view once and makes no API calls.
+
+    Parameters:
+    series_id (str): Series ID.
+    units (str): Key of UNITS.
+    frequency (str): Short frequency code to aggregate to, or None.
+    aggregation (str): Key of AGGREGATION_METHODS.
+    data_folder (str): Folder of the observation store.
+
+    Returns:
+    pd.DataFrame: `date` and `value` columns, with the series metadata (units and
+    frequency updated) in `df.attrs['series_info']`.
+    """
+    file_path = observation_path(series_id, data_folder)
+    transformed = _transform_file(file_path, os.path.getmtime(file_path), units, frequency, aggregation)
+    # Copied so callers cannot change the memoized frame
+    return transformed.copy()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show a stored series in FRED's units and frequencies.")
+    parser.add_argument("series_id", type=str, help="Series ID, e.g. GDP.")
+    parser.add_argument("--units", type=str, default='lin', choices=list(UNITS), help="Units transformation.")
+    parser.add_argument("--frequency", type=str, choices=list(AGGREGATION_FREQUENCIES), help="Frequency to aggregate to.")
+    parser.add_argument("--aggregation", type=str, default='avg', choices=list(AGGREGATION_METHODS), help="Aggregation method.")
+    parser.add_argument("--data_folder", type=str, default=OBSERVATIONS_FOLDER, help="Folder of the observation store.")
+    args = parser.parse_args()
+
+    df = get_transformed_observations(args.series_id, args.units, args.frequency, args.aggregation, args.data_folder)
+    print(f"{df.attrs['series_info'].get('title', args.series_id)} ({df.attrs['series_info']['units']})")
+    print(df.to_string(index=False))
@@ -1,105 +1,330 @@
+import os
+import hashlib
+import numpy as np
 import pandas as pd
 import logging
-from openai import OpenAI
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import config
+from metadata_store import get_llm_response, put_llm_response
+from instrumentation import metrics
+
+# Parent assigned to top-level categories and to categories whose parent is missing
+ROOT_CATEGORY = 'All categories'
+# Number of CSV rows encoded per worker task when counting tokens
+TOKEN_COUNT_CHUNK_SIZE = 20000
 
 def load_data(file_path):
     """
-    Loads data from a CSV file.
+    Loads data from a Parquet observation file or a CSV file.
     
     Parameters:
-    file_path (str): Path to the CSV file.
+    file_path (str): Path to the Parquet or CSV file.
     
     Returns:
-    pd.DataFrame: DataFrame containing the loaded data.
+    pd.DataFrame: DataFrame containing the loaded data. For Parquet files the
+    series metadata is available in `df.attrs['series_info']`.
     """
     logging.info(f"Loading data from file: {file_path}")
+    if file_path.endswith('.parquet'):
+        # Imported here so CSV-only callers do not pay for pyarrow
+        from observation_store import read_observation_file
+        return read_observation_file(file_path)
     return pd.read_csv(file_path)
 
-def load_category_data(data_file):
-    df = pd.read_csv(data_file)
-    df = df.fillna('')
-    df['notes'] = df['notes'].str.wrap(50).apply(lambda x: x.replace('\n', '<br>'))
+def clean_category_data(df):
+    """
+    Clean a raw categories DataFrame for plotting.
+
+    Notes are wrapped for hover labels, parent links to categories that are not in
+    the data are re-attached to the root, and each category's depth in the repaired
+    tree and number of direct sub-categories are added.
+
+    Parameters:
+    df (pd.DataFrame): Categories as saved by fred_categories.py.
+
+    Returns:
+    pd.DataFrame: The cleaned category hierarchy.
+    """
     df = df.fillna('')
+    df['notes'] = df['notes'].astype(str).str.wrap(50).str.replace('\n', '<br>', regex=False)
     df['id'] = df['id'].astype(str)
-    df['parent_id'] = df['parent_id'].astype(str)
-    df['parent_id'] = df['parent_id'].replace('0', 'All categories')
+    df['parent_id'] = df['parent_id'].astype(str).replace('0', ROOT_CATEGORY)
+    df['parent_id'] = df['parent_id'].where(df['parent_id'].isin(df['id']), ROOT_CATEGORY)
     df['count'] = 1
 
-    unique_ids = set(df['id'])
-    df['parent_id'] = df['parent_id'].apply(lambda x: x if x in unique_ids or x == 'All categories' else 'All categories')
+    # Walk every category up to the root at once, one level per iteration
+    parent_of = pd.Series(df['parent_id'].to_numpy(), index=df['id'].to_numpy())
+    parent_of = parent_of[~parent_of.index.duplicated()]
+    depth = np.ones(len(df), dtype='int64')
+    current = df['parent_id'].to_numpy()
+    for _ in range(len(df)):
+        not_root = current != ROOT_CATEGORY
+        if not not_root.any():
+            break
+        depth[not_root] += 1
+        current = np.where(not_root, parent_of.reindex(current).fillna(ROOT_CATEGORY).to_numpy(), current)
+    df['depth'] = depth
+    df['child_count'] = df['id'].map(df['parent_id'].value_counts()).fillna(0).astype('int64')
+    return df
+
+def category_artifact_path(data_file):
+    """
+    Return the path of the precomputed hierarchy artifact for a categories CSV file.
+    """
+    return f"{os.path.splitext(data_file)[0]}.parquet"
+
+def build_category_artifact(data_file):
+    """
+    Clean a categories CSV file once and save the result as a Parquet artifact next to it.
+
+    Parameters:
+    data_file (str): Path to the categories CSV file.
+
+    Returns:
+    pd.DataFrame: The cleaned category hierarchy.
+    """
+    df = clean_category_data(pd.read_csv(data_file))
+    artifact_file = category_artifact_path(data_file)
+    df.to_parquet(artifact_file, index=False)
+    logging.info(f"Saved category hierarchy artifact to {artifact_file}")
+    return df
+
+def load_category_data(data_file):
+    """
+    Load the cleaned category hierarchy for a categories CSV file.
+
+    The precomputed Parquet artifact is used when it is newer than the CSV,
+    otherwise it is rebuilt first.
+
+    Parameters:
+    data_file (str): Path to the categories CSV file.
+
+    Returns:
+    pd.DataFrame: The cleaned category hierarchy.
+    """
+    artifact_file = category_artifact_path(data_file)
+    if os.path.exists(artifact_file) and os.path.getmtime(artifact_file) >= os.path.getmtime(data_file):
+        df = pd.read_parquet(artifact_file)
+    else:
+        df = build_category_artifact(data_file)
 
     logging.info(f"Loaded category data from file: {data_file}")
     return df
 
-def call_openai(user_prompt, model_name='gpt-4o', system_prompt=None, max_tokens=500):
+@lru_cache(maxsize=None)
+def get_openai_client():
+    """
+    Return the shared OpenAI client, created on first use.
+
+    `OPENAI_BASE_URL` in config (or the environment) points it at another
+    OpenAI-compatible server, e.g. a local stub for testing.
+    """
+    # openai is slow to import, so it is only loaded once an LLM call is made
+    from openai import OpenAI
+
+    logging.info("Initializing OpenAI client")
+    return OpenAI(
+        api_key=config.OPENAI_API_KEY,
+        base_url=getattr(config, 'OPENAI_BASE_URL', None),
+    )
+
+def llm_cache_key(user_prompt, model_name, system_prompt=None, max_tokens=500, series_last_updated=None):
+    """
+    Return the response cache key for a request.
+
+    The series' `last_updated` is part of the key, so explanations are
+    regenerated once the series changes.
+    """
+    parts = [model_name, system_prompt or '', user_prompt, str(max_tokens), series_last_updated or '']
+    return hashlib.sha256('\0'.join(parts).encode()).hexdigest()
+
+def _openai_messages(user_prompt, system_prompt=None):
+    messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+    messages.append({"role": "user", "content": user_prompt})
+    return messages
+
+def call_openai(user_prompt, model_name='gpt-4o', system_prompt=None, max_tokens=500,
+                series_last_updated=None, use_cache=True):
     """
     Function to call OpenAI API and get a response.
 
+    Responses are cached persistently by model, prompts and the series' `last_updated`.
+
     Parameters:
     model_name (str): The name of the OpenAI model to use.
     user_prompt (str): The prompt to send to the model.
     system_prompt (str): An optional system prompt to provide context.
     max_tokens (int): The maximum number of tokens to generate.
+    series_last_updated (str): `last_updated` of the series the prompt is about.
+    use_cache (bool): Return a cached response when available, and cache the new one.
 
     Returns:
     str: The response from the OpenAI model.
     """
-    logging.info("Initializing OpenAI client")
-    client = OpenAI(
-        api_key=config.OPENAI_API_KEY,
-    )
+    cache_key = llm_cache_key(user_prompt, model_name, system_prompt, max_tokens, series_last_updated)
+    if use_cache:
+        cached = get_llm_response(cache_key)
+        metrics.increment('cache_requests_total', cache='llm', result='miss' if cached is None else 'hit')
+        if cached is not None:
+            logging.info("Using cached OpenAI response")
+            return cached
     
     logging.info("Sending request to OpenAI API")
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {
-                "role": "user",
-                "content": user_prompt,
-            }
-        ],
+    chat_completion = get_openai_client().chat.completions.create(
+        messages=_openai_messages(user_prompt, system_prompt),
         model=model_name,
         max_tokens=max_tokens
     )
 
     response = chat_completion.choices[0].message.content
     logging.info("Received response from OpenAI API")
+    if use_cache:
+        put_llm_response(cache_key, model_name, response)
     return response
 
-import tiktoken
+def stream_openai(user_prompt, model_name='gpt-4o', system_prompt=None, max_tokens=500,
+                  series_last_updated=None, use_cache=True):
+    """
+    Like call_openai, but yield the response text as it is generated.
 
-def count_tokens(text, model_name="gpt-4"):
-    # Initialize the encoder for the specified model
-    encoder = tiktoken.encoding_for_model(model_name)
+    A cached response is yielded at once. A streamed response is cached once it
+    completes, unless use_cache is False.
+
+    Yields:
+    str: Chunks of the response text.
+    """
+    cache_key = llm_cache_key(user_prompt, model_name, system_prompt, max_tokens, series_last_updated)
+    if use_cache:
+        cached = get_llm_response(cache_key)
+        metrics.increment('cache_requests_total', cache='llm', result='miss' if cached is None else 'hit')
+        if cached is not None:
+            logging.info("Using cached OpenAI response")
+            yield cached
+            return
+
+    logging.info("Streaming response from OpenAI API")
+    stream = get_openai_client().chat.completions.create(
+        messages=_openai_messages(user_prompt, system_prompt),
+        model=model_name,
+        max_tokens=max_tokens,
+        stream=True
+    )
+    parts = []
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+            yield chunk.choices[0].delta.content
+    logging.info("Received response from OpenAI API")
+    if use_cache:
+        put_llm_response(cache_key, model_name, ''.join(parts))
+
+@lru_cache(maxsize=None)
+def get_encoder(model_name):
+    """
+    Return the tiktoken encoder for a model, created once per process.
+    """
+    import tiktoken
+
+    return tiktoken.encoding_for_model(model_name)
 
-    # Encode the text to get the tokens
-    tokens = encoder.encode(text)
+def count_tokens(text, model_name="gpt-4"):
+    # Encode the text with the cached encoder for the specified model
+    tokens = get_encoder(model_name).encode(text)
 
     # Return the number of tokens
     return len(tokens)
 
-def count_tokens_in_csv(file_path, model_name="gpt-4o"):
-    # Read the CSV file
-    df = pd.read_csv(file_path)
+def _count_chunk_tokens(chunk, model_name, source_column):
+    """
+    Count the tokens of every column of a CSV chunk, and per source if the chunk has a source column.
+    """
+    encoder = get_encoder(model_name)
+    row_tokens = np.zeros(len(chunk), dtype='int64')
+    column_counts = {}
+    for column in chunk.columns:
+        encoded = encoder.encode_ordinary_batch(chunk[column].tolist(), num_threads=1)
+        counts = np.fromiter((len(tokens) for tokens in encoded), dtype='int64', count=len(chunk))
+        column_counts[column] = int(counts.sum())
+        row_tokens += counts
+    source_counts = {}
+    if source_column in chunk.columns:
+        source_counts = pd.Series(row_tokens).groupby(chunk[source_column].to_numpy()).sum().to_dict()
+    return column_counts, source_counts
+
+def _read_text_chunks(file_path, chunksize):
+    """
+    Yield a CSV or Parquet file as DataFrames of strings with at most `chunksize` rows, missing values as ''.
+    """
+    if file_path.endswith('.parquet'):
+        import pyarrow.parquet as pq
 
-    # Convert all columns to string and concatenate all data into a single string
-    text = df.astype(str).agg(' '.join, axis=1).str.cat(sep=' ')
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas().astype('string').fillna('').astype(object)
+    else:
+        yield from pd.read_csv(file_path, dtype=str, keep_default_na=False, chunksize=chunksize)
 
-    # Initialize the encoder for the specified model
-    encoder = tiktoken.encoding_for_model(model_name)
+def count_tokens_breakdown_in_csv(file_path, model_name="gpt-4o", chunksize=TOKEN_COUNT_CHUNK_SIZE,
+                                  max_workers=None, source_column='source_tag'):
+    """
+    Count the tokens of a CSV or Parquet file in bounded memory, broken down by column and by source.
 
-    # Encode the text to get the tokens
-    tokens = encoder.encode(text)
+    The file is read in chunks (Parquet files by record batch) that are encoded in
+    worker processes. At most two chunks per worker are held in memory at a time.
 
-    # Return the number of tokens
-    return len(tokens)
+    Parameters:
+    file_path (str): Path to the CSV or Parquet file.
+    model_name (str): Model whose tokenizer is used.
+    chunksize (int): Number of rows per chunk.
+    max_workers (int): Number of worker processes. Defaults to the CPU count.
+    source_column (str): Column used for the per-source breakdown.
+
+    Returns:
+    dict: {'total': int, 'columns': {column: tokens}, 'sources': {source: tokens}}.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    column_counts = Counter()
+    source_counts = Counter()
+
+    def collect(future):
+        columns, sources = future.result()
+        column_counts.update(columns)
+        source_counts.update(sources)
+
+    chunks = _read_text_chunks(file_path, chunksize)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(executor.submit(_count_chunk_tokens, chunk, model_name, source_column))
+            if len(in_flight) >= 2 * max_workers:
+                collect(in_flight.popleft())
+        while in_flight:
+            collect(in_flight.popleft())
+
+    return {
+        'total': sum(column_counts.values()),
+        'columns': dict(column_counts),
+        'sources': {source: int(count) for source, count in source_counts.items()},
+    }
+
+def count_tokens_in_csv(file_path, model_name="gpt-4o", **kwargs):
+    """
+    Count the tokens of every cell of a CSV file. See count_tokens_breakdown_in_csv.
+    """
+    return count_tokens_breakdown_in_csv(file_path, model_name, **kwargs)['total']
 
 
 if __name__ == '__main__':
-    # Example usage
-    text = pd.read_csv('./data/series/source/all_sources_combined.csv')
+    # Example usage: the combined catalog written by combine_all_source_csv
+    file_path = './data/series/source/all_sources_combined.parquet'
     model_name = "gpt-4o"  # Change this if using a different model
-    num_tokens = count_tokens_in_csv(text, model_name)
+    breakdown = count_tokens_breakdown_in_csv(file_path, model_name)
     
-    print(f"Number of tokens: {num_tokens}")
-
+    print(f"Number of tokens: {breakdown['total']}")
+    print("Tokens per column:")
+    for column, tokens in sorted(breakdown['columns'].items(), key=lambda item: -item[1]):
+        print(f"  {column}: {tokens}")
+    print("Tokens per source:")
+    for source, tokens in sorted(breakdown['sources'].items(), key=lambda item: -item[1]):
+        print(f"  {source}: {tokens}")
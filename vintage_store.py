@@ -0,0 +1,315 @@
+import os
+import json
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from fred_client import fred_get_raw
+from observation_store import REALTIME_RESOLUTION, parse_observations
+
+VINTAGES_FOLDER = 'data/vintages'
+# Real-time period covering every vintage ALFRED has
+EARLIEST_REALTIME = '1776-07-04'
+LATEST_REALTIME = '9999-12-31'
+# Maximum number of observations the API returns per request
+PAGE_LIMIT = 100000
+# Key under which the sync state is stored in the Parquet schema metadata
+SYNC_METADATA_KEY = b'vintage_sync'
+VINTAGE_COLUMNS = ['date', 'realtime_start', 'realtime_end', 'value']
+ONE_DAY = np.timedelta64(1, 'D')
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def vintage_path(series_id, data_folder=VINTAGES_FOLDER):
+    """
+    Return the path of the Parquet file holding the revision history of a series.
+    """
+    return os.path.join(data_folder, f"{series_id}.parquet")
+
+
+def fetch_vintages(series_id, realtime_start=EARLIEST_REALTIME, realtime_end=LATEST_REALTIME):
+    """
+    Fetch the observations of a series over a real-time period from ALFRED.
+
+    The API returns one row per observation date and real-time period during
+    which its value did not change, so the response already holds revisions
+    rather than one copy of the series per vintage.
+
+    Parameters:
+    series_id (str): FRED series ID.
+    realtime_start (str): First vintage date (YYYY-MM-DD).
+    realtime_end (str): Last vintage date (YYYY-MM-DD).
+
+    Returns:
+    pd.DataFrame: `date`, `realtime_start`, `realtime_end` and `value` columns.
+    """
+    logging.info(f"Fetching vintages of series_id: {series_id} from {realtime_start} to {realtime_end}")
+    pages = []
+    offset = 0
+    while True:
+        content = fred_get_raw('series/observations', series_id=series_id, realtime_start=realtime_start,
+                               realtime_end=realtime_end, limit=PAGE_LIMIT, offset=offset)
+        page = parse_observations(content, include_realtime=True)
+        pages.append(page)
+        if len(page) < PAGE_LIMIT:
+            break
+        offset += len(page)
+    return pd.concat(pages, ignore_index=True)[VINTAGE_COLUMNS]
+
+
+def coalesce_revisions(df):
+    """
+    Merge consecutive real-time periods in which an observation kept the same value.
+
+    Parameters:
+    df (pd.DataFrame): Revisions with `date`, `realtime_start`, `realtime_end` and `value` columns.
+
+    Returns:
+    pd.DataFrame: The same history with one row per actual revision, sorted by date and realtime_start.
+    """
+    df = df.sort_values(['date', 'realtime_start'], kind='stable').reset_index(drop=True)
+    if len(df) < 2:
+        return df
+    dates = df['date'].to_numpy()
+    values = df['value'].to_numpy()
+    starts = df['realtime_start'].to_numpy()
+    ends = df['realtime_end'].to_numpy()
+    same_value = (values[1:] == values[:-1]) | (np.isnan(values[1:]) & np.isnan(values[:-1]))
+    continues = (dates[1:] == dates[:-1]) & same_value & (starts[1:] <= ends[:-1] + ONE_DAY)
+    run_starts = np.flatnonzero(np.concatenate([[True], ~continues]))
+    merged = df.iloc[run_starts].reset_index(drop=True)
+    run_ends = np.maximum.reduceat(ends.astype('int64'), run_starts).astype(ends.dtype)
+    merged['realtime_end'] = run_ends
+    return merged
+
+
+def merge_vintages(stored, fetched, fetched_from):
+    """
+    Combine a stored revision history with vintages fetched from a later date.
+
+    Stored periods are cut off the day before `fetched_from`, from which on the
+    fetched rows are authoritative, e.g. for observations the latest vintage dropped.
+    """
+    fetched_from = np.datetime64(fetched_from, 's')
+    kept = stored[stored['realtime_start'] < fetched_from].copy()
+    kept['realtime_end'] = kept['realtime_end'].clip(upper=fetched_from - ONE_DAY)
+    return coalesce_revisions(pd.concat([kept, fetched], ignore_index=True))
+
+
+def save_vintages(df, series_id, synced_on, data_folder=VINTAGES_FOLDER):
+    """
+    Save the revision history of a series as Parquet.
+
+    Parameters:
+    df (pd.DataFrame): Revisions as returned by coalesce_revisions.
+    series_id (str): Series ID for naming the file.
+    synced_on (str): Date (YYYY-MM-DD) up to which the vintages were fetched.
+    data_folder (str): Folder to save the Parquet file in.
+
+    Returns:
+    str: Path of the written file.
+    """
+    os.makedirs(data_folder, exist_ok=True)
+    file_path = vintage_path(series_id, data_folder)
+    table = pa.Table.from_pandas(df[VINTAGE_COLUMNS], preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[SYNC_METADATA_KEY] = json.dumps({'synced_on': synced_on}).encode()
+    table = table.replace_schema_metadata(metadata)
+    logging.info(f"Saving {table.num_rows} revisions to file: {file_path}")
+    tmp_path = f"{file_path}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, file_path)
+    return file_path
+
+
+def load_vintages(series_id, data_folder=VINTAGES_FOLDER):
+    """
+    Load the stored revision history of a series.
+
+    Returns:
+    pd.DataFrame: Revisions, or None if the series has no stored vintages.
+    """
+    file_path = vintage_path(series_id, data_folder)
+    if not os.path.exists(file_path):
+        return None
+    df = pq.read_table(file_path).to_pandas()
+    # Parquet has no second resolution, so the realtime columns come back in milliseconds
+    return df.astype({'realtime_start': REALTIME_RESOLUTION, 'realtime_end': REALTIME_RESOLUTION})
+
+
+def sync_vintages(series_id, data_folder=VINTAGES_FOLDER, full=False):
+    """
+    Bring the stored revision history of a series up to date.
+
+    The first sync fetches every vintage. Later syncs only fetch from the start of
+    the latest stored vintage on, since older real-time periods never change.
+
+    Parameters:
+    series_id (str): FRED series ID.
+    data_folder (str): Folder of the vintage store.
+    full (bool): Refetch the whole history.
+
+    Returns:
+    pd.DataFrame: The stored revisions.
+    """
+    stored = None if full else load_vintages(series_id, data_folder)
+    if stored is None or stored.empty:
+        df = coalesce_revisions(fetch_vintages(series_id))
+    else:
+        fetch_start = stored['realtime_start'].max()
+        fetched = fetch_vintages(series_id, realtime_start=f"{fetch_start:%Y-%m-%d}")
+        df = merge_vintages(stored, fetched, fetch_start)
+    save_vintages(df, series_id, pd.Timestamp.today().strftime('%Y-%m-%d'), data_folder)
+    return df
+
+
+class VintageIndex:
+    """
+    As-of queries over the revision history of one series.
+
+    Revisions are kept sorted by date and realtime_start, so the value of one
+    observation as known on a given day is found with two binary searches and a
+    whole vintage with one vectorized comparison.
+
+    Parameters:
+    df (pd.DataFrame): Revisions as returned by coalesce_revisions.
+    """
+
+    def __init__(self, df):
+        df = df.sort_values(['date', 'realtime_start'], kind='stable')
+        self.dates = df['date'].to_numpy(dtype='datetime64[ns]')
+        self.starts = df['realtime_start'].to_numpy(dtype=REALTIME_RESOLUTION)
+        self.ends = df['realtime_end'].to_numpy(dtype=REALTIME_RESOLUTION)
+        self.values = df['value'].to_numpy(dtype='float64')
+
+    def __len__(self):
+        return len(self.values)
+
+    def as_of(self, as_of):
+        """
+        Return the series as it was known on a given day.
+
+        Parameters:
+        as_of (str): Vintage date (YYYY-MM-DD).
+
+        Returns:
+        pd.DataFrame: `date` and `value` of every observation published by then.
+        """
+        as_of = np.datetime64(as_of, 's')
+        known = (self.starts <= as_of) & (self.ends >= as_of)
+        return pd.DataFrame({'date': self.dates[known], 'value': self.values[known]})
+
+    def value_as_of(self, date, as_of):
+        """
+        Return the value of one observation as it was known on a given day.
+
+        Parameters:
+        date (str): Observation date (YYYY-MM-DD).
+        as_of (str): Vintage date (YYYY-MM-DD).
+
+        Returns:
+        float: The value (NaN if it was reported missing), or None if it was not published yet.
+        """
+        date = np.datetime64(date, 'ns')
+        first, last = np.searchsorted(self.dates, date, 'left'), np.searchsorted(self.dates, date, 'right')
+        as_of = np.datetime64(as_of, 's')
+        position = first + np.searchsorted(self.starts[first:last], as_of, 'right') - 1
+        if position < first or self.ends[position] < as_of:
+            return None
+        return float(self.values[position])
+
+    def revisions(self, date):
+        """
+        Return every value an observation has had.
+
+        Returns:
+        pd.DataFrame: `realtime_start`, `realtime_end` and `value` of each revision of the observation.
+        """
+        date = np.datetime64(date, 'ns')
+        first, last = np.searchsorted(self.dates, date, 'left'), np.searchsorted(self.dates, date, 'right')
+        return pd.DataFrame({'realtime_start': self.starts[first:last], 'realtime_end': self.ends[first:last],
+                             'value': self.values[first:last]})
+
+    def vintage_dates(self):
+        """
+        Return the days on which at least one observation was published or revised.
+        """
+        return np.unique(self.starts)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_vintage_index(series_id, data_folder=VINTAGES_FOLDER):
+    """
+    Return the VintageIndex of a stored series, reusing it until the file changes.
+
+    Raises:
+    FileNotFoundError: If the series has no stored vintages; run sync_vintages first.
+    """
+    file_path = vintage_path(series_id, data_folder)
+    modified = os.path.getmtime(file_path)
+    with _indexes_lock:
+        cached = _indexes.get(file_path)
+        if cached is not None and cached[0] == modified:
+            return cached[1]
+    index = VintageIndex(load_vintages(series_id, data_folder))
+    with _indexes_lock:
+        _indexes[file_path] = (modified, index)
+    return index
+
+
+def observations_as_of(series_id, as_of, data_folder=VINTAGES_FOLDER):
+    """
+    Return the observations of a stored series as they were known on a given day.
+    """
+    return get_vintage_index(series_id, data_folder).as_of(as_of)
+
+
+def value_as_of(series_id, date, as_of, data_folder=VINTAGES_FOLDER):
+    """
+    Return the value of one observation of a stored series as it was known on a given day.
+    """
+    return get_vintage_index(series_id, data_folder).value_as_of(date, as_of)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Store and query the revision history (ALFRED vintages) of FRED series.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    sync_parser = subparsers.add_parser('sync', help="Fetch new vintages of series.")
+    sync_parser.add_argument("series_ids", nargs='+', help="Series IDs, e.g. GDP.")
+    sync_parser.add_argument("--full", action='store_true', help="Refetch the whole revision history.")
+    as_of_parser = subparsers.add_parser('as_of', help="Show a series as it was known on a given day.")
+    as_of_parser.add_argument("series_id", help="Series ID.")
+    as_of_parser.add_argument("as_of", help="Vintage date (YYYY-MM-DD).")
+    as_of_parser.add_argument("--date", type=str, help="Only show this observation date.")
+    revisions_parser = subparsers.add_parser('revisions', help="Show every value an observation has had.")
+    revisions_parser.add_argument("series_id", help="Series ID.")
+    revisions_parser.add_argument("date", help="Observation date (YYYY-MM-DD).")
+    for subparser in (sync_parser, as_of_parser, revisions_parser):
+        subparser.add_argument("--data_folder", type=str, default=VINTAGES_FOLDER, help="Folder of the vintage store.")
+    args = parser.parse_args()
+
+    if args.command == 'sync':
+        for series_id in args.series_ids:
+            df = sync_vintages(series_id, args.data_folder, args.full)
+            index = VintageIndex(df)
+            full_copies = sum(len(index.as_of(day)) for day in index.vintage_dates())
+            print(f"{series_id}: {len(df)} revisions over {len(index.vintage_dates())} vintages "
+                  f"({full_copies} rows as full copies)")
+    elif args.command == 'as_of':
+        if args.date:
+            print(value_as_of(args.series_id, args.date, args.as_of, args.data_folder))
+        else:
+            print(observations_as_of(args.series_id, args.as_of, args.data_folder).to_string(index=False))
+    else:
+        print(get_vintage_index(args.series_id, args.data_folder).revisions(args.date).to_string(index=False))
@@ -1,48 +1,145 @@
+import numpy as np
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
-from utils import load_category_data
-import streamlit as st
+from utils import load_category_data, load_data
 
-def plot_time_series(data_file, output_file=None):
+# Default maximum number of points drawn by plot_time_series
+DEFAULT_MAX_POINTS = 2000
+# Series with more points than this are drawn with WebGL
+WEBGL_THRESHOLD = 1000
+# Series with more points than this are drawn without markers
+MARKERS_THRESHOLD = 500
+
+def minmax_downsample(x, y, max_points):
+    """
+    Downsample a series by keeping the minimum and maximum of equally sized buckets.
+
+    Peaks and troughs survive, which keeps the shape of the line intact at a
+    fraction of the points. Points are returned in their original order.
+
+    Parameters:
+    x (np.ndarray): Sorted x values.
+    y (np.ndarray): y values without NaNs.
+    max_points (int): Maximum number of points to return.
+
+    Returns:
+    tuple: (x, y) downsampled arrays.
+    """
+    n_points = len(y)
+    n_buckets = max_points // 2
+    if n_points <= max_points or n_buckets < 1:
+        return x, y
+    bucket_size = n_points // n_buckets
+    usable = bucket_size * n_buckets
+    buckets = y[:usable].reshape(n_buckets, bucket_size)
+    offsets = np.arange(n_buckets) * bucket_size
+    keep = np.concatenate([offsets + buckets.argmin(axis=1), offsets + buckets.argmax(axis=1)])
+    if usable < n_points:
+        keep = np.append(keep, n_points - 1)
+    keep = np.unique(keep)
+    return x[keep], y[keep]
+
+def break_at_gaps(x, y, max_points=None):
+    """
+    Downsample the observed points of a series, keeping a NaN wherever observations are missing.
+
+    Plotly breaks a line at NaN, so a NaN is kept between two drawn points
+    whenever at least one observation between them is missing.
+
+    Parameters:
+    x (np.ndarray): Sorted x values.
+    y (np.ndarray): y values, NaN where an observation is missing.
+    max_points (int): Maximum number of observed points to return, or None to keep them all.
+
+    Returns:
+    tuple: (x, y) arrays to draw.
+    """
+    missing = np.isnan(y)
+    rows = np.flatnonzero(~missing)
+    if max_points:
+        rows, _ = minmax_downsample(rows, y[rows], max_points)
+    missing_rows = np.flatnonzero(missing)
+    missing_before = np.cumsum(missing)
+    gaps = np.flatnonzero(missing_before[rows[1:]] > missing_before[rows[:-1]])
+    # The first missing observation after each drawn point that is followed by a gap
+    rows = np.insert(rows, gaps + 1, missing_rows[np.searchsorted(missing_rows, rows[gaps])])
+    return x[rows], y[rows]
+
+def series_info_from_frame(df):
+    """
+    Return the series metadata of a loaded observation frame.
+
+    Parquet files carry it in `df.attrs`, legacy CSV files repeat it on every row.
+    """
+    series_info = df.attrs.get('series_info')
+    if series_info:
+        return series_info
+    metadata_columns = [column for column in df.columns if column not in ('date', 'value')]
+    return df[metadata_columns].iloc[0].to_dict() if metadata_columns else {}
+
+def plot_time_series(data_file, output_file=None, start_date=None, end_date=None, max_points=DEFAULT_MAX_POINTS, df=None):
     """
     Plots an interactive line chart for a given time series data file.
+
+    Observations outside [start_date, end_date] are dropped and the remaining
+    points are downsampled to at most `max_points`. The level of detail is fixed
+    by this requested range: zooming in with the range selector or slider shows
+    the same buckets, so pass a narrower start_date/end_date for full detail.
+    Missing observations still break the line, also between downsampled points.
+    Long series are drawn with a WebGL trace and without markers. Series metadata
+    is shown once in the hover template instead of being attached to every point.
     
     Parameters:
-    data_file (str): Path to the CSV file containing the time series data.
+    data_file (str): Path to the Parquet observation file or CSV file containing the time series data.
+    output_file (str): Optional path to save the HTML file of the plot.
+    start_date (str): Optional start of the visible date range.
+    end_date (str): Optional end of the visible date range.
+    max_points (int): Maximum number of points to draw, or None to draw every observation.
+    df (pd.DataFrame): Already loaded or transformed observations, to avoid reading data_file again.
     
     Returns:
     plotly.graph_objects.Figure: The Plotly figure object for the time series plot.
     """
     # Load the data
-    df = pd.read_csv(data_file)
+    if df is None:
+        df = load_data(data_file)
     
     # Create the line chart
     if df.shape[0] == 0:
         return None
-    fig = px.line(df, x='date', y='value', title=df['title'][0])
-    
-    # Add tooltips with text limited to 50 characters
-    if 'notes' not in df.columns:
-        df['notes'] = ''
-    df['notes'] = df['notes'].str.wrap(50).apply(lambda x: x.replace('\n', '<br>'))
+    series_info = series_info_from_frame(df)
+
+    dates = pd.to_datetime(df['date'])
+    values = pd.to_numeric(df['value'], errors='coerce')
+    visible = pd.Series(True, index=df.index)
+    if start_date is not None:
+        visible &= dates >= pd.Timestamp(start_date)
+    if end_date is not None:
+        visible &= dates <= pd.Timestamp(end_date)
+    x, y = break_at_gaps(dates[visible].to_numpy(), values[visible].to_numpy(dtype='float64'), max_points)
+
+    trace_type = go.Scattergl if len(y) > WEBGL_THRESHOLD else go.Scatter
+    title = series_info.get('title', '')
+    units = series_info.get('units', '')
+    fig = go.Figure(trace_type(
+        x=x,
+        y=y,
+        mode='lines+markers' if len(y) <= MARKERS_THRESHOLD else 'lines',
+        name=series_info.get('id', ''),
+        hovertemplate='<b>Date</b>: %{x}<br><b>Value</b>: %{y}<br>' +
+                      f"<b>ID</b>: {series_info.get('id', '')}<br><b>Title</b>: {title}<br>" +
+                      f"<b>Frequency</b>: {series_info.get('frequency', '')}<br><b>Units</b>: {units}<br>" +
+                      f"<b>Last Updated</b>: {series_info.get('last_updated', '')}<extra></extra>",
+    ))
 
     # Add descriptive elements
-    fig.update_traces(mode='lines+markers')
     fig.update_layout(
+        title=title,
         xaxis_title='Date',
-        yaxis_title=df['units'][0],
+        yaxis_title=units,
         hovermode='x unified'
     )
     
-    fig.update_traces(
-        hovertemplate='<b>Date</b>: %{x}<br><b>Value</b>: %{y}<br>' +
-                      '<b>ID</b>: %{customdata[0]}<br><b>Title</b>: %{customdata[1]}<br>' +
-                      '<b>Frequency</b>: %{customdata[2]}<br><b>Units</b>: %{customdata[3]}<br>' +
-                      '<b>Last Updated</b>: %{customdata[4]}<br><b>Notes</b>: %{customdata[5]}<extra></extra>',
-        customdata=df[['id', 'title', 'frequency', 'units', 'last_updated', 'notes']].values
-    )
-    
     # Add time slider
     fig.update_layout(
         xaxis=dict(
@@ -65,9 +162,23 @@ def plot_time_series(data_file, output_file=None):
     else:
         return fig
 
-def plot_category_sunburst(data_file, output_file=None):
+def plot_category_sunburst(data_file, output_file=None, df=None):
+    """
+    Plots a sunburst chart of the FRED category hierarchy.
+
+    Parameters:
+    data_file (str): Path to the categories CSV file.
+    output_file (str): Optional path to save the HTML file of the plot.
+    df (pd.DataFrame): Already loaded category data, to avoid reading data_file again.
+
+    Returns:
+    plotly.graph_objects.Figure: The Plotly figure object for the sunburst chart.
+    """
+    # plotly.express is slow to import and only needed here
+    import plotly.express as px
 
-    df = load_category_data(data_file)
+    if df is None:
+        df = load_category_data(data_file)
 
     # Create the sunburst chart
     fig = px.sunburst(
@@ -76,7 +187,7 @@ def plot_category_sunburst(data_file, output_file=None):
         parents='parent_id',
         names='name',
         values='count',  # Use 'count' to represent the number of categories at each level
-        hover_data={'id': True, 'notes': True, 'level': True, 'count': True},
+        hover_data={'id': True, 'notes': True, 'depth': True, 'child_count': True},
     )
 
     fig.update_layout(
@@ -92,7 +203,7 @@ def plot_category_sunburst(data_file, output_file=None):
                     '<b>Notes</b>: %{customdata[1]}<br>' +
                     '<b>Level</b>: %{customdata[2]}<br>' +
                     '<b>Sub-categories</b>: %{customdata[3]}<extra></extra>',
-        customdata=df[['id', 'notes', 'level', 'count']].values
+        customdata=df[['id', 'notes', 'depth', 'child_count']].values
     )
 
     if output_file:
@@ -107,7 +218,8 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Plot time series data.")
     parser.add_argument("--data_file", type=str, help="Path to the CSV file containing the time series data.")
     parser.add_argument("--output_file", type=str, help="Path to save the HTML file of the plot.", default=None)
+    parser.add_argument("--max_points", type=int, help="Maximum number of points to draw (0 draws every observation).", default=DEFAULT_MAX_POINTS)
 
     args = parser.parse_args()
 
-    plot_time_series(args.data_file, args.output_file)
+    plot_time_series(args.data_file, args.output_file, max_points=args.max_points)